@@ -25,6 +25,24 @@ class Config:
     SECRET_KEY = os.getenv('SECRET_KEY')
     ADMIN_SIGNUP_CODE = os.getenv('ADMIN_SIGNUP_CODE')
     
+    # Password hashing (existing hashes are upgraded on login when the cost changes)
+    BCRYPT_LOG_ROUNDS = int(os.getenv('BCRYPT_LOG_ROUNDS', 12))
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', 2))  # bcrypt threads per worker
+    PASSWORD_HASH_QUEUE_DEPTH = 16  # jobs waiting beyond this get a 503
+    PASSWORD_HASH_TIMEOUT = 30
+    
+    # Rate limiting for login / password reset (token buckets shared by all workers)
+    # redis://host:6379/0 in production; unset uses sqlite in the instance folder
+    RATELIMIT_ENABLED = os.getenv('RATELIMIT_ENABLED', 'True').lower() == 'true'
+    RATELIMIT_STORAGE_URL = os.getenv('RATELIMIT_STORAGE_URL')
+    # (attempts, per seconds)
+    RATELIMIT_LOGIN_PER_IP = (30, 300)
+    RATELIMIT_LOGIN_PER_ACCOUNT = (10, 900)
+    RATELIMIT_RESET_PER_IP = (5, 900)
+    RATELIMIT_RESET_PER_ACCOUNT = (3, 3600)
+    # Number of proxies setting X-Forwarded-For in front of the app (0 = none)
+    PROXY_FIX_X_FOR = int(os.getenv('PROXY_FIX_X_FOR', 0))
+    
     # Database
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
@@ -42,22 +60,91 @@ class Config:
         # SQLite doesn't need connection pooling
         SQLALCHEMY_ENGINE_OPTIONS = {}
     
-    # Flask-Mail Configuration
-    MAIL_SERVER = 'smtp.gmail.com'
-    MAIL_PORT = 465
-    MAIL_USE_TLS = False 
-    MAIL_USE_SSL = True 
+    # Flask-Mail Configuration (override server settings to point at a local SMTP stand-in)
+    MAIL_SERVER = os.getenv('MAIL_SERVER', 'smtp.gmail.com')
+    MAIL_PORT = int(os.getenv('MAIL_PORT', 465))
+    MAIL_USE_TLS = os.getenv('MAIL_USE_TLS', 'False').lower() == 'true'
+    MAIL_USE_SSL = os.getenv('MAIL_USE_SSL', 'True').lower() == 'true'
     MAIL_USERNAME = os.getenv('MAIL_USERNAME')
     MAIL_PASSWORD = os.getenv('MAIL_PASSWORD')
     MAIL_DEFAULT_SENDER = ('CodeLMS', os.getenv('MAIL_DEFAULT_EMAIL', 'noreply@codelms.com'))
     
+    # Admin user manager (keyset-paginated)
+    ADMIN_USERS_PER_PAGE = 50
+
+    # Bulk user import (`flask users import` and the admin CSV upload)
+    USER_IMPORT_BATCH_SIZE = 1000
+    USER_IMPORT_WORKERS = int(os.getenv('USER_IMPORT_WORKERS', 0)) or None  # bcrypt processes; None = all cores
+    # Admin uploads with more rows are queued for the jobs worker; in-request hashing
+    # runs on PASSWORD_HASH_WORKERS threads (~0.4s per cost-12 hash), so keep this small
+    USER_IMPORT_SYNC_LIMIT = 25
+
+    # Cohort enrollment (admin.bulk_enroll / `flask users enroll`)
+    COHORT_ENROLL_MAX_USERS = 10000
+
+    # Courses whose enrollments + completions exceed this are deleted in batches in the background
+    COURSE_DELETE_BACKGROUND_THRESHOLD = 50000
+    COURSE_DELETE_BATCH_SIZE = 5000
+
+    # Durable background jobs (`flask jobs-worker`, lms/jobs.py)
+    JOBS_MAX_ATTEMPTS = 5
+    JOBS_BACKOFF_SECONDS = 60  # doubled after each failed attempt
+    JOBS_HEARTBEAT_SECONDS = 30
+    JOBS_LEASE_SECONDS = 120  # a running job without a heartbeat this long is picked up again
+
+    # Outbound mail queue (`flask mail-worker`)
+    MAIL_QUEUE_MAX_ATTEMPTS = 5
+    MAIL_QUEUE_BACKOFF_SECONDS = 30  # doubled after each failed attempt
+    
     # Warn if mail not configured (optional in dev)
     if ENV == 'production' and not all([MAIL_USERNAME, MAIL_PASSWORD]):
         print("WARNING: MAIL_USERNAME and MAIL_PASSWORD not set!")
     
+    # Real-time messaging (SSE)
+    # 'postgres' uses LISTEN/NOTIFY, 'memory' stays in-process; unset picks by database
+    MESSAGE_BROKER = os.getenv('MESSAGE_BROKER')
+    MESSAGE_BROKER_POOL_SIZE = 2  # NOTIFY connections per worker (plus as many overflow)
+    SSE_HEARTBEAT_SECONDS = 15
+    SSE_MAX_STREAM_SECONDS = 300  # clients reconnect with Last-Event-ID after this
+    SSE_REPLAY_LIMIT = 50
+    BROADCAST_INACTIVE_DAYS = 14  # no completions in this window = inactive
+    MESSAGE_SEARCH_PER_PAGE = 20
+    MESSAGE_RETENTION_DAYS = int(os.getenv('MESSAGE_RETENTION_DAYS', 365))  # `flask messages archive`
+    
     # Session
     PERMANENT_SESSION_LIFETIME = timedelta(minutes=30)
     
+    # Worker-local cache used by the Flask-Login user_loader
+    USER_CACHE_SIZE = 1024
+    USER_CACHE_TTL = 30  # seconds; bounds staleness across gunicorn workers
+    
+    # Per-request SQL instrumentation (lms/query_stats.py)
+    QUERY_STATS_ENABLED = os.getenv('QUERY_STATS_ENABLED', 'True').lower() == 'true'
+    QUERY_STATS_SERVER_TIMING = os.getenv('QUERY_STATS_SERVER_TIMING', 'True').lower() == 'true'
+    QUERY_BUDGET_DEFAULT = None  # max queries per request; None = unlimited
+    QUERY_BUDGETS = {}  # per-endpoint overrides, e.g. {'main.dashboard': 15}
+    QUERY_REPEAT_THRESHOLD = 10  # same statement shape this many times = likely N+1
+    QUERY_BUDGET_MODE = 'warn'  # 'raise' fails the request (use in tests)
+
+    # Prometheus /metrics (lms/metrics.py); multiprocess setup is in gunicorn.conf.py
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True').lower() == 'true'
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN')  # if set, scrapes need 'Authorization: Bearer <token>'
+
+    # On-demand request profiling (lms/profiling.py); tokens are minted on the admin Profiles page
+    PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'True').lower() == 'true'
+    PROFILING_DIR = os.getenv('PROFILING_DIR')  # default: <instance>/profiles, shared by workers
+    PROFILING_MAX_FILES = 50  # oldest profiles are deleted beyond this
+    PROFILING_TOKEN_MAX_AGE = 900  # seconds; tokens also die when their admin is demoted
+
+    # Slow query log (lms/slow_queries.py, admin Slow Queries page)
+    SLOW_QUERY_LOG_ENABLED = os.getenv('SLOW_QUERY_LOG_ENABLED', 'True').lower() == 'true'
+    SLOW_QUERY_THRESHOLD_MS = int(os.getenv('SLOW_QUERY_THRESHOLD_MS', 200))
+    SLOW_QUERY_EXPLAIN = True  # capture plans (estimates only: nothing is re-run)
+    # EXPLAIN (ANALYZE, BUFFERS) re-runs slow plain SELECTs on the request thread for real timings
+    SLOW_QUERY_EXPLAIN_ANALYZE = os.getenv('SLOW_QUERY_EXPLAIN_ANALYZE', 'False').lower() == 'true'
+    SLOW_QUERY_EXPLAIN_INTERVAL = 300  # seconds between plans of the same query, per worker
+    SLOW_QUERY_RETENTION_DAYS = 14
+
     # Cache
     CACHE_TYPE = "SimpleCache"
     CACHE_DEFAULT_TIMEOUT = 300
\ No newline at end of file
@@ -0,0 +1,26 @@
+# gunicorn.conf.py
+
+"""
+Loaded automatically by gunicorn from the working directory.
+
+Puts prometheus_client in multiprocess mode (see lms/metrics.py): workers
+inherit PROMETHEUS_MULTIPROC_DIR from the master, which sets it here,
+before the app is imported.
+"""
+
+import os
+import shutil
+
+prometheus_dir = os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/lms-prometheus')
+
+
+def on_starting(server):
+    # Files left by a previous run would be added to this run's counters
+    shutil.rmtree(prometheus_dir, ignore_errors=True)
+    os.makedirs(prometheus_dir, exist_ok=True)
+
+
+def child_exit(server, worker):
+    # Drop the exited worker's live gauges (pool connections); its counters are kept
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -1,22 +1,32 @@
 # lms/__init__.py
 
-from flask import Flask
+from flask import Flask, flash, request
+from flask_login import login_url
 from .extensions import db, login_manager, csrf, bcrypt, migrate
 from flask_mail import Mail
 import logging
 from flask import render_template
 from flask_wtf.csrf import CSRFError
 from lms.errors.handlers import register_error_handlers
+from lms.user_cache import init_user_cache, load_cached_user
+from lms.passwords import password_hasher
+from lms.ratelimit import rate_limiter
+from lms.query_stats import query_tracker
+from lms.metrics import metrics
+from lms.profiling import request_profiler
+from lms.slow_queries import slow_query_log
+from werkzeug.middleware.proxy_fix import ProxyFix
 
 
 # Import blueprints
 from .main import main as main_blueprint
 from .auth import auth as auth_blueprint
-from .courses.routes import courses as courses_blueprint
+from .courses.routes import courses as courses_blueprint, fragment_redirect
 from .admin import admin as admin_blueprint
-from lms.commands import promote_admin
+from lms.commands import promote_admin, messages_cli, bench_cli, mail_worker, jobs_worker, users_cli
 from lms.instructor import instructor
 from lms.messaging import messaging  
+from lms.messaging.broker import message_broker
 
 
 mail = Mail()  # initialized Flask-Mail globally
@@ -29,29 +39,54 @@ def load_user(user_id):
     if not user_id:
         return None
     try:
-        from .models.user import User  # avoid circular import
-        return db.session.get(User, int(user_id))
+        # Served from a short-TTL, worker-local cache (see lms/user_cache.py)
+        return load_cached_user(db.session, int(user_id))
     except Exception:
         logger.exception("Error in module-level load_user")
         return None
 
 
+@login_manager.unauthorized_handler
+def unauthorized():
+    """Send anonymous users to the login page; fragment requests get a 401 + HX-Redirect."""
+    if login_manager.login_message:
+        flash(login_manager.login_message, category=login_manager.login_message_category)
+    return fragment_redirect(login_url(login_manager.login_view, next_url=request.url), 401)
+
+
 def create_app(config_object='config.Config'):
     """Application factory for the LMS."""
 
     app = Flask('lms', instance_relative_config=True)
     app.config.from_object(config_object)
+    
+    # Trust X-Forwarded-For from our reverse proxy so request.remote_addr is the client
+    if app.config.get('PROXY_FIX_X_FOR'):
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['PROXY_FIX_X_FOR'])
 
     # CLI command
     app.cli.add_command(promote_admin)
+    app.cli.add_command(messages_cli)
+    app.cli.add_command(bench_cli)
+    app.cli.add_command(mail_worker)
+    app.cli.add_command(jobs_worker)
+    app.cli.add_command(users_cli)
     
     # Initialize extensions 
     db.init_app(app)
+    query_tracker.init_app(app)
+    slow_query_log.init_app(app)
+    metrics.init_app(app)
+    request_profiler.init_app(app)
     bcrypt.init_app(app)
+    password_hasher.init_app(app)
+    rate_limiter.init_app(app)
     login_manager.init_app(app)
     csrf.init_app(app)
     migrate.init_app(app, db)
     mail.init_app(app)  
+    message_broker.init_app(app)
+    init_user_cache(app)
     
     # Flask-Login config
     login_manager.login_view = 'auth.login'
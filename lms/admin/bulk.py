@@ -0,0 +1,80 @@
+# lms/admin/bulk.py
+
+"""
+Multi-select admin actions on courses and users.
+
+Each action is one set-based statement (UPDATE/DELETE ... WHERE id IN
+(...)) in the caller's transaction; nothing is loaded row by row. Bulk
+statements skip ORM mapper events, so callers invalidate the user_loader
+cache once for the whole batch after committing (see invalidate_users).
+"""
+
+from flask import current_app
+from sqlalchemy import delete, select, update
+
+from lms.extensions import db
+from lms.models import Course, User
+from .deletion import course_footprints
+
+
+COURSE_ACTIONS = ('publish', 'unpublish', 'delete')
+USER_ACTIONS = ('set_role', 'delete')
+BULK_ROLES = ('student', 'instructor')
+
+
+def _by_ids(stmt, model, ids):
+    return stmt.where(model.id.in_(ids)).execution_options(synchronize_session=False)
+
+
+def set_courses_published(course_ids, published):
+    """Publish or unpublish courses (skipping ones being deleted). Returns the number whose status changed."""
+    stmt = _by_ids(update(Course), Course, course_ids).where(
+        Course.published != published, Course.deleting == False
+    )
+    return db.session.execute(stmt.values(published=published)).rowcount
+
+
+def delete_courses(course_ids):
+    """
+    Delete courses with a single cascading DELETE.
+
+    Courses too large to delete in one transaction (see
+    COURSE_DELETE_BACKGROUND_THRESHOLD), and courses already being deleted,
+    are returned for the caller to queue with queue_course_purge, which
+    unpublishes them. Returns (deleted_count, deferred_ids).
+    """
+    threshold = current_app.config.get('COURSE_DELETE_BACKGROUND_THRESHOLD', 50000)
+    footprints = course_footprints(course_ids)
+    deleting = set(db.session.scalars(
+        select(Course.id).where(Course.id.in_(course_ids), Course.deleting == True)
+    ))
+    deferred = sorted(cid for cid, rows in footprints.items() if rows > threshold or cid in deleting)
+    immediate = [cid for cid in footprints if cid not in deferred]
+
+    deleted = 0
+    if immediate:
+        deleted = db.session.execute(_by_ids(delete(Course), Course, immediate)).rowcount
+    return deleted, deferred
+
+
+def set_users_role(user_ids, role, is_admin=None):
+    """Set the role (and optionally the admin flag) of many users. Returns rows updated."""
+    values = {'role': role}
+    if is_admin is not None:
+        values['is_admin'] = is_admin
+    return db.session.execute(_by_ids(update(User), User, user_ids).values(**values)).rowcount
+
+
+def delete_users(user_ids):
+    """
+    Delete users with a single cascading DELETE, skipping anyone still
+    assigned as a course instructor. Returns (deleted_count, blocked_ids).
+    """
+    blocked = sorted(set(db.session.scalars(
+        select(Course.instructor_id).where(Course.instructor_id.in_(user_ids))
+    )))
+    deletable = [uid for uid in user_ids if uid not in blocked]
+    deleted = 0
+    if deletable:
+        deleted = db.session.execute(_by_ids(delete(User), User, deletable)).rowcount
+    return deleted, blocked
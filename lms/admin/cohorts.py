@@ -0,0 +1,113 @@
+# lms/admin/cohorts.py
+
+"""
+Cohort enrollment: enroll many users into many courses at once.
+
+All Enrollment rows are written by a single INSERT ... SELECT over
+users x courses with ON CONFLICT (user_id, course_id) DO NOTHING, so
+existing enrollments are skipped by the database and a cohort of
+thousands is one statement. Progress is initialized in the same
+statement: users who already completed every lesson of a course (e.g.
+re-enrolling after being removed) start out completed.
+"""
+
+from datetime import datetime
+
+from sqlalchemy import and_, case, false, func, literal, null, or_, select, true
+
+from lms.extensions import db
+from lms.models import Course, Enrollment, Lesson, LessonCompletion, Module, User
+from lms.upsert import insert_ignore
+
+
+def parse_user_refs(values):
+    """Split user references (ids or emails, mixed) into (ids, emails)."""
+    ids, emails = set(), set()
+    for value in values:
+        value = str(value).strip()
+        if not value:
+            continue
+        if value.isdigit():
+            ids.add(int(value))
+        else:
+            emails.add(value)
+    return ids, emails
+
+
+def _completion_counts():
+    """Correlated (completed, total) lesson counts for the user/course being inserted."""
+    total = (
+        select(func.count(Lesson.id))
+        .join(Module, Lesson.module_id == Module.id)
+        .where(Module.course_id == Course.id)
+        .correlate(Course)
+        .scalar_subquery()
+    )
+    completed = (
+        select(func.count(LessonCompletion.id))
+        .join(Lesson, LessonCompletion.lesson_id == Lesson.id)
+        .join(Module, Lesson.module_id == Module.id)
+        .where(Module.course_id == Course.id, LessonCompletion.user_id == User.id)
+        .correlate(Course, User)
+        .scalar_subquery()
+    )
+    return completed, total
+
+
+def enroll_cohort(user_ids=(), emails=(), course_ids=()):
+    """
+    Enroll every matching user in every given course without committing.
+
+    Returns a dict with the number of enrollments created, how many
+    already existed, and the user references / course ids that matched
+    nothing.
+    """
+    user_ids, emails, course_ids = set(user_ids), set(emails), set(course_ids)
+
+    user_filter = or_(User.id.in_(user_ids), User.email.in_(emails))
+    found_users = db.session.execute(select(User.id, User.email).where(user_filter)).all()
+    found_courses = set(db.session.scalars(select(Course.id).where(Course.id.in_(course_ids))))
+
+    result = {
+        'enrolled': 0,
+        'already_enrolled': 0,
+        'unknown_users': sorted(
+            [str(i) for i in user_ids - {u.id for u in found_users}]
+            + list(emails - {u.email for u in found_users})
+        ),
+        'unknown_courses': sorted(course_ids - found_courses),
+    }
+    if not found_users or not found_courses:
+        return result
+
+    now = datetime.utcnow()
+    completed, total = _completion_counts()
+    pairs = (
+        select(
+            User.id.label('user_id'),
+            Course.id.label('course_id'),
+            completed.label('completed_lessons'),
+            total.label('total_lessons'),
+        )
+        .select_from(User)
+        .join(Course, Course.id.in_(found_courses))
+        .where(user_filter)
+        .subquery()
+    )
+    is_complete = and_(pairs.c.total_lessons > 0, pairs.c.completed_lessons >= pairs.c.total_lessons)
+
+    rows = select(
+        pairs.c.user_id,
+        pairs.c.course_id,
+        literal(now, Enrollment.date_enrolled.type),
+        case((is_complete, true()), else_=false()),
+        case((is_complete, literal(now, Enrollment.date_completed.type)), else_=null()),
+    ).where(true())  # SQLite needs a WHERE to parse INSERT ... SELECT ... ON CONFLICT
+    stmt = insert_ignore(Enrollment, ['user_id', 'course_id']).from_select(
+        ['user_id', 'course_id', 'date_enrolled', 'completed', 'date_completed'], rows
+    )
+
+    inserted = db.session.execute(stmt).rowcount
+    result['enrolled'] = inserted
+    result['already_enrolled'] = len(found_users) * len(found_courses) - inserted
+    return result
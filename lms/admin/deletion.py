@@ -0,0 +1,141 @@
+# lms/admin/deletion.py
+
+"""
+Course deletion that scales with course size.
+
+Foreign keys cascade in the database (ON DELETE CASCADE + passive_deletes),
+so deleting a course is normally one DELETE. For courses with a very large
+footprint, completions and enrollments are first removed in batches by
+`flask jobs-worker` (lms/jobs.py) so the admin request returns immediately
+and no single transaction holds locks on millions of rows. The purge is
+queued in the same transaction that unpublishes the course and marks it
+as being deleted (Course.deleting), so it can't be published or edited
+again mid-purge, and resumes where it stopped if the worker is restarted.
+If the job gives up, the course stays marked and is listed on the manage
+courses page (failed_purges) so an admin can retry the delete.
+"""
+
+import json
+import logging
+
+from flask import current_app
+from sqlalchemy import delete, func, select, union_all, update
+
+from lms.extensions import db
+from lms.jobs import enqueue_job, job_handler
+from lms.models import BackgroundJob, Course, Enrollment, Lesson, LessonCompletion, Module
+
+
+logger = logging.getLogger(__name__)
+
+
+def _course_lessons(course_id):
+    return (
+        select(Lesson.id)
+        .join(Module, Lesson.module_id == Module.id)
+        .where(Module.course_id == course_id)
+    )
+
+
+def course_footprints(course_ids):
+    """{course_id: enrollment + completion rows a delete would cascade to}, in one query."""
+    course_ids = list(course_ids)
+    enrollments = (
+        select(Enrollment.course_id.label('course_id'), func.count().label('rows'))
+        .where(Enrollment.course_id.in_(course_ids))
+        .group_by(Enrollment.course_id)
+    )
+    completions = (
+        select(Module.course_id.label('course_id'), func.count().label('rows'))
+        .select_from(LessonCompletion)
+        .join(Lesson, LessonCompletion.lesson_id == Lesson.id)
+        .join(Module, Lesson.module_id == Module.id)
+        .where(Module.course_id.in_(course_ids))
+        .group_by(Module.course_id)
+    )
+    counts = union_all(enrollments, completions).subquery()
+    rows = db.session.execute(
+        select(counts.c.course_id, func.sum(counts.c.rows)).group_by(counts.c.course_id)
+    ).all()
+    footprints = dict.fromkeys(course_ids, 0)
+    footprints.update({course_id: int(total) for course_id, total in rows})
+    return footprints
+
+
+def course_footprint(course_id):
+    """Number of enrollment and completion rows a course delete would cascade to."""
+    return course_footprints([course_id])[course_id]
+
+
+def _delete_in_batches(model, condition, batch_size):
+    total = 0
+    while True:
+        ids = select(model.id).where(condition).limit(batch_size).scalar_subquery()
+        deleted = db.session.execute(
+            delete(model).where(model.id.in_(ids)).execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.commit()
+        total += deleted
+        if deleted < batch_size:
+            return total
+
+
+def purge_course(course_id, batch_size=5000):
+    """
+    Delete a course's completions and enrollments in batches (one commit
+    each), then the course itself; modules and lessons go with it via
+    ON DELETE CASCADE. Returns the number of batched rows removed.
+
+    Safe to re-run after an interruption: each pass deletes whatever is left.
+    """
+    try:
+        total = _delete_in_batches(
+            LessonCompletion, LessonCompletion.lesson_id.in_(_course_lessons(course_id)), batch_size
+        )
+        total += _delete_in_batches(Enrollment, Enrollment.course_id == course_id, batch_size)
+        db.session.execute(delete(Course).where(Course.id == course_id))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return total
+
+
+def _purge_jobs(statuses):
+    """Latest purge_course job per course id among jobs in `statuses`."""
+    jobs = (
+        BackgroundJob.query
+        .filter(BackgroundJob.kind == 'purge_course', BackgroundJob.status.in_(statuses))
+        .order_by(BackgroundJob.id)
+    )
+    return {json.loads(job.payload)['course_id']: job for job in jobs}
+
+
+def queue_course_purge(course_id):
+    """
+    Mark the course as being deleted (unpublished; publish and edit are
+    blocked) and queue purge_course for the jobs worker, unless a purge of it
+    is already pending or running. The caller commits the session.
+    """
+    db.session.execute(
+        update(Course).where(Course.id == course_id).values(deleting=True, published=False)
+    )
+    active = _purge_jobs((BackgroundJob.STATUS_PENDING, BackgroundJob.STATUS_RUNNING))
+    if course_id not in active:
+        enqueue_job('purge_course', course_id=course_id)
+
+
+def failed_purges():
+    """(course, job) for courses still being deleted whose latest purge job gave up."""
+    latest = _purge_jobs((BackgroundJob.STATUS_PENDING, BackgroundJob.STATUS_RUNNING, BackgroundJob.STATUS_FAILED))
+    failed = {cid: job for cid, job in latest.items() if job.status == BackgroundJob.STATUS_FAILED}
+    if not failed:
+        return []
+    courses = Course.query.filter(Course.id.in_(failed), Course.deleting == True).order_by(Course.title)
+    return [(course, failed[course.id]) for course in courses]
+
+
+@job_handler('purge_course')
+def _purge_course_job(course_id):
+    removed = purge_course(course_id, current_app.config.get('COURSE_DELETE_BATCH_SIZE', 5000))
+    logger.info("Deleted course %s (%s enrollment/completion rows)", course_id, removed)
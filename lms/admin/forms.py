@@ -4,28 +4,74 @@
     
 # lms/admin/forms.py (Complete Code)
 from flask_wtf import FlaskForm
+from flask_wtf.file import FileField, FileAllowed, FileRequired
 from wtforms import StringField, TextAreaField, BooleanField, SelectField, SubmitField, IntegerField
 from wtforms.validators import DataRequired, Length, Optional
-# QuerySelectField is ideal for selecting a related database object (the Instructor)
-from wtforms_sqlalchemy.fields import QuerySelectField
+from wtforms import Field, ValidationError
+from markupsafe import Markup, escape
+from flask import url_for
+from lms import db
 from lms.models.user import User # Assuming your User model is imported correctly
+from .user_search import STAFF_ROLES
 
-# --- Query Functions for QuerySelectField ---
-
-def get_instructors_query():
-    """Returns a query of users who can be instructors (role is 'admin' or 'instructor')."""
-    
-    #Filter users where role is explicitly 'instructor' or 'admin'
-    return User.query.filter(
-        User.role.in_(['admin', 'instructor']) 
-    ).order_by(User.name).all()
+# --- Instructor picker ---
 
 def display_instructor_label(user):
-    """Formats the label displayed in the dropdown using the user's name."""
+    """Formats the label displayed in the picker using the user's name."""
     
     #Use user.name and user.email for clear display
     return f"{user.name} ({user.email})"
 
+
+class InstructorAutocompleteWidget:
+    """
+    Hidden input carrying the instructor id plus a search box that queries
+    admin.instructor_autocomplete (see admin/_instructor_autocomplete.html).
+    """
+
+    def __call__(self, field, **kwargs):
+        css_class = kwargs.pop('class', '') or kwargs.pop('class_', '')
+        label = display_instructor_label(field.data) if field.data else ''
+        return Markup(
+            f'<div class="relative" data-instructor-autocomplete '
+            f'data-url="{escape(url_for("admin.instructor_autocomplete"))}">'
+            f'<input type="hidden" id="{escape(field.id)}" name="{escape(field.name)}" value="{escape(field._value())}">'
+            f'<input type="text" class="{escape(css_class)}" value="{escape(label)}" autocomplete="off" '
+            f'placeholder="Search by name or email (leave empty for no instructor)" data-instructor-search>'
+            f'<ul class="absolute z-10 w-full mt-1 bg-white dark:bg-gray-900 border border-gray-300 '
+            f'dark:border-gray-700 rounded-lg shadow-lg hidden max-h-60 overflow-y-auto" data-instructor-results></ul>'
+            f'</div>'
+        )
+
+
+class InstructorField(Field):
+    """
+    Single instructor chosen via autocomplete. Only the submitted id is
+    checked, with one primary-key lookup; `data` is the User or None.
+    """
+    widget = InstructorAutocompleteWidget()
+
+    def _value(self):
+        return str(self.data.id) if self.data else ''
+
+    def process_formdata(self, valuelist):
+        self._submitted_id = None
+        self.data = None
+        if valuelist and valuelist[0].strip():
+            self._submitted_id = valuelist[0].strip()
+
+    def pre_validate(self, form):
+        submitted = getattr(self, '_submitted_id', None)
+        if submitted is None:
+            return
+        try:
+            user = db.session.get(User, int(submitted))
+        except ValueError:
+            user = None
+        if user is None or user.role not in STAFF_ROLES:
+            raise ValidationError('Choose an instructor from the list.')
+        self.data = user
+
 # --- Course Management Forms ---
 
 COURSE_LEVEL_CHOICES = [
@@ -38,17 +84,8 @@ class CourseForm(FlaskForm):
     title = StringField('Course Title', validators=[DataRequired(), Length(max=200)])
     description = TextAreaField('Description', validators=[DataRequired()])
     
-    # NEW FIELD: Instructor Selection
-    # This solves the Jinja2 UndefinedError
-    instructor = QuerySelectField(
-        'Instructor',
-        query_factory=get_instructors_query,
-        get_label=display_instructor_label,
-        allow_blank=True,
-        blank_text='-- Select Course Instructor --',
-        # Set to Optional since a course might not have an instructor assigned yet
-        validators=[Optional()] 
-    )
+    # Instructor Selection (autocomplete; a course might not have an instructor yet)
+    instructor = InstructorField('Instructor')
     
     level = SelectField('Course Level', 
                         choices=COURSE_LEVEL_CHOICES, 
@@ -85,4 +122,10 @@ class LessonForm(FlaskForm):
     # Field corresponding to the Lesson.order
     order = IntegerField('Order/Sequence', default=1, validators=[DataRequired()])
     
-    submit = SubmitField('Save Lesson')
\ No newline at end of file
+    submit = SubmitField('Save Lesson')
+
+
+class UserImportForm(FlaskForm):
+    """CSV upload for bulk user import (see admin/user_import.py)."""
+    csv_file = FileField('Users CSV', validators=[FileRequired(), FileAllowed(['csv'], 'CSV files only.')])
+    submit = SubmitField('Import Users')
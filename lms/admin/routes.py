@@ -1,5 +1,5 @@
 # lms/admin/routes.py (Complete Code with Comments)
-from flask import render_template, redirect, url_for, flash, request, abort
+from flask import render_template, redirect, url_for, flash, request, abort, current_app, jsonify, send_from_directory
 from flask_login import login_required, current_user
 from lms import db
 from lms.models.course import Course
@@ -7,7 +7,20 @@ from lms.models.module import Module
 from lms.models.lesson import Lesson 
 from . import admin
 from lms.models import User
-from .forms import CourseForm, ModuleForm, LessonForm
+from lms.user_cache import invalidate_users
+from .forms import CourseForm, ModuleForm, LessonForm, UserImportForm
+from .user_search import search_users, search_instructors
+from .forms import display_instructor_label
+from .deletion import course_footprint, failed_purges, queue_course_purge
+from .bulk import (
+    BULK_ROLES, COURSE_ACTIONS, USER_ACTIONS,
+    delete_courses, delete_users, set_courses_published, set_users_role
+)
+from .cohorts import enroll_cohort, parse_user_refs
+from .user_import import UserImportError, import_users, queue_user_import, read_rows, summarize
+from lms.profiling import TOKEN_HEADER, list_profiles, make_profile_token, profile_dir, profile_summary
+from lms.slow_queries import slow_query_groups
+import io
 from slugify import slugify 
 # from lms import cache
 
@@ -65,6 +78,21 @@ def add_course():
     return render_template('admin/add_course.html', form=form)
 
 
+@admin.route('/instructors/autocomplete')
+@login_required
+def instructor_autocomplete():
+    """JSON prefix search over admins/instructors for the course form's instructor picker."""
+    if not is_admin(current_user):
+        return jsonify({'success': False, 'error': 'Unauthorized'}), 403
+
+    limit = min(request.args.get('limit', 10, type=int), 25)
+    rows = search_instructors(request.args.get('q', ''), limit=max(limit, 1))
+    return jsonify({
+        'success': True,
+        'results': [{'id': row.id, 'label': display_instructor_label(row)} for row in rows]
+    })
+
+
 @admin.route('/courses/<int:course_id>/edit', methods=['GET', 'POST'])
 @login_required
 def edit_course(course_id):
@@ -77,6 +105,9 @@ def edit_course(course_id):
     if course is None:
         flash("Course not found.", "danger")
         return redirect(url_for('admin.manage_courses'))
+    if course.deleting:
+        flash(f"Course '{course.title}' is being deleted and can't be edited.", "warning")
+        return redirect(url_for('admin.manage_courses'))
 
     form = CourseForm(obj=course)
 
@@ -113,7 +144,7 @@ def manage_courses():
         return redirect(url_for('courses.index'))
     
     all_courses = Course.query.order_by(Course.created_at.desc()).all()
-    return render_template('admin/manage_courses.html', courses=all_courses)
+    return render_template('admin/manage_courses.html', courses=all_courses, failed_purges=failed_purges())
 
 # ===============================
 # COURSE ACTIONS (PUBLISH/DELETE)
@@ -131,6 +162,8 @@ def toggle_publish(course_id):
     
     if course is None:
         flash("Course not found.", "danger")
+    elif course.deleting:
+        flash(f"Course '{course.title}' is being deleted and can't be published.", "warning")
     else:
         course.published = not course.published
         db.session.commit()
@@ -154,12 +187,111 @@ def delete_course(course_id):
         flash("Course not found.", "danger")
     else:
         course_title = course.title
-        db.session.delete(course)
-        db.session.commit()
-        flash(f"Course '{course_title}' and all related content have been permanently deleted.", "success")
+
+        # Huge courses are purged in batches off the request; everything else is
+        # a single DELETE that the database cascades (ON DELETE CASCADE).
+        # Deleting a course that is already being deleted retries its purge.
+        threshold = current_app.config.get('COURSE_DELETE_BACKGROUND_THRESHOLD', 50000)
+        if course.deleting or course_footprint(course.id) > threshold:
+            queue_course_purge(course.id)
+            db.session.commit()
+            flash(f"Course '{course_title}' has been unpublished and is being deleted in the background.", "info")
+        else:
+            db.session.delete(course)
+            db.session.commit()
+            flash(f"Course '{course_title}' and all related content have been permanently deleted.", "success")
     
     return redirect(url_for('admin.manage_courses'))
 
+@admin.route('/enrollments/bulk', methods=['POST'])
+@login_required
+def bulk_enroll():
+    """
+    Enroll a cohort in one or more courses.
+
+    Accepts JSON {"users": [ids or emails], "course_ids": [ids]} or form
+    fields `users` (comma/newline separated) and `course_ids` (repeated).
+    """
+    if not is_admin(current_user):
+        return jsonify({'success': False, 'error': 'Unauthorized'}), 403
+
+    payload = request.get_json(silent=True)
+    if payload is not None:
+        users = payload.get('users') or []
+        course_ids = payload.get('course_ids') or []
+    else:
+        users = request.form.get('users', '').replace(',', '\n').splitlines()
+        course_ids = request.form.getlist('course_ids')
+
+    if not isinstance(users, list) or not isinstance(course_ids, list):
+        return jsonify({'success': False, 'error': 'users and course_ids must be lists'}), 400
+    try:
+        course_ids = {int(c) for c in course_ids}
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'error': 'course_ids must be integers'}), 400
+
+    user_ids, emails = parse_user_refs(users)
+    if not (user_ids or emails) or not course_ids:
+        return jsonify({'success': False, 'error': 'At least one user and one course are required'}), 400
+
+    limit = current_app.config.get('COHORT_ENROLL_MAX_USERS', 10000)
+    if len(user_ids) + len(emails) > limit:
+        return jsonify({'success': False, 'error': f'At most {limit} users per request'}), 400
+
+    result = enroll_cohort(user_ids, emails, course_ids)
+    db.session.commit()
+    return jsonify({'success': True, **result})
+
+
+BAD_BULK_REQUEST = 'Expected a JSON object with an "ids" list'
+
+
+def _bulk_request():
+    """
+    Return (action, ids, fields) from a JSON body or a multi-select form post,
+    or None if a JSON body isn't an object or its ids aren't a list.
+    """
+    payload = request.get_json(silent=True)
+    if payload is None:
+        payload = request.form.to_dict()
+        payload['ids'] = request.form.getlist('ids')
+    if not isinstance(payload, dict) or not isinstance(payload.get('ids', []), list):
+        return None
+    try:
+        ids = sorted({int(i) for i in payload.get('ids') or []})
+    except (TypeError, ValueError):
+        ids = None
+    return payload.get('action'), ids, payload
+
+
+@admin.route('/courses/bulk', methods=['POST'])
+@login_required
+def bulk_course_action():
+    """Publish, unpublish or delete many courses in one transaction; returns a JSON summary."""
+    if not is_admin(current_user):
+        return jsonify({'success': False, 'error': 'Unauthorized'}), 403
+
+    bulk = _bulk_request()
+    if bulk is None:
+        return jsonify({'success': False, 'error': BAD_BULK_REQUEST}), 400
+    action, ids, _ = bulk
+    if action not in COURSE_ACTIONS:
+        return jsonify({'success': False, 'error': f"action must be one of: {', '.join(COURSE_ACTIONS)}"}), 400
+    if not ids:
+        return jsonify({'success': False, 'error': 'Select at least one course'}), 400
+
+    summary = {'success': True, 'action': action, 'requested': len(ids)}
+    if action == 'delete':
+        summary['deleted'], deferred = delete_courses(ids)
+        summary['deleting_in_background'] = deferred
+        for course_id in deferred:
+            queue_course_purge(course_id)
+    else:
+        summary['updated'] = set_courses_published(ids, action == 'publish')
+    db.session.commit()
+    return jsonify(summary)
+
+
 # ===============================
 # COURSE OUTLINE AND MODULE ROUTES
 # ===============================
@@ -372,17 +504,100 @@ def manage_users():
         abort(403)
     
     query = request.args.get('q', '').strip()
+    role = request.args.get('role', '').strip() or None
+    admin_filter = request.args.get('admin', '')
+    is_admin_filter = {'yes': True, 'no': False}.get(admin_filter)
+
+    # Keyset pagination: ?after=<id> for the next page, ?before=<id> for the previous one
+    after = request.args.get('after', type=int)
+    before = request.args.get('before', type=int)
+
+    users, prev_cursor, next_cursor = search_users(
+        q=query,
+        role=role,
+        is_admin=is_admin_filter,
+        after=after,
+        before=before,
+        per_page=current_app.config.get('ADMIN_USERS_PER_PAGE', 50)
+    )
     
-    if query:
-        # Search by name or email
-        users = User.query.filter(
-            (User.name.ilike(f"%{query}%")) | 
-            (User.email.ilike(f"%{query}%"))
-        ).all()
+    return render_template(
+        'admin/manage_users.html',
+        users=users,
+        search_query=query,
+        role_filter=role or '',
+        admin_filter=admin_filter,
+        prev_cursor=prev_cursor,
+        next_cursor=next_cursor
+    )
+
+
+@admin.route('/users/import', methods=['GET', 'POST'])
+@login_required
+def import_users_view():
+    """Bulk-create users (and optional enrollments) from an uploaded CSV."""
+    if not current_user.is_admin:
+        abort(403)
+
+    form = UserImportForm()
+    if form.validate_on_submit():
+        try:
+            text = form.csv_file.data.read().decode('utf-8-sig')
+            row_count = sum(1 for _ in read_rows(io.StringIO(text, newline='')))
+        except (UserImportError, UnicodeDecodeError) as e:
+            flash(str(e) if isinstance(e, UserImportError) else "The file must be UTF-8 encoded CSV.", "danger")
+            return render_template('admin/import_users.html', form=form)
+
+        if row_count > current_app.config.get('USER_IMPORT_SYNC_LIMIT', 25):
+            queue_user_import(text)
+            db.session.commit()
+            flash(f"Importing {row_count} users in the background.", "info")
+            return redirect(url_for('admin.manage_users'))
+
+        totals = summarize(import_users(io.StringIO(text, newline=''), in_request=True))
+
+        flash(
+            f"Created {totals['created']} users, skipped {totals['skipped']} existing, "
+            f"added {totals['enrollments']} enrollments.",
+            "success"
+        )
+        return render_template('admin/import_users.html', form=UserImportForm(formdata=None), errors=totals['errors'])
+
+    return render_template('admin/import_users.html', form=form)
+
+
+@admin.route('/users/bulk', methods=['POST'])
+@login_required
+def bulk_user_action():
+    """Change the role of, or delete, many users in one transaction; returns a JSON summary."""
+    if not current_user.is_admin:
+        abort(403)
+
+    bulk = _bulk_request()
+    if bulk is None:
+        return jsonify({'success': False, 'error': BAD_BULK_REQUEST}), 400
+    action, ids, fields = bulk
+    if action not in USER_ACTIONS:
+        return jsonify({'success': False, 'error': f"action must be one of: {', '.join(USER_ACTIONS)}"}), 400
+    if not ids:
+        return jsonify({'success': False, 'error': 'Select at least one user'}), 400
+
+    summary = {'success': True, 'action': action, 'requested': len(ids)}
+    # Admins can't delete or demote themselves from a bulk selection
+    targets = [uid for uid in ids if uid != current_user.id]
+    if action == 'delete':
+        summary['deleted'], summary['blocked_instructors'] = delete_users(targets)
     else:
-        users = User.query.all()
-    
-    return render_template('admin/manage_users.html', users=users, search_query=query)
+        role = fields.get('role')
+        if role not in BULK_ROLES:
+            return jsonify({'success': False, 'error': f"role must be one of: {', '.join(BULK_ROLES)}"}), 400
+        admin_flag = {'1': True, '0': False, True: True, False: False}.get(fields.get('is_admin'))
+        summary['updated'] = set_users_role(targets, role, admin_flag)
+    db.session.commit()
+
+    # Bulk statements skip the User mapper events; drop cached identities once
+    invalidate_users(targets)
+    return jsonify(summary)
 
 
 @admin.route('/update_user_role/<int:user_id>', methods=['POST'])
@@ -426,3 +641,62 @@ def delete_user(user_id):
     return redirect(url_for('admin.manage_users'))
 
 
+# ===============================
+# REQUEST PROFILES (lms/profiling.py)
+# ===============================
+
+@admin.route('/profiles')
+@login_required
+def profiles():
+    """Recent request profiles, plus a fresh token for profiling more."""
+    if not current_user.is_admin:
+        abort(403)
+
+    return render_template(
+        'admin/profiles.html',
+        profiles=list_profiles(),
+        enabled=current_app.config.get('PROFILING_ENABLED', True),
+        token=make_profile_token(current_user),
+        token_header=TOKEN_HEADER,
+        token_minutes=current_app.config.get('PROFILING_TOKEN_MAX_AGE', 900) // 60
+    )
+
+
+@admin.route('/profiles/<name>')
+@login_required
+def download_profile(name):
+    """The raw .prof file, or ?format=txt for the top functions as text."""
+    if not current_user.is_admin:
+        abort(403)
+
+    if request.args.get('format') == 'txt':
+        try:
+            summary = profile_summary(name)
+        except FileNotFoundError:
+            abort(404)
+        return current_app.response_class(summary, mimetype='text/plain')
+    return send_from_directory(profile_dir(), name, as_attachment=True)
+
+
+# ===============================
+# SLOW QUERIES (lms/slow_queries.py)
+# ===============================
+
+@admin.route('/slow-queries')
+@login_required
+def slow_queries():
+    """Slow statements grouped by fingerprint, with their latest plan."""
+    if not current_user.is_admin:
+        abort(403)
+
+    days = min(max(request.args.get('days', 7, type=int), 1), 90)
+    table = request.args.get('table', '').strip()
+
+    return render_template(
+        'admin/slow_queries.html',
+        groups=slow_query_groups(days=days, table=table or None),
+        days=days,
+        table=table,
+        enabled=current_app.config.get('SLOW_QUERY_LOG_ENABLED', True),
+        threshold_ms=current_app.config.get('SLOW_QUERY_THRESHOLD_MS', 200)
+    )
@@ -0,0 +1,239 @@
+# lms/admin/user_import.py
+
+"""
+Bulk user import from CSV (`flask users import` and the admin upload).
+
+Rows are processed in batches: emails that already exist are looked up in
+one query so they are never hashed, new passwords are bcrypt-hashed across
+a process pool (one core per worker; in a web request, on the bounded
+password_hasher threads instead), users are written with a single
+executemany INSERT ... ON CONFLICT (email) DO NOTHING, and any enrollments
+are written the same way on (user_id, course_id). Each batch is its own
+transaction, so a failed import keeps the batches that already committed
+and re-running the same file is safe. Large admin uploads are queued for
+`flask jobs-worker` (queue_user_import), which relies on that when it
+retries an interrupted import.
+
+CSV columns (header required):
+    name, email          required
+    password             optional; blank gets a random one (user resets it)
+    role                 optional; student (default) or instructor
+    courses              optional; course slugs separated by ';'
+"""
+
+import csv
+import io
+import logging
+import os
+import secrets
+
+from flask import current_app
+from sqlalchemy import select
+
+from lms.extensions import db
+from lms.jobs import enqueue_job, job_handler
+from lms.models import Course, Enrollment, User
+from lms.passwords import bulk_hasher, hash_many, password_hasher
+from lms.upsert import insert_ignore
+
+
+logger = logging.getLogger(__name__)
+
+REQUIRED_COLUMNS = ('name', 'email')
+IMPORT_ROLES = ('student', 'instructor')
+
+
+class UserImportError(Exception):
+    """Raised when a CSV can't be imported at all (e.g. missing columns)."""
+
+
+def _open_csv(stream):
+    """Wrap a binary upload in a text reader; text streams pass through."""
+    if isinstance(stream, io.TextIOBase):
+        return stream
+    return io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+
+
+def read_rows(stream):
+    """Yield (line_number, row) from a CSV, checking the header first."""
+    reader = csv.DictReader(_open_csv(stream))
+    columns = [c.strip().lower() for c in (reader.fieldnames or [])]
+    missing = [c for c in REQUIRED_COLUMNS if c not in columns]
+    if missing:
+        raise UserImportError(f"CSV is missing required column(s): {', '.join(missing)}")
+    reader.fieldnames = columns
+    for row in reader:
+        yield reader.line_num, row
+
+
+def _clean(row):
+    """Return (record, error) for one CSV row."""
+    name = (row.get('name') or '').strip()
+    email = (row.get('email') or '').strip()
+    password = (row.get('password') or '').strip()
+    role = (row.get('role') or '').strip().lower() or 'student'
+    courses = [s.strip() for s in (row.get('courses') or '').split(';') if s.strip()]
+
+    if not 2 <= len(name) <= 100:
+        return None, "name must be 2-100 characters"
+    if '@' not in email or len(email) > 120:
+        return None, "invalid email"
+    if role not in IMPORT_ROLES:
+        return None, f"role must be one of: {', '.join(IMPORT_ROLES)}"
+    if password and len(password) < 6:
+        return None, "password must be at least 6 characters"
+    if len(password.encode('utf-8')) > 72:
+        return None, "password longer than 72 bytes"
+
+    return {
+        'name': name,
+        'email': email,
+        'password': password or secrets.token_urlsafe(24),
+        'role': role,
+        'courses': courses,
+    }, None
+
+
+def _chunks(rows, size):
+    batch = []
+    for item in rows:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class _CourseLookup:
+    """Slug -> course id, cached for the whole import."""
+
+    def __init__(self):
+        self._ids = {}
+
+    def resolve(self, slugs):
+        unknown = [s for s in slugs if s not in self._ids]
+        if unknown:
+            found = dict(db.session.execute(
+                select(Course.slug, Course.id).where(Course.slug.in_(unknown))
+            ).all())
+            for slug in unknown:
+                self._ids[slug] = found.get(slug)
+        return self._ids
+
+
+def _import_batch(batch, hash_passwords, courses):
+    stats = {'created': 0, 'skipped': 0, 'enrollments': 0, 'errors': []}
+
+    records = {}
+    for line, row in batch:
+        record, error = _clean(row)
+        if error:
+            stats['errors'].append((line, error))
+        elif record['email'] in records:
+            stats['errors'].append((line, "duplicate email in file"))
+        else:
+            record['line'] = line
+            records[record['email']] = record
+
+    if not records:
+        return stats
+
+    user_ids = dict(db.session.execute(
+        select(User.email, User.id).where(User.email.in_(list(records)))
+    ).all())
+    stats['skipped'] = len(user_ids)
+
+    new = [r for email, r in records.items() if email not in user_ids]
+    if new:
+        hashes = hash_passwords([r['password'] for r in new])
+        # A concurrent signup can still win the race; ON CONFLICT skips it
+        created = db.session.execute(
+            insert_ignore(User, ['email']).returning(User.email, User.id),
+            [
+                {'name': r['name'], 'email': r['email'], 'password': pw_hash,
+                 'role': r['role'], 'is_admin': False, 'login_streak': 0}
+                for r, pw_hash in zip(new, hashes)
+            ]
+        ).all()
+        stats['created'] = len(created)
+        stats['skipped'] += len(new) - len(created)
+        user_ids.update(dict(created))
+
+    course_ids = courses.resolve({s for r in records.values() for s in r['courses']})
+    enrollments = []
+    for email, record in records.items():
+        for slug in record['courses']:
+            if course_ids.get(slug) is None:
+                stats['errors'].append((record['line'], f"unknown course '{slug}'"))
+            elif email in user_ids:
+                enrollments.append({'user_id': user_ids[email], 'course_id': course_ids[slug]})
+
+    if enrollments:
+        stats['enrollments'] = len(db.session.execute(
+            insert_ignore(Enrollment, ['user_id', 'course_id']).returning(Enrollment.id),
+            enrollments
+        ).all())
+
+    return stats
+
+
+def _import_batches(rows, batch_size, hash_passwords, courses):
+    for batch in _chunks(rows, batch_size):
+        try:
+            stats = _import_batch(batch, hash_passwords, courses)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        yield stats
+
+
+def import_users(stream, batch_size=None, workers=None, in_request=False):
+    """
+    Import users from a CSV stream, committing after every batch.
+
+    Yields a stats dict per batch: created, skipped (email already taken),
+    enrollments, and errors as (line_number, reason) pairs.
+
+    Passwords are hashed on a bulk_hasher process pool; with in_request=True
+    (small admin uploads) they go through password_hasher instead, so a web
+    request never spawns a process per core inside a gunicorn worker.
+    """
+    config = current_app.config
+    batch_size = batch_size or config.get('USER_IMPORT_BATCH_SIZE', 1000)
+    courses = _CourseLookup()
+    rows = read_rows(stream)
+
+    if in_request:
+        yield from _import_batches(rows, batch_size, password_hasher.hash_many, courses)
+        return
+
+    workers = workers or config.get('USER_IMPORT_WORKERS') or os.cpu_count()
+    rounds = config.get('BCRYPT_LOG_ROUNDS', 12)
+    with bulk_hasher(workers) as executor:
+        yield from _import_batches(rows, batch_size, lambda passwords: hash_many(executor, passwords, rounds), courses)
+
+
+def summarize(batches):
+    """Fold per-batch stats from import_users into one totals dict."""
+    totals = {'created': 0, 'skipped': 0, 'enrollments': 0, 'errors': []}
+    for stats in batches:
+        for key in ('created', 'skipped', 'enrollments'):
+            totals[key] += stats[key]
+        totals['errors'].extend(stats['errors'])
+    return totals
+
+
+def queue_user_import(csv_text):
+    """Queue an import of `csv_text` for the jobs worker. The caller commits the session."""
+    return enqueue_job('import_users', csv=csv_text)
+
+
+@job_handler('import_users', scrub_payload=True)
+def _import_users_job(csv):
+    totals = summarize(import_users(io.StringIO(csv, newline='')))
+    logger.info(
+        "User import finished: %s created, %s skipped, %s enrollments, %s errors",
+        totals['created'], totals['skipped'], totals['enrollments'], len(totals['errors'])
+    )
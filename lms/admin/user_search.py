@@ -0,0 +1,154 @@
+# lms/admin/user_search.py
+
+"""
+Indexed, keyset-paginated user lookup for the admin user manager
+(and prefix lookup for the course form's instructor picker).
+
+- PostgreSQL: pg_trgm GIN indexes on name and email, so substring
+  ILIKE searches (and prefixes shorter than three characters) use an index
+- SQLite: an external-content FTS5 table kept in sync by triggers,
+  matched as word prefixes
+
+Pages are keyed on user id (`after` / `before` cursors) instead of OFFSET,
+so every page costs the same no matter how deep the admin scrolls.
+"""
+
+import re
+
+from sqlalchemy import event, or_, select, text
+
+from lms.extensions import db
+from lms.models import User
+
+
+POSTGRES_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    'CREATE INDEX IF NOT EXISTS idx_user_name_trgm ON "user" USING GIN (name gin_trgm_ops)',
+    'CREATE INDEX IF NOT EXISTS idx_user_email_trgm ON "user" USING GIN (email gin_trgm_ops)',
+]
+
+SQLITE_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS user_fts USING fts5(
+        name, email, content='user', content_rowid='id'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS user_fts_insert AFTER INSERT ON user BEGIN
+        INSERT INTO user_fts(rowid, name, email) VALUES (new.id, new.name, new.email);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS user_fts_delete AFTER DELETE ON user BEGIN
+        INSERT INTO user_fts(user_fts, rowid, name, email)
+        VALUES ('delete', old.id, old.name, old.email);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS user_fts_update AFTER UPDATE OF name, email ON user BEGIN
+        INSERT INTO user_fts(user_fts, rowid, name, email)
+        VALUES ('delete', old.id, old.name, old.email);
+        INSERT INTO user_fts(rowid, name, email) VALUES (new.id, new.name, new.email);
+    END
+    """,
+]
+
+
+@event.listens_for(User.__table__, 'after_create')
+def create_search_index(target, connection, **kw):
+    """Build the dialect's user search index whenever `user` is created (e.g. db.create_all())."""
+    statements = {
+        'postgresql': POSTGRES_DDL,
+        'sqlite': SQLITE_DDL,
+    }.get(connection.dialect.name, [])
+    for statement in statements:
+        connection.execute(text(statement))
+
+
+def _escape_like(q):
+    return q.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def _like_pattern(q):
+    """Escape LIKE wildcards; substring match needs 3+ characters to use trigrams."""
+    escaped = _escape_like(q)
+    return f'%{escaped}%' if len(q) >= 3 else f'{escaped}%'
+
+
+def _fts5_query(q):
+    """Every word must match the start of a word in the name or email."""
+    words = re.findall(r'\w+', q)
+    if not words:
+        return None
+    return ' '.join(f'"{w}"*' for w in words)
+
+
+def _search_condition(q):
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'sqlite':
+        match = _fts5_query(q)
+        if match is None:
+            return None
+        return User.id.in_(
+            select(text('rowid')).select_from(text('user_fts'))
+            .where(text('user_fts MATCH :match').bindparams(match=match))
+        )
+
+    pattern = _like_pattern(q)
+    return or_(User.name.ilike(pattern, escape='\\'), User.email.ilike(pattern, escape='\\'))
+
+
+def search_users(q=None, role=None, is_admin=None, after=None, before=None, per_page=50):
+    """
+    Return (users, prev_cursor, next_cursor) for one page ordered by id.
+
+    `after` returns the page following that id, `before` the page preceding
+    it. Cursors are None when there is nothing further in that direction.
+    """
+    stmt = select(User)
+    if role:
+        stmt = stmt.where(User.role == role)
+    if is_admin is not None:
+        stmt = stmt.where(User.is_admin == is_admin)
+
+    q = (q or '').strip()
+    if q:
+        condition = _search_condition(q)
+        if condition is None:
+            return [], None, None
+        stmt = stmt.where(condition)
+
+    # Fetch one extra row to know whether another page exists without a COUNT(*)
+    if before is not None:
+        rows = db.session.scalars(
+            stmt.where(User.id < before).order_by(User.id.desc()).limit(per_page + 1)
+        ).all()
+        has_more = len(rows) > per_page
+        users = list(reversed(rows[:per_page]))
+        prev_cursor = users[0].id if has_more and users else None
+        next_cursor = users[-1].id if users else None
+    else:
+        if after is not None:
+            stmt = stmt.where(User.id > after)
+        rows = db.session.scalars(stmt.order_by(User.id).limit(per_page + 1)).all()
+        has_more = len(rows) > per_page
+        users = rows[:per_page]
+        prev_cursor = users[0].id if after is not None and users else None
+        next_cursor = users[-1].id if has_more else None
+
+    return users, prev_cursor, next_cursor
+
+
+STAFF_ROLES = ('admin', 'instructor')
+
+
+def search_instructors(q, limit=10):
+    """Staff users whose name or email starts with `q`, for the instructor autocomplete."""
+    stmt = select(User.id, User.name, User.email).where(User.role.in_(STAFF_ROLES))
+
+    q = (q or '').strip()
+    if q:
+        pattern = f'{_escape_like(q)}%'
+        stmt = stmt.where(or_(User.name.ilike(pattern, escape='\\'), User.email.ilike(pattern, escape='\\')))
+
+    return db.session.execute(stmt.order_by(User.name, User.id).limit(limit)).all()
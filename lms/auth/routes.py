@@ -2,12 +2,14 @@
 
 from flask import render_template, redirect, url_for, flash, request, current_app, session
 from flask_login import login_user, logout_user, login_required, current_user
-from lms import db, bcrypt
+from lms import db
+from lms.passwords import password_hasher
+from lms.ratelimit import limit_attempts
 from lms.models import User
 from .forms import RegisterForm, LoginForm, ForgotPasswordForm, ResetPasswordForm
 from . import auth
 from lms.utils import send_reset_email
-from datetime import date, timedelta
+from datetime import date
 
 
 
@@ -23,8 +25,8 @@ def register():
     form = RegisterForm()
     # Check if form was submitted and passed validation
     if form.validate_on_submit():
-        # Hash the password for security
-        hashed_pw = bcrypt.generate_password_hash(form.password.data).decode('utf-8')
+        # Hash the password for security (runs in the bounded bcrypt pool)
+        hashed_pw = password_hasher.hash(form.password.data)
         
         # Check if user entered the correct admin signup code
         is_admin_user = (form.admin_code.data == current_app.config.get('ADMIN_SIGNUP_CODE'))
@@ -66,6 +68,7 @@ def register():
 # Login route (Complete and Corrected)
 # ---------------------------
 @auth.route('/login', methods=['GET', 'POST'])
+@limit_attempts('login')
 def login():
     # Redirect if already logged in
     if current_user.is_authenticated:
@@ -79,7 +82,12 @@ def login():
         user = User.query.filter_by(email=form.email.data).first()
         
         # Verify credentials using bcrypt
-        if user and bcrypt.check_password_hash(user.password, form.password.data):
+        if user and password_hasher.check(user.password, form.password.data):
+            # Transparently upgrade hashes made with an old BCRYPT_LOG_ROUNDS;
+            # committed together with the streak update below
+            if password_hasher.needs_rehash(user.password):
+                user.password = password_hasher.hash(form.password.data)
+
             # Make the session permanent so PERMANENT_SESSION_LIFETIME applies
             session.permanent = True
 
@@ -89,26 +97,10 @@ def login():
                 "login_user called for id=%s; session keys=%s", user.id, list(session.keys())
             )
 
-            # --- DAILY LOGIN STREAK LOGIC (Streamlined) ---
+            # --- DAILY LOGIN STREAK ---
+            # Single conditional UPDATE ... RETURNING, so concurrent logins can't race
             try:
-                today = date.today()
-                last_active = user.streak_last_active
-                current_streak = user.login_streak
-
-                # State 1: New/Reset Streak (First login, or missed a day/more)
-                # Check if last_active is None OR if the last login was more than 1 day ago
-                if last_active is None or last_active < today - timedelta(days=1):
-                    user.login_streak = 1
-                    user.streak_last_active = today
-                    
-                # State 2: Continued Streak (Logged in exactly yesterday)
-                elif last_active == today - timedelta(days=1):
-                    user.login_streak = current_streak + 1
-                    user.streak_last_active = today
-                    
-                # State 3: Already Active Today (last_active == today)
-                # No change needed; the streak is maintained but not incremented.
-
+                user.record_daily_login()
                 db.session.commit()
                 
             except Exception as e:
@@ -158,6 +150,7 @@ def logout():
 # Forgot password route (initiates reset)
 # ---------------------------
 @auth.route("/forgot_password", methods=['GET', 'POST'])
+@limit_attempts('reset')
 def forgot_password():
     # Logged-in users don't need to reset their password
     if current_user.is_authenticated:
@@ -202,8 +195,7 @@ def reset_token(token):
     
     if form.validate_on_submit():
         # Hash and update the user's new password
-        hashed_password = bcrypt.generate_password_hash(form.password.data).decode('utf-8')
-        user.password_hash = hashed_password
+        user.password = password_hasher.hash(form.password.data)
         db.session.commit()
         
         # Notify success and redirect to login
@@ -0,0 +1,387 @@
+# lms/bench.py
+
+"""
+In-process benchmarks driven through Flask's test client.
+
+Everything runs inside one process, so results are per gunicorn worker.
+`seed_data` fills the database with synthetic users, courses and activity
+(all tagged with a bench- prefix) so `benchmark_endpoints` can measure the
+main pages at realistic volumes.
+"""
+
+import logging
+import random
+import statistics
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import delete, func, select, text
+
+from lms.extensions import db
+from lms.models import Course, Enrollment, Lesson, LessonCompletion, Message, Module, User
+from lms.passwords import password_hasher
+from lms.query_stats import query_stats_recorded
+
+
+BENCH_PASSWORD = 'bench-password'
+BENCH_EMAIL_DOMAIN = '@bench.example.com'
+BENCH_COURSE_PREFIX = 'bench-course-'
+
+
+@contextmanager
+def _bench_config(app):
+    """Measure the app itself: no CSRF tokens, login throttle or failing query budgets."""
+    overrides = {'WTF_CSRF_ENABLED': False, 'RATELIMIT_ENABLED': False, 'QUERY_BUDGET_MODE': 'warn'}
+    saved = {key: app.config[key] for key in overrides if key in app.config}
+    app.config.update(overrides)
+    try:
+        yield
+    finally:
+        for key in overrides:
+            app.config.pop(key, None)
+        app.config.update(saved)
+
+
+def benchmark_logins(concurrency=4, duration=10.0):
+    """
+    Hammer auth.login with `concurrency` threads for `duration` seconds
+    using a throwaway account, and report logins per second.
+    """
+    app = current_app._get_current_object()
+    password = uuid.uuid4().hex
+    user = User(
+        name='Login Benchmark',
+        email=f'bench-login-{uuid.uuid4().hex[:8]}@example.com',
+        password=password_hasher.hash(password),
+        role='student'
+    )
+    db.session.add(user)
+    db.session.commit()
+    user_id, email = user.id, user.email
+
+    counts = {'ok': 0, 'rejected': 0, 'failed': 0}
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def run():
+        while time.monotonic() < deadline:
+            # Fresh client per login: an authenticated client is redirected away
+            client = app.test_client()
+            response = client.post('/auth/login', data={'email': email, 'password': password})
+            if response.status_code == 302 and '/auth/login' not in response.headers.get('Location', ''):
+                key = 'ok'
+            elif response.status_code in (429, 503):
+                key = 'rejected'
+            else:
+                key = 'failed'
+            with lock:
+                counts[key] += 1
+
+    started = time.monotonic()
+    try:
+        # Measure hashing/DB throughput, not the login throttle
+        with _bench_config(app):
+            threads = [threading.Thread(target=run) for _ in range(concurrency)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+    finally:
+        elapsed = time.monotonic() - started
+        db.session.execute(db.delete(User).where(User.id == user_id))
+        db.session.commit()
+
+    return {
+        'benchmark': 'login',
+        'concurrency': concurrency,
+        'bcrypt_log_rounds': password_hasher.log_rounds,
+        'hash_workers': password_hasher.workers,
+        'seconds': round(elapsed, 3),
+        'logins': counts['ok'],
+        'rejected': counts['rejected'],
+        'failed': counts['failed'],
+        'logins_per_second_per_worker': round(counts['ok'] / elapsed, 2) if elapsed else 0.0,
+    }
+
+
+# ------------------------------------------------------------------
+# Synthetic data
+# ------------------------------------------------------------------
+
+def _insert(model, rows):
+    if rows:
+        db.session.execute(model.__table__.insert(), rows)
+
+
+def _flush_batches(model, rows, batch_size):
+    """Insert generated rows in batches of `batch_size`; returns the row count."""
+    batch, total = [], 0
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            _insert(model, batch)
+            total += len(batch)
+            batch = []
+    _insert(model, batch)
+    db.session.commit()
+    return total + len(batch)
+
+
+def bench_data_exists():
+    return db.session.execute(
+        select(func.count(Course.id)).where(Course.slug.startswith(BENCH_COURSE_PREFIX))
+    ).scalar() > 0
+
+
+def clear_bench_data():
+    """Delete everything seed_data created (child rows go via ON DELETE CASCADE)."""
+    db.session.execute(delete(Course).where(Course.slug.startswith(BENCH_COURSE_PREFIX)))
+    db.session.execute(delete(User).where(User.email.endswith(BENCH_EMAIL_DOMAIN)))
+    db.session.commit()
+
+
+def seed_data(users=1000, courses=20, modules=5, lessons=6, enrollments_per_user=3,
+              completion_rate=0.5, messages=5000, batch_size=5000, seed=0):
+    """
+    Bulk-insert synthetic data: `users` students (plus one instructor per
+    five courses), `courses` published courses of modules x lessons, each
+    student enrolled in `enrollments_per_user` random courses having
+    completed roughly `completion_rate` of their lessons, and `messages`
+    instructor-to-student messages. Every account's password is
+    BENCH_PASSWORD. Returns the row counts inserted.
+    """
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    pw_hash = password_hasher.hash(BENCH_PASSWORD)
+    counts = {}
+
+    def person(kind, i, role):
+        return {
+            'name': f'Bench {kind.title()} {i}', 'email': f'{kind}{i}{BENCH_EMAIL_DOMAIN}',
+            'password': pw_hash, 'role': role, 'is_admin': False,
+            'bio': '', 'location': '', 'login_streak': 0,
+        }
+
+    n_instructors = max(1, courses // 5)
+    counts['instructors'] = _flush_batches(
+        User, (person('instructor', i, 'instructor') for i in range(n_instructors)), batch_size)
+    counts['users'] = _flush_batches(
+        User, (person('student', i, 'student') for i in range(users)), batch_size)
+
+    instructor_ids = db.session.scalars(
+        select(User.id).where(User.email.endswith(BENCH_EMAIL_DOMAIN), User.role == 'instructor').order_by(User.id)
+    ).all()
+    student_ids = db.session.scalars(
+        select(User.id).where(User.email.endswith(BENCH_EMAIL_DOMAIN), User.role == 'student').order_by(User.id)
+    ).all()
+
+    counts['courses'] = _flush_batches(Course, ({
+        'title': f'Bench Course {c}', 'slug': f'{BENCH_COURSE_PREFIX}{c}',
+        'description': 'Synthetic course for benchmarks. ' * 4, 'published': True,
+        'level': rng.choice(['Beginner', 'Intermediate', 'Advanced']), 'category': 'Benchmark',
+        'instructor_id': instructor_ids[c % len(instructor_ids)], 'created_at': now, 'updated_at': now,
+    } for c in range(courses)), batch_size)
+    course_ids = db.session.scalars(
+        select(Course.id).where(Course.slug.startswith(BENCH_COURSE_PREFIX)).order_by(Course.id)
+    ).all()
+
+    counts['modules'] = _flush_batches(Module, ({
+        'title': f'Module {m + 1}', 'order': m + 1, 'course_id': course_id,
+        'created_at': now, 'updated_at': now,
+    } for course_id in course_ids for m in range(modules)), batch_size)
+    module_rows = db.session.execute(
+        select(Module.id, Module.course_id).where(Module.course_id.in_(course_ids)).order_by(Module.id)
+    ).all()
+
+    counts['lessons'] = _flush_batches(Lesson, ({
+        'title': f'Lesson {l + 1}', 'slug': f'bench-m{module_id}-l{l + 1}', 'order': l + 1,
+        'content_url': 'https://www.youtube.com/watch?v=dQw4w9WgXcQ', 'description': 'Lesson notes. ' * 10,
+        'duration': '10:00', 'module_id': module_id, 'created_at': now, 'updated_at': now,
+    } for module_id, _ in module_rows for l in range(lessons)), batch_size)
+
+    course_lessons = {course_id: [] for course_id in course_ids}
+    for lesson_id, course_id in db.session.execute(
+        select(Lesson.id, Module.course_id).join(Module, Lesson.module_id == Module.id)
+        .where(Module.course_id.in_(course_ids)).order_by(Module.course_id, Module.order, Lesson.order)
+    ):
+        course_lessons[course_id].append(lesson_id)
+
+    per_user = min(enrollments_per_user, len(course_ids))
+    plan = [(user_id, rng.sample(course_ids, per_user)) for user_id in student_ids]
+
+    def enrollments():
+        for user_id, enrolled in plan:
+            for course_id in enrolled:
+                total = len(course_lessons[course_id])
+                done = total and round(total * completion_rate) == total
+                yield {
+                    'user_id': user_id, 'course_id': course_id,
+                    'date_enrolled': now - timedelta(days=rng.randint(0, 365)),
+                    'completed': bool(done), 'date_completed': now if done else None,
+                }
+
+    def completions():
+        for user_id, enrolled in plan:
+            for course_id in enrolled:
+                lesson_ids = course_lessons[course_id]
+                for lesson_id in lesson_ids[:round(len(lesson_ids) * completion_rate)]:
+                    yield {'user_id': user_id, 'lesson_id': lesson_id,
+                           'completed_at': now - timedelta(minutes=rng.randint(0, 525600))}
+
+    counts['enrollments'] = _flush_batches(Enrollment, enrollments(), batch_size)
+    counts['completions'] = _flush_batches(LessonCompletion, completions(), batch_size)
+
+    course_instructor = dict(zip(course_ids, (instructor_ids[c % len(instructor_ids)] for c in range(courses))))
+
+    def message_rows():
+        for i in range(messages if plan else 0):
+            user_id, enrolled = plan[rng.randrange(len(plan))]
+            created = now - timedelta(minutes=rng.randint(0, 525600))
+            is_read = rng.random() < 0.6
+            yield {
+                'sender_id': course_instructor[enrolled[0]], 'receiver_id': user_id,
+                'subject': f'Bench message {i}', 'content': 'Synthetic message body. ' * 5,
+                'is_read': is_read, 'read_at': created if is_read else None,
+                'created_at': created, 'updated_at': created, 'is_deleted': False,
+            }
+
+    counts['messages'] = _flush_batches(Message, message_rows(), batch_size)
+
+    # Fresh planner statistics, as production would have
+    db.session.execute(text('ANALYZE'))
+    db.session.commit()
+    return counts
+
+
+# ------------------------------------------------------------------
+# Endpoint latency
+# ------------------------------------------------------------------
+
+def _percentile(samples, pct):
+    if len(samples) == 1:
+        return samples[0]
+    return statistics.quantiles(samples, n=100, method='inclusive')[pct - 1]
+
+
+def _bench_targets():
+    """Pick the student, instructor and URLs to drive, preferring seeded data."""
+    bench_users = User.email.endswith(BENCH_EMAIL_DOMAIN)
+    if not db.session.execute(select(func.count(User.id)).where(bench_users)).scalar():
+        raise RuntimeError("No benchmark data found; run `flask bench seed` first.")
+
+    # The busiest roster and an enrolled student with the most messages
+    course_id, instructor_id = db.session.execute(
+        select(Course.id, Course.instructor_id)
+        .join(Enrollment, Enrollment.course_id == Course.id)
+        .where(Course.slug.startswith(BENCH_COURSE_PREFIX))
+        .group_by(Course.id, Course.instructor_id)
+        .order_by(func.count(Enrollment.id).desc())
+        .limit(1)
+    ).one()
+    student_id = db.session.execute(
+        select(Enrollment.user_id)
+        .join(Message, Message.receiver_id == Enrollment.user_id, isouter=True)
+        .where(Enrollment.course_id == course_id)
+        .group_by(Enrollment.user_id)
+        .order_by(func.count(Message.id).desc(), Enrollment.user_id)
+        .limit(1)
+    ).scalar_one()
+    course_slug, lesson_slug = db.session.execute(
+        select(Course.slug, Lesson.slug)
+        .join(Module, Module.course_id == Course.id)
+        .join(Lesson, Lesson.module_id == Module.id)
+        .where(Course.id == course_id)
+        .order_by(Module.order, Lesson.order)
+        .limit(1)
+    ).one()
+
+    student = db.session.get(User, student_id).email
+    instructor = db.session.get(User, instructor_id).email
+    return [
+        ('catalog', student, '/courses/'),
+        ('dashboard', student, '/dashboard'),
+        ('lesson_player', student, f'/courses/{course_slug}/lessons/{lesson_slug}'),
+        ('inbox', student, '/messages/inbox'),
+        ('instructor_roster', instructor, f'/instructor/course/{course_id}/students'),
+    ]
+
+
+def benchmark_endpoints(requests=50, warmup=3):
+    """
+    Drive the main pages through the test client and report latency
+    percentiles (ms) and queries per request for each, as a dict.
+    """
+    app = current_app._get_current_object()
+    targets = _bench_targets()
+    db.session.remove()
+
+    query_counts = []
+
+    def on_recorded(sender, stats, **kwargs):
+        query_counts.append(stats.count)
+
+    results = {}
+
+    def drive():
+        clients = {}
+        for name, email, path in targets:
+            client = clients.get(email)
+            if client is None:
+                client = clients[email] = app.test_client()
+                client.post('/auth/login', data={'email': email, 'password': BENCH_PASSWORD})
+
+            for _ in range(warmup):
+                client.get(path)
+            del query_counts[:]
+
+            timings, statuses = [], set()
+            for _ in range(requests):
+                started = time.perf_counter()
+                response = client.get(path)
+                timings.append((time.perf_counter() - started) * 1000)
+                statuses.add(response.status_code)
+
+            results[name] = {
+                'path': path,
+                'status': sorted(statuses),
+                'requests': requests,
+                'p50_ms': round(_percentile(timings, 50), 2),
+                'p95_ms': round(_percentile(timings, 95), 2),
+                'p99_ms': round(_percentile(timings, 99), 2),
+                'mean_ms': round(statistics.fmean(timings), 2),
+                'queries': max(query_counts) if query_counts else None,
+            }
+
+    quiet = logging.getLogger('lms.query_stats')
+    saved_level = quiet.level
+    quiet.setLevel(logging.ERROR)
+    query_stats_recorded.connect(on_recorded, app)
+    try:
+        with _bench_config(app):
+            # A fresh thread has no app context, so each request gets its own `g`
+            # (and login state) instead of sharing the CLI's
+            thread = threading.Thread(target=drive, name='bench-endpoints')
+            thread.start()
+            thread.join()
+    finally:
+        query_stats_recorded.disconnect(on_recorded, app)
+        quiet.setLevel(saved_level)
+
+    if len(results) != len(targets):
+        raise RuntimeError("Endpoint benchmark failed; see the log for the exception.")
+
+    return {
+        'benchmark': 'endpoints',
+        'database': db.engine.dialect.name,
+        'rows': {
+            'users': db.session.execute(select(func.count(User.id))).scalar(),
+            'enrollments': db.session.execute(select(func.count(Enrollment.id))).scalar(),
+            'completions': db.session.execute(select(func.count(LessonCompletion.id))).scalar(),
+            'messages': db.session.execute(select(func.count(Message.id))).scalar(),
+        },
+        'results': results,
+    }
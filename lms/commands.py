@@ -15,3 +15,217 @@ def promote_admin(email):
     user.is_admin = True
     db.session.commit()
     click.echo(f"{user.email} is now an admin.")
+
+
+@click.group("messages")
+def messages_cli():
+    """Message retention and maintenance commands."""
+
+
+@messages_cli.command("archive")
+@click.option("--older-than", "older_than", type=int, default=None,
+              help="Also archive messages created more than this many days ago "
+                   "(defaults to MESSAGE_RETENTION_DAYS).")
+@click.option("--include-deleted/--skip-deleted", default=True,
+              help="Archive soft-deleted messages regardless of age.")
+@click.option("--batch-size", type=int, default=1000, show_default=True)
+@with_appcontext
+def archive_messages_command(older_than, include_deleted, batch_size):
+    """Move soft-deleted and old messages into messages_archive."""
+    from flask import current_app
+    from lms.messaging.archive import archive_messages
+
+    if older_than is None:
+        older_than = current_app.config.get('MESSAGE_RETENTION_DAYS')
+
+    total = 0
+    for moved in archive_messages(older_than, include_deleted, batch_size):
+        total += moved
+        click.echo(f"Archived {total} messages...")
+    click.echo(f"Done. {total} messages archived.")
+
+
+@messages_cli.command("partition")
+@click.option("--months-ahead", type=int, default=3, show_default=True)
+@with_appcontext
+def partition_messages_command(months_ahead):
+    """(PostgreSQL) Partition messages by month and pre-create partitions."""
+    from lms.messaging.archive import partition_messages
+
+    try:
+        names = partition_messages(months_ahead)
+    except RuntimeError as e:
+        click.echo(str(e))
+        return
+    click.echo(f"Partitions ready: {', '.join(names)}")
+
+
+@click.group("bench")
+def bench_cli():
+    """Performance benchmarks (run against a non-production database)."""
+
+
+@bench_cli.command("login")
+@click.option("--concurrency", type=int, default=4, show_default=True,
+              help="Concurrent login threads (like gthread worker threads).")
+@click.option("--seconds", type=float, default=10.0, show_default=True)
+@with_appcontext
+def bench_login_command(concurrency, seconds):
+    """Measure logins per second for a single worker process."""
+    import json
+    from lms.bench import benchmark_logins
+
+    result = benchmark_logins(concurrency=concurrency, duration=seconds)
+    click.echo(json.dumps(result, indent=2))
+
+
+@bench_cli.command("seed")
+@click.option("--users", type=int, default=1000, show_default=True, help="Students to create.")
+@click.option("--courses", type=int, default=20, show_default=True)
+@click.option("--modules", type=int, default=5, show_default=True, help="Modules per course.")
+@click.option("--lessons", type=int, default=6, show_default=True, help="Lessons per module.")
+@click.option("--enrollments-per-user", type=int, default=3, show_default=True)
+@click.option("--completion-rate", type=float, default=0.5, show_default=True,
+              help="Fraction of each enrolled course's lessons completed.")
+@click.option("--messages", type=int, default=5000, show_default=True)
+@click.option("--batch-size", type=int, default=5000, show_default=True, help="Rows per INSERT batch.")
+@click.option("--seed", type=int, default=0, show_default=True, help="Random seed.")
+@click.option("--reset", is_flag=True, help="Delete existing benchmark data first.")
+@with_appcontext
+def bench_seed_command(reset, **options):
+    """
+    Bulk-insert synthetic benchmark data.
+
+    Completions = users x enrollments-per-user x modules x lessons x completion-rate,
+    so --users 100000 gives 4.5M with the other defaults (--enrollments-per-user 1
+    for 1.5M).
+    """
+    import json
+    from lms.bench import bench_data_exists, clear_bench_data, seed_data
+
+    if bench_data_exists():
+        if not reset:
+            raise click.ClickException("Benchmark data already exists; pass --reset to replace it.")
+        clear_bench_data()
+
+    result = seed_data(**options)
+    click.echo(json.dumps(result, indent=2))
+
+
+@bench_cli.command("run")
+@click.option("--requests", "n_requests", type=int, default=50, show_default=True,
+              help="Timed requests per endpoint.")
+@click.option("--warmup", type=int, default=3, show_default=True)
+@click.option("--output", type=click.File("w"), default="-", help="Write the JSON report here.")
+@with_appcontext
+def bench_run_command(n_requests, warmup, output):
+    """Report p50/p95/p99 latency and query counts for the main pages as JSON."""
+    import json
+    from lms.bench import benchmark_endpoints
+
+    try:
+        result = benchmark_endpoints(requests=n_requests, warmup=warmup)
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+    output.write(json.dumps(result, indent=2) + "\n")
+
+
+@click.command("mail-worker")
+@click.option("--batch-size", type=int, default=50, show_default=True)
+@click.option("--poll-interval", type=float, default=5.0, show_default=True,
+              help="Seconds to sleep when the outbox is empty.")
+@click.option("--once", is_flag=True, help="Send everything that is due, then exit.")
+@with_appcontext
+def mail_worker(batch_size, poll_interval, once):
+    """Send queued outbound email over a persistent SMTP connection."""
+    import logging
+    from lms.mail_queue import run_worker
+
+    logging.basicConfig(level=logging.INFO)
+    click.echo("Mail worker started.")
+    run_worker(batch_size=batch_size, poll_interval=poll_interval, once=once)
+
+
+@click.command("jobs-worker")
+@click.option("--poll-interval", type=float, default=5.0, show_default=True,
+              help="Seconds to sleep when no job is due.")
+@click.option("--once", is_flag=True, help="Run every job that is due, then exit.")
+@with_appcontext
+def jobs_worker(poll_interval, once):
+    """Run queued background jobs (course purges, large user imports)."""
+    import logging
+    from lms.jobs import run_worker
+
+    logging.basicConfig(level=logging.INFO)
+    click.echo("Jobs worker started.")
+    run_worker(poll_interval=poll_interval, once=once)
+
+
+@click.group("users")
+def users_cli():
+    """User maintenance commands."""
+
+
+@users_cli.command("reset-streaks")
+@with_appcontext
+def reset_streaks_command():
+    """Zero login streaks that lapsed before yesterday (run nightly)."""
+    count = User.reset_lapsed_streaks()
+    db.session.commit()
+    click.echo(f"Reset {count} lapsed login streaks.")
+
+
+@users_cli.command("import")
+@click.argument("csv_path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--batch-size", type=int, default=None,
+              help="Rows per transaction (defaults to USER_IMPORT_BATCH_SIZE).")
+@click.option("--workers", type=int, default=None,
+              help="bcrypt processes (defaults to USER_IMPORT_WORKERS, then all cores).")
+@with_appcontext
+def import_users_command(csv_path, batch_size, workers):
+    """Create users (and optional enrollments) from a CSV file."""
+    from lms.admin.user_import import UserImportError, import_users
+
+    totals = {'created': 0, 'skipped': 0, 'enrollments': 0, 'errors': 0}
+    try:
+        with open(csv_path, 'rb') as f:
+            for stats in import_users(f, batch_size=batch_size, workers=workers):
+                for line, reason in stats['errors']:
+                    click.echo(f"line {line}: {reason}", err=True)
+                for key in ('created', 'skipped', 'enrollments'):
+                    totals[key] += stats[key]
+                totals['errors'] += len(stats['errors'])
+                click.echo(f"... {totals['created']} created, {totals['skipped']} skipped")
+    except UserImportError as e:
+        raise click.ClickException(str(e))
+
+    click.echo(
+        f"Imported {totals['created']} users ({totals['skipped']} already existed), "
+        f"{totals['enrollments']} enrollments, {totals['errors']} rows with errors."
+    )
+
+
+@users_cli.command("enroll")
+@click.option("--course", "course_ids", type=int, multiple=True, required=True,
+              help="Course id to enroll into (repeatable).")
+@click.option("--file", "users_file", type=click.File("r"), default=None,
+              help="File with one user id or email per line.")
+@click.argument("users", nargs=-1)
+@with_appcontext
+def enroll_users_command(course_ids, users_file, users):
+    """Enroll users (ids or emails) into courses in one statement."""
+    from lms.admin.cohorts import enroll_cohort, parse_user_refs
+
+    refs = list(users) + (users_file.read().splitlines() if users_file else [])
+    user_ids, emails = parse_user_refs(refs)
+    if not (user_ids or emails):
+        raise click.UsageError("Give at least one user id or email.")
+
+    result = enroll_cohort(user_ids, emails, course_ids)
+    db.session.commit()
+
+    for ref in result['unknown_users']:
+        click.echo(f"unknown user: {ref}", err=True)
+    for course_id in result['unknown_courses']:
+        click.echo(f"unknown course: {course_id}", err=True)
+    click.echo(f"Enrolled {result['enrolled']} ({result['already_enrolled']} already enrolled).")
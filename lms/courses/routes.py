@@ -1,6 +1,6 @@
 # lms/courses/routes.py
 
-from flask import render_template, redirect, url_for, flash, request, current_app
+from flask import render_template, redirect, url_for, flash, request, current_app, jsonify, make_response
 from flask_login import login_required, current_user
 from lms import db
 from lms.models.course import Course
@@ -9,8 +9,9 @@ from . import courses
 from lms.models.module import Module
 from lms.models.lesson import Lesson
 from lms.models.lesson_completion import LessonCompletion 
+from lms.upsert import insert_ignore
 from sqlalchemy.orm import joinedload
-from sqlalchemy import select
+from sqlalchemy import delete, select
 from datetime import datetime
 import json # <--- ADDED: Import json module
 
@@ -90,17 +91,17 @@ def enroll(slug):
     """Enroll the current user in a course."""
     course = Course.query.filter_by(slug=slug, published=True).first_or_404()
 
-    # Check if already enrolled
-    existing = Enrollment.query.filter_by(user_id=current_user.id, course_id=course.id).first()
-    if existing:
+    # One INSERT ... ON CONFLICT DO NOTHING; a double-click can't create a second row
+    result = db.session.execute(
+        insert_ignore(Enrollment, ['user_id', 'course_id'])
+        .values(user_id=current_user.id, course_id=course.id)
+    )
+    db.session.commit()
+
+    if result.rowcount == 0:
         flash('You are already enrolled in this course.', 'info')
         return redirect(url_for('courses.course_detail', slug=slug))
 
-    # Create new enrollment record
-    enrollment = Enrollment(user_id=current_user.id, course_id=course.id)
-    db.session.add(enrollment)
-    db.session.commit()
-
     flash('You have successfully enrolled in this course!', 'success')
     return redirect(url_for('courses.course_lessons', slug=slug))
 
@@ -160,13 +161,13 @@ def course_lesson(course_slug, lesson_slug):
     ).scalar_one_or_none()
     
     if not course:
-        return redirect(url_for('courses.index'))
+        return fragment_redirect(url_for('courses.index'), 404)
 
     enrollment = Enrollment.query.filter_by(user_id=current_user.id, course_id=course.id).first()
 
     if not enrollment:
         flash('You must enroll in this course to view the lessons.', 'warning')
-        return redirect(url_for('courses.course_detail', slug=course.slug))
+        return fragment_redirect(url_for('courses.course_detail', slug=course.slug), 403)
 
     # Find the specific lesson
     lesson = Lesson.query.filter_by(slug=lesson_slug).first_or_404()
@@ -177,18 +178,61 @@ def course_lesson(course_slug, lesson_slug):
         lesson_id=lesson.id
     ).first() is not None
     
-    # Get all modules for the sidebar
-    modules = course.modules.order_by(Module.order).all()
-
-    return render_template(
-        'courses/course_lesson.html',
+    completed_lessons, total_lessons = enrollment.progress_counts()
+    progress = int((completed_lessons / total_lessons) * 100) if total_lessons > 0 else 0
+
+    # Previous/next previews come from one ordered query over the course outline
+    outline = db.session.execute(
+        select(Lesson.slug, Lesson.content_url)
+        .join(Module, Lesson.module_id == Module.id)
+        .where(Module.course_id == course.id)
+        .order_by(Module.order, Module.id, Lesson.order, Lesson.id)
+    ).all()
+    index = next((i for i, row in enumerate(outline) if row.slug == lesson.slug), -1)
+    prev_lesson = outline[index - 1] if index > 0 else None
+    next_lesson = outline[index + 1] if 0 <= index < len(outline) - 1 else None
+
+    context = dict(
         course=course,
         current_lesson=lesson,
-        modules=modules,
         is_complete=is_complete,
-        enrollment=enrollment
+        enrollment=enrollment,
+        progress=progress,
+        prev_lesson=prev_lesson,
+        next_lesson=next_lesson
     )
 
+    # Lesson switches from the sidebar only need the player and notes
+    if wants_fragment():
+        response = make_response(render_template('courses/_lesson_player.html', **context))
+    else:
+        # Get all modules for the sidebar
+        modules = course.modules.order_by(Module.order).all()
+        response = make_response(render_template('courses/course_lesson.html', modules=modules, **context))
+
+    response.vary.update(('HX-Request', 'X-Partial'))
+    return response
+
+
+def wants_fragment():
+    """True for htmx (HX-Request) or fetch (X-Partial) requests asking for a page fragment."""
+    return request.headers.get('HX-Request') == 'true' or bool(request.headers.get('X-Partial'))
+
+
+def fragment_redirect(location, status):
+    """
+    Redirect a full page load; answer a fragment request with `status` and an
+    HX-Redirect header instead, since fetch would follow a 302 and swap the
+    whole target page into the fragment's container.
+    """
+    if not wants_fragment():
+        return redirect(location)
+    response = make_response('', status)
+    response.headers['HX-Redirect'] = location
+    response.vary.update(('HX-Request', 'X-Partial'))
+    return response
+
+
 # -------------------------------
 #  Mark Lesson as Complete
 # -------------------------------
@@ -197,18 +241,15 @@ def course_lesson(course_slug, lesson_slug):
 def mark_lesson_complete(lesson_slug):
     lesson = Lesson.query.filter_by(slug=lesson_slug).first_or_404()
 
-    # Check if already marked
-    completion = LessonCompletion.query.filter_by(
-        user_id=current_user.id,
-        lesson_id=lesson.id
-    ).first()
+    result = db.session.execute(
+        insert_ignore(LessonCompletion, ['user_id', 'lesson_id'])
+        .values(user_id=current_user.id, lesson_id=lesson.id)
+    )
+    db.session.commit()
 
-    if completion:
+    if result.rowcount == 0:
         flash('This lesson is already marked as complete.', 'info')
     else:
-        completion = LessonCompletion(user_id=current_user.id, lesson_id=lesson.id)
-        db.session.add(completion)
-        db.session.commit()
         flash('Lesson marked as complete!', 'success')
 
     # Update enrollment after marking completion
@@ -256,4 +297,63 @@ def unmark_lesson_complete(lesson_slug):
         'courses.course_lesson',
         course_slug=lesson.module.course.slug,
         lesson_slug=lesson.slug
-    ))
\ No newline at end of file
+    ))
+
+
+# -------------------------------
+#  Mark / Unmark Lesson (JSON, for in-place player updates)
+# -------------------------------
+@courses.route('/<lesson_slug>/completion', methods=['POST'])
+@login_required
+def lesson_completion(lesson_slug):
+    """
+    Set the current user's completion state for a lesson without a redirect.
+
+    Form field `completed` is "true" (default) or "false". The completion
+    write and the enrollment progress recompute share one transaction.
+    Returns {'success', 'completed', 'progress', 'course_completed'}.
+    """
+    row = db.session.execute(
+        select(Lesson.id, Module.course_id)
+        .join(Module, Lesson.module_id == Module.id)
+        .where(Lesson.slug == lesson_slug)
+    ).one_or_none()
+    if row is None:
+        return jsonify({'success': False, 'error': 'Lesson not found'}), 404
+    lesson_id, course_id = row
+
+    enrollment = Enrollment.query.filter_by(user_id=current_user.id, course_id=course_id).first()
+    if not enrollment:
+        return jsonify({'success': False, 'error': 'You must enroll in this course first'}), 403
+
+    completed = request.form.get('completed', 'true').lower() != 'false'
+
+    try:
+        if completed:
+            db.session.execute(
+                insert_ignore(LessonCompletion, ['user_id', 'lesson_id'])
+                .values(user_id=current_user.id, lesson_id=lesson_id)
+            )
+        else:
+            db.session.execute(
+                delete(LessonCompletion)
+                .where(
+                    LessonCompletion.user_id == current_user.id,
+                    LessonCompletion.lesson_id == lesson_id
+                )
+                .execution_options(synchronize_session=False)
+            )
+        progress = enrollment.update_progress()
+        course_completed = enrollment.completed
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.exception("Failed to update completion for lesson %s: %s", lesson_id, e)
+        return jsonify({'success': False, 'error': 'Could not update lesson progress'}), 500
+
+    return jsonify({
+        'success': True,
+        'completed': completed,
+        'progress': progress,
+        'course_completed': course_completed
+    })
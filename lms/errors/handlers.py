@@ -1,6 +1,8 @@
 from flask import render_template
 from flask_wtf.csrf import CSRFError
 from lms import db
+from lms.passwords import PasswordHasherBusy
+from lms.ratelimit import RateLimitExceeded
 
 
 def register_error_handlers(app):
@@ -20,6 +22,16 @@ def register_error_handlers(app):
             pass
         return render_template("errors/500.html"), 500
 
+    @app.errorhandler(PasswordHasherBusy)
+    def busy_error(e):
+        headers = {'Retry-After': str(e.retry_after)}
+        return render_template("errors/503.html"), 503, headers
+
+    @app.errorhandler(RateLimitExceeded)
+    def rate_limit_error(e):
+        headers = {'Retry-After': str(e.retry_after)}
+        return render_template("errors/429.html", retry_after=e.retry_after), 429, headers
+
     @app.errorhandler(CSRFError)
     def handle_csrf_error(e):
         return render_template("errors/csrf_error.html", reason=e.description), 400
@@ -0,0 +1,172 @@
+# lms/jobs.py
+
+"""
+Durable background jobs.
+
+Requests call enqueue_job(), which only inserts a BackgroundJob row in the
+request's transaction. `flask jobs-worker` claims due jobs one at a time
+(other workers skip locked rows on PostgreSQL) and runs the handler
+registered for the job's kind with @job_handler.
+
+While a handler runs, a heartbeat thread stamps the row every
+JOBS_HEARTBEAT_SECONDS. If the worker dies (deploy, OOM, restart), the
+heartbeat stops and after JOBS_LEASE_SECONDS the job is claimed again, so
+handlers must be safe to re-run: the course purge and the user import both
+commit in batches and skip work that is already done. Failures are retried
+with exponential backoff until JOBS_MAX_ATTEMPTS.
+"""
+
+import json
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import and_, or_, update
+
+from lms.extensions import db
+from lms.models import BackgroundJob
+
+
+logger = logging.getLogger(__name__)
+
+JOB_HANDLERS = {}
+# Kinds whose payload is cleared once the job is finished (e.g. CSVs with passwords)
+_SCRUB_PAYLOAD = set()
+
+
+def job_handler(kind, scrub_payload=False):
+    """Register the decorated function to run jobs of `kind`; it gets the payload as keyword arguments."""
+    def register(fn):
+        JOB_HANDLERS[kind] = fn
+        if scrub_payload:
+            _SCRUB_PAYLOAD.add(kind)
+        return fn
+    return register
+
+
+def enqueue_job(kind, **payload):
+    """Queue a job for the jobs worker. The caller commits the session."""
+    job = BackgroundJob(kind=kind, payload=json.dumps(payload))
+    db.session.add(job)
+    return job
+
+
+def _claim():
+    """Lock and mark running the next due job, or one whose worker stopped heartbeating."""
+    config = current_app.config
+    now = datetime.utcnow()
+    stale = now - timedelta(seconds=config.get('JOBS_LEASE_SECONDS', 120))
+
+    job = (
+        BackgroundJob.query
+        .filter(or_(
+            and_(BackgroundJob.status == BackgroundJob.STATUS_PENDING, BackgroundJob.next_attempt_at <= now),
+            and_(BackgroundJob.status == BackgroundJob.STATUS_RUNNING, BackgroundJob.heartbeat_at < stale),
+        ))
+        .order_by(BackgroundJob.next_attempt_at, BackgroundJob.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+        .first()
+    )
+    if job is None:
+        db.session.rollback()
+        return None
+
+    if job.status == BackgroundJob.STATUS_RUNNING:
+        logger.warning("Job %s (%s) lost its worker; running it again", job.id, job.kind)
+    job.status = BackgroundJob.STATUS_RUNNING
+    job.attempts += 1
+    job.heartbeat_at = now
+    db.session.commit()
+    return job
+
+
+class _Heartbeat:
+    """Stamps heartbeat_at on its own connection while a job runs."""
+
+    def __init__(self, job_id, interval):
+        self.engine = db.engine
+        self.job_id = job_id
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f'job-heartbeat-{job_id}', daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                with self.engine.begin() as conn:
+                    conn.execute(
+                        update(BackgroundJob)
+                        .where(BackgroundJob.id == self.job_id)
+                        .values(heartbeat_at=datetime.utcnow())
+                    )
+            except Exception:
+                logger.warning("Heartbeat for job %s failed", self.job_id, exc_info=True)
+
+
+def _record_failure(job_id, error):
+    config = current_app.config
+    job = db.session.get(BackgroundJob, job_id)
+    job.last_error = str(error)[:2000]
+    job.heartbeat_at = None
+    if job.attempts >= config.get('JOBS_MAX_ATTEMPTS', 5):
+        job.status = BackgroundJob.STATUS_FAILED
+        job.finished_at = datetime.utcnow()
+        if job.kind in _SCRUB_PAYLOAD:
+            job.payload = '{}'
+        logger.error("Giving up on job %s (%s) after %s attempts: %s", job.id, job.kind, job.attempts, error)
+    else:
+        delay = config.get('JOBS_BACKOFF_SECONDS', 60) * (2 ** (job.attempts - 1))
+        job.status = BackgroundJob.STATUS_PENDING
+        job.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+    db.session.commit()
+
+
+def run_job(job):
+    """Run a claimed job's handler and record the outcome. Returns True if it succeeded."""
+    job_id, kind = job.id, job.kind
+    handler = JOB_HANDLERS.get(kind)
+    try:
+        if handler is None:
+            raise LookupError(f"no handler registered for job kind '{kind}'")
+        with _Heartbeat(job_id, current_app.config.get('JOBS_HEARTBEAT_SECONDS', 30)):
+            handler(**json.loads(job.payload))
+    except Exception as e:
+        db.session.rollback()
+        logger.exception("Job %s (%s) failed", job_id, kind)
+        _record_failure(job_id, e)
+        return False
+
+    job = db.session.get(BackgroundJob, job_id)
+    job.status = BackgroundJob.STATUS_DONE
+    job.finished_at = datetime.utcnow()
+    job.heartbeat_at = None
+    job.last_error = None
+    if kind in _SCRUB_PAYLOAD:
+        job.payload = '{}'
+    db.session.commit()
+    return True
+
+
+def run_worker(poll_interval=5.0, once=False):
+    """Run jobs forever (or until none are due, with once=True)."""
+    while True:
+        job = _claim()
+        if job is not None:
+            logger.info("Running job %s (%s)", job.id, job.kind)
+            run_job(job)
+        db.session.remove()
+        if job is None:
+            if once:
+                return
+            time.sleep(poll_interval)
@@ -0,0 +1,144 @@
+# lms/mail_queue.py
+
+"""
+DB-backed outbound mail queue.
+
+Web requests call enqueue_email(), which only inserts an OutboundEmail row.
+`flask mail-worker` drains the queue in batches over a single SMTP
+connection, retrying failures with exponential backoff.
+"""
+
+import logging
+import smtplib
+import time
+from datetime import datetime, timedelta
+from email.utils import formataddr
+
+from flask import current_app
+from flask_mail import Message
+
+from lms.extensions import db
+from lms.models import OutboundEmail
+
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_email(subject, recipients, body, html=None, sender=None):
+    """Queue an email for the mail worker. The caller commits the session."""
+    sender = sender or current_app.config['MAIL_DEFAULT_SENDER']
+    if isinstance(sender, (tuple, list)):
+        sender = formataddr(tuple(sender))
+
+    email = OutboundEmail(
+        sender=sender,
+        recipients=', '.join(recipients),
+        subject=subject,
+        body=body,
+        html=html
+    )
+    db.session.add(email)
+    return email
+
+
+def _due_batch(batch_size):
+    """Lock the next batch of due mail (other workers skip locked rows on PostgreSQL)."""
+    return (
+        OutboundEmail.query
+        .filter(
+            OutboundEmail.status == OutboundEmail.STATUS_PENDING,
+            OutboundEmail.next_attempt_at <= datetime.utcnow()
+        )
+        .order_by(OutboundEmail.next_attempt_at, OutboundEmail.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+
+
+def _to_message(email):
+    return Message(
+        subject=email.subject,
+        sender=email.sender,
+        recipients=[r.strip() for r in email.recipients.split(',') if r.strip()],
+        body=email.body,
+        html=email.html
+    )
+
+
+def _record_failure(email, error, max_attempts, backoff):
+    email.attempts += 1
+    email.last_error = str(error)[:2000]
+    if email.attempts >= max_attempts:
+        email.status = OutboundEmail.STATUS_FAILED
+        logger.error("Giving up on email %s after %s attempts: %s", email.id, email.attempts, error)
+    else:
+        delay = backoff * (2 ** (email.attempts - 1))
+        email.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+
+
+def send_pending(batch_size=50, max_batches=None):
+    """
+    Send due mail until the queue is empty (or max_batches is reached),
+    reusing one SMTP connection for every batch. Returns (sent, failed).
+    """
+    from lms import mail
+
+    config = current_app.config
+    max_attempts = config.get('MAIL_QUEUE_MAX_ATTEMPTS', 5)
+    backoff = config.get('MAIL_QUEUE_BACKOFF_SECONDS', 30)
+    sent = failed = batches = 0
+
+    batch = _due_batch(batch_size)
+    if not batch:
+        db.session.rollback()
+        return sent, failed
+
+    with mail.connect() as conn:
+        while batch:
+            for email in batch:
+                try:
+                    conn.send(_to_message(email))
+                except smtplib.SMTPServerDisconnected as e:
+                    # Connection is gone: back this message off (it may be what the server
+                    # dropped us for) and leave the rest of the batch for a fresh connection
+                    _record_failure(email, e, max_attempts, backoff)
+                    db.session.commit()
+                    raise
+                except Exception as e:
+                    _record_failure(email, e, max_attempts, backoff)
+                    failed += 1
+                else:
+                    email.attempts += 1
+                    email.status = OutboundEmail.STATUS_SENT
+                    email.sent_at = datetime.utcnow()
+                    email.last_error = None
+                    sent += 1
+            db.session.commit()
+
+            batches += 1
+            if max_batches is not None and batches >= max_batches:
+                break
+            batch = _due_batch(batch_size)
+        db.session.rollback()
+
+    return sent, failed
+
+
+def run_worker(batch_size=50, poll_interval=5.0, once=False):
+    """Poll the outbox forever (or drain it once), reconnecting on SMTP errors."""
+    while True:
+        try:
+            sent, failed = send_pending(batch_size)
+            if sent or failed:
+                logger.info("Mail worker sent %s, failed %s", sent, failed)
+        except (smtplib.SMTPException, OSError):
+            db.session.rollback()
+            logger.exception("SMTP connection failed; retrying in %ss", poll_interval)
+            sent = failed = 0
+
+        db.session.remove()
+        if once:
+            return
+        if not (sent or failed):
+            time.sleep(poll_interval)
@@ -0,0 +1,189 @@
+# lms/messaging/archive.py
+
+"""
+Retention pipeline for the messages table.
+
+- archive_messages(): moves soft-deleted and old messages into
+  `messages_archive` in small batches (one transaction per batch).
+- partition_messages(): PostgreSQL only; turns `messages` into a table
+  range-partitioned by month on created_at and keeps partitions ahead of time.
+"""
+
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import delete, insert, literal, or_, select, text
+
+from lms.extensions import db
+from lms.models import Message, MessageArchive
+
+
+ARCHIVE_COLUMNS = [
+    'id', 'sender_id', 'receiver_id', 'content', 'subject',
+    'is_read', 'read_at', 'created_at', 'updated_at',
+    'is_deleted', 'deleted_at',
+]
+
+
+def archive_messages(older_than_days=None, include_deleted=True, batch_size=1000):
+    """
+    Move messages into the archive table, yielding the number moved per batch.
+
+    A message is archived if it is soft-deleted (when include_deleted) or was
+    created more than older_than_days ago. Each batch is copied and deleted
+    in its own transaction so locks stay short and memory stays bounded.
+    """
+    conditions = []
+    if include_deleted:
+        conditions.append(Message.is_deleted == True)
+    if older_than_days is not None:
+        cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+        conditions.append(Message.created_at < cutoff)
+    if not conditions:
+        return
+
+    source_columns = [Message.__table__.c[name] for name in ARCHIVE_COLUMNS]
+
+    while True:
+        ids = db.session.scalars(
+            select(Message.id)
+            .where(or_(*conditions))
+            .order_by(Message.id)
+            .limit(batch_size)
+        ).all()
+        if not ids:
+            break
+
+        try:
+            db.session.execute(
+                insert(MessageArchive).from_select(
+                    ARCHIVE_COLUMNS + ['archived_at'],
+                    select(*source_columns, literal(datetime.utcnow()))
+                    .where(Message.id.in_(ids))
+                )
+            )
+            db.session.execute(
+                delete(Message)
+                .where(Message.id.in_(ids))
+                .execution_options(synchronize_session=False)
+            )
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        yield len(ids)
+
+
+def _add_months(day, months):
+    month = day.month - 1 + months
+    return day.replace(year=day.year + month // 12, month=month % 12 + 1, day=1)
+
+
+def _is_partitioned(conn):
+    return conn.execute(text("""
+        SELECT EXISTS (
+            SELECT 1 FROM pg_partitioned_table p
+            JOIN pg_class c ON c.oid = p.partrelid
+            WHERE c.relname = 'messages'
+        )
+    """)).scalar()
+
+
+def _convert_to_partitioned(conn, boundary):
+    """
+    Swap `messages` for a partitioned parent and attach the existing table
+    as the partition holding everything created before `boundary`.
+    """
+    conn.execute(text("LOCK TABLE messages IN ACCESS EXCLUSIVE MODE"))
+    conn.execute(text("ALTER TABLE messages RENAME TO messages_legacy"))
+
+    # Free up index names (and drop FKs) so the parent can own them
+    legacy_indexes = conn.execute(text(
+        "SELECT indexname FROM pg_indexes WHERE tablename = 'messages_legacy'"
+    )).scalars().all()
+    for name in legacy_indexes:
+        conn.execute(text(f'ALTER INDEX "{name}" RENAME TO "{name[:55]}_legacy"'))
+
+    legacy_fks = conn.execute(text("""
+        SELECT conname FROM pg_constraint
+        WHERE conrelid = 'messages_legacy'::regclass AND contype = 'f'
+    """)).scalars().all()
+    for name in legacy_fks:
+        conn.execute(text(f'ALTER TABLE messages_legacy DROP CONSTRAINT "{name}"'))
+
+    conn.execute(text("""
+        CREATE TABLE messages (
+            LIKE messages_legacy INCLUDING DEFAULTS INCLUDING GENERATED
+        ) PARTITION BY RANGE (created_at)
+    """))
+    # Partitioned primary keys must include the partition key
+    conn.execute(text("ALTER TABLE messages ADD CONSTRAINT messages_pkey PRIMARY KEY (id, created_at)"))
+    conn.execute(text("ALTER SEQUENCE messages_id_seq OWNED BY messages.id"))
+    conn.execute(text("""
+        ALTER TABLE messages
+            ADD FOREIGN KEY (sender_id) REFERENCES "user" (id) ON DELETE CASCADE,
+            ADD FOREIGN KEY (receiver_id) REFERENCES "user" (id) ON DELETE CASCADE
+    """))
+    conn.execute(
+        text("ALTER TABLE messages ATTACH PARTITION messages_legacy "
+             "FOR VALUES FROM (MINVALUE) TO (:boundary)"),
+        {'boundary': boundary}
+    )
+
+    # Recreate model indexes on the parent (they cascade to every partition)
+    for index in Message.__table__.indexes:
+        index.create(bind=conn)
+    has_search = conn.execute(text("""
+        SELECT EXISTS (
+            SELECT 1 FROM information_schema.columns
+            WHERE table_name = 'messages' AND column_name = 'search_vector'
+        )
+    """)).scalar()
+    if has_search:
+        conn.execute(text("CREATE INDEX idx_messages_search ON messages USING GIN (search_vector)"))
+
+    # Old single-table indexes are now duplicates (keep the legacy primary key)
+    for name in legacy_indexes:
+        if name != 'messages_pkey':
+            conn.execute(text(f'DROP INDEX IF EXISTS "{name[:55]}_legacy"'))
+
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS messages_default PARTITION OF messages DEFAULT"
+    ))
+
+
+def partition_messages(months_ahead=3):
+    """
+    Ensure `messages` is partitioned by month and that partitions exist for
+    the next `months_ahead` months. Safe to run repeatedly (e.g. from cron).
+
+    Returns the names of the monthly partitions that were checked/created.
+    """
+    conn = db.session.connection()
+    if conn.dialect.name != 'postgresql':
+        raise RuntimeError('Message partitioning is only supported on PostgreSQL.')
+
+    this_month = date.today().replace(day=1)
+    next_month = _add_months(this_month, 1)
+
+    try:
+        if not _is_partitioned(conn):
+            # Existing rows (up to the end of this month) stay in one partition
+            _convert_to_partitioned(conn, next_month)
+
+        names = []
+        for offset in range(1, months_ahead + 1):
+            start = _add_months(this_month, offset)
+            end = _add_months(start, 1)
+            name = f"messages_{start:%Y_%m}"
+            conn.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF messages "
+                f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+            ))
+            names.append(name)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return names
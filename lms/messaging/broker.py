@@ -0,0 +1,212 @@
+# lms/messaging/broker.py
+
+"""
+Pub/sub used to push messaging events to connected SSE clients.
+
+Two backends are available:
+- InProcessBroker: fans events out to subscribers in the current process
+  (tests, SQLite, single-worker development).
+- PostgresBroker: publishes with NOTIFY over a small connection pool and
+  runs ONE listener connection per worker process, which fans events out to
+  that worker's subscribers.
+
+Subscribers only ever wait on an in-memory queue, so an idle SSE client
+never holds a database connection.
+"""
+
+import json
+import logging
+import queue
+import select
+import threading
+import time
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import NullPool
+
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_CHANNEL = 'lms_messages'
+NOTIFY_BATCH_SIZE = 500  # recipient ids per NOTIFY payload
+
+
+class Subscription:
+    """A single SSE client's mailbox for one user."""
+
+    def __init__(self, user_id, maxsize=100):
+        self.user_id = user_id
+        self.queue = queue.Queue(maxsize=maxsize)
+
+    def get(self, timeout):
+        """Return the next event, or None if nothing arrived within timeout."""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            # Slow client: drop the event, it will be replayed on reconnect
+            logger.warning("Dropping messaging event for user %s (queue full)", self.user_id)
+
+
+class InProcessBroker:
+    """Delivers events to subscribers living in this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}
+
+    def subscribe(self, user_id):
+        sub = Subscription(user_id)
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            subs = self._subscribers.get(sub.user_id)
+            if subs:
+                subs.discard(sub)
+                if not subs:
+                    del self._subscribers[sub.user_id]
+
+    def publish(self, user_id, event):
+        self._dispatch(user_id, event)
+
+    def publish_many(self, user_ids, event):
+        for user_id in user_ids:
+            self._dispatch(user_id, event)
+
+    def _dispatch(self, user_id, event):
+        with self._lock:
+            subs = list(self._subscribers.get(user_id, ()))
+        for sub in subs:
+            sub.put(event)
+
+
+class PostgresBroker(InProcessBroker):
+    """LISTEN/NOTIFY backend sharing one listener connection per process."""
+
+    def __init__(self, database_uri, pool_size=2):
+        super().__init__()
+        # Dedicated, unpooled engine so the listener never eats a pool slot
+        self._engine = create_engine(
+            database_uri, poolclass=NullPool, isolation_level='AUTOCOMMIT'
+        )
+        # NOTIFYs reuse a few warm connections instead of connecting per message
+        self._publish_engine = create_engine(
+            database_uri, pool_size=pool_size, max_overflow=pool_size,
+            pool_pre_ping=True, isolation_level='AUTOCOMMIT'
+        )
+        self._listener = None
+        self._listener_lock = threading.Lock()
+
+    def subscribe(self, user_id):
+        self._ensure_listener()
+        return super().subscribe(user_id)
+
+    def publish(self, user_id, event):
+        payload = json.dumps({'user_id': user_id, 'event': event})
+        with self._publish_engine.connect() as conn:
+            conn.execute(
+                text("SELECT pg_notify(:channel, :payload)"),
+                {'channel': NOTIFY_CHANNEL, 'payload': payload}
+            )
+
+    def publish_many(self, user_ids, event):
+        # One NOTIFY per chunk of recipients; payloads must stay under 8000 bytes
+        with self._publish_engine.connect() as conn:
+            for start in range(0, len(user_ids), NOTIFY_BATCH_SIZE):
+                chunk = user_ids[start:start + NOTIFY_BATCH_SIZE]
+                conn.execute(
+                    text("SELECT pg_notify(:channel, :payload)"),
+                    {'channel': NOTIFY_CHANNEL,
+                     'payload': json.dumps({'user_ids': chunk, 'event': event})}
+                )
+
+    def _ensure_listener(self):
+        with self._listener_lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(
+                    target=self._listen_forever, name='lms-message-listener', daemon=True
+                )
+                self._listener.start()
+
+    def _listen_forever(self):
+        backoff = 1
+        while True:
+            try:
+                raw = self._engine.raw_connection()
+                try:
+                    conn = raw.driver_connection
+                    cursor = conn.cursor()
+                    cursor.execute(f"LISTEN {NOTIFY_CHANNEL}")
+                    backoff = 1
+                    while True:
+                        if select.select([conn], [], [], 30) == ([], [], []):
+                            continue
+                        conn.poll()
+                        while conn.notifies:
+                            notify = conn.notifies.pop(0)
+                            data = json.loads(notify.payload)
+                            for user_id in data.get('user_ids') or [data['user_id']]:
+                                self._dispatch(user_id, data['event'])
+                finally:
+                    raw.close()
+            except Exception:
+                logger.exception("Message listener lost its connection; retrying in %ss", backoff)
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 30)
+
+
+class MessageBroker:
+    """
+    Flask extension wrapper that picks a backend from config.
+
+    MESSAGE_BROKER may be 'memory', 'postgres' or unset, in which case
+    PostgreSQL databases get LISTEN/NOTIFY and everything else stays in-process.
+    """
+
+    def __init__(self, app=None):
+        self.backend = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        uri = app.config.get('SQLALCHEMY_DATABASE_URI') or ''
+        kind = app.config.get('MESSAGE_BROKER')
+        if kind is None:
+            kind = 'postgres' if uri.startswith('postgres') else 'memory'
+
+        if kind == 'postgres':
+            self.backend = PostgresBroker(uri, app.config.get('MESSAGE_BROKER_POOL_SIZE', 2))
+        else:
+            self.backend = InProcessBroker()
+        app.extensions['message_broker'] = self
+
+    def subscribe(self, user_id):
+        return self.backend.subscribe(user_id)
+
+    def unsubscribe(self, sub):
+        self.backend.unsubscribe(sub)
+
+    def publish(self, user_id, event):
+        """Publish an event; failures are logged, never raised to the caller."""
+        try:
+            self.backend.publish(user_id, event)
+        except Exception:
+            logger.exception("Failed to publish messaging event for user %s", user_id)
+
+    def publish_many(self, user_ids, event):
+        """Publish the same event to many users (e.g. a course broadcast)."""
+        try:
+            self.backend.publish_many(list(user_ids), event)
+        except Exception:
+            logger.exception("Failed to publish messaging event to %d users", len(user_ids))
+
+
+message_broker = MessageBroker()
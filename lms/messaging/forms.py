@@ -1,7 +1,7 @@
 # lms/messaging/forms.py
 
 from flask_wtf import FlaskForm
-from wtforms import TextAreaField, StringField, HiddenField
+from wtforms import TextAreaField, StringField, HiddenField, SelectField
 from wtforms.validators import DataRequired, Length, Optional
 
 
@@ -54,4 +54,41 @@ class MarkAsReadForm(FlaskForm):
     message_id = HiddenField(
         'Message ID',
         validators=[DataRequired()]
-    )
\ No newline at end of file
+    )
+
+
+BROADCAST_AUDIENCE_CHOICES = [
+    ('all', 'All enrolled students'),
+    ('inactive', 'Inactive students'),
+    ('incomplete', 'Students who have not completed the course'),
+]
+
+
+class BroadcastMessageForm(FlaskForm):
+    """
+    Form for sending one message to every student in a course.
+    Same validation rules as SendMessageForm, plus an audience filter.
+    """
+    
+    audience = SelectField(
+        'Send to',
+        choices=BROADCAST_AUDIENCE_CHOICES,
+        default='all',
+        validators=[DataRequired()]
+    )
+    
+    subject = StringField(
+        'Subject',
+        validators=[
+            Optional(),
+            Length(max=200, message='Subject must be less than 200 characters')
+        ]
+    )
+    
+    content = TextAreaField(
+        'Message',
+        validators=[
+            DataRequired(message='Message content is required'),
+            Length(min=1, max=5000, message='Message must be between 1 and 5000 characters')
+        ]
+    )
@@ -2,14 +2,20 @@
 # TWO-WAY MESSAGING VERSION
 # Both instructors and students can send messages
 
-from flask import render_template, request, jsonify, flash, redirect, url_for, abort
+from flask import render_template, request, jsonify, flash, redirect, url_for, abort, Response, current_app, g
 from flask_login import login_required, current_user
-from sqlalchemy import or_, and_
+from sqlalchemy import or_, and_, exists, select, insert, literal
+from sqlalchemy.orm import joinedload
 from lms.extensions import db
 from lms.models import User, Message
-from .forms import SendMessageForm, MarkAsReadForm
+from .forms import SendMessageForm, MarkAsReadForm, BroadcastMessageForm
+from .broker import message_broker
+from .search import search_messages
 from . import messaging
 from sqlalchemy import distinct
+from datetime import datetime, timedelta
+import json
+import time
 
 
 # =====================================================
@@ -26,32 +32,112 @@ def is_student():
     return current_user.is_authenticated and current_user.role == 'student'
 
 
+def _auth_memo():
+    """Per-request cache of authorization results (lives on flask.g)."""
+    if '_messaging_auth' not in g:
+        g._messaging_auth = {}
+    return g._messaging_auth
+
+
 def can_message_student(student_id):
     """
     Check if current instructor can message this student.
     Instructor can message students enrolled in their courses.
+    
+    Runs as a single EXISTS over Enrollment → Course (owned by the
+    instructor) → User (role = student); repeat checks in the same
+    request are answered from the per-request memo.
     """
     if not is_instructor():
         return False
     
-    student = User.query.get(student_id)
-    if not student or student.role != 'student':
-        return False
-    
-    # Check if student is enrolled in any of instructor's courses
-    from lms.models import Course, Enrollment
-    
-    instructor_courses = Course.query.filter_by(instructor_id=current_user.id).all()
-    course_ids = [course.id for course in instructor_courses]
-    
-    enrolled = Enrollment.query.filter(
-        and_(
-            Enrollment.user_id == student_id,
-            Enrollment.course_id.in_(course_ids)
+    key = ('can_message', current_user.id, student_id)
+    memo = _auth_memo()
+    if key not in memo:
+        from lms.models import Course, Enrollment
+        
+        stmt = select(
+            exists()
+            .where(Enrollment.user_id == student_id)
+            .where(Course.id == Enrollment.course_id)
+            .where(Course.instructor_id == current_user.id)
+            .where(User.id == Enrollment.user_id)
+            .where(User.role == 'student')
         )
-    ).first()
+        memo[key] = db.session.scalar(stmt)
     
-    return enrolled is not None
+    return memo[key]
+
+
+def has_conversation(other_user_id):
+    """Check (via EXISTS, memoized per request) if any message was exchanged with another user."""
+    key = ('conversation', current_user.id, other_user_id)
+    memo = _auth_memo()
+    if key not in memo:
+        stmt = select(
+            exists().where(
+                or_(
+                    and_(Message.sender_id == current_user.id, Message.receiver_id == other_user_id),
+                    and_(Message.sender_id == other_user_id, Message.receiver_id == current_user.id)
+                )
+            )
+        )
+        memo[key] = db.session.scalar(stmt)
+    return memo[key]
+
+
+def has_messaged_current_user(sender_id):
+    """Check (via EXISTS, memoized per request) if sender_id has ever messaged the current user."""
+    key = ('received_from', current_user.id, sender_id)
+    memo = _auth_memo()
+    if key not in memo:
+        stmt = select(
+            exists().where(
+                Message.sender_id == sender_id,
+                Message.receiver_id == current_user.id
+            )
+        )
+        memo[key] = db.session.scalar(stmt)
+    return memo[key]
+
+
+# =====================================================
+# REAL-TIME EVENT HELPERS
+# =====================================================
+
+def count_unread(user_id):
+    """Number of unread, non-deleted messages received by a user."""
+    return Message.query.filter_by(
+        receiver_id=user_id,
+        is_read=False,
+        is_deleted=False
+    ).count()
+
+
+def message_event(message):
+    """Serialize a message into the payload pushed to the receiver's stream."""
+    return {
+        'type': 'message',
+        'id': message.id,
+        'sender_id': message.sender_id,
+        'sender_name': message.sender.name,
+        'subject': message.subject,
+        'preview': message.content[:120],
+    }
+
+
+def publish_unread_count(user_id):
+    """Push the user's current unread count to their open streams."""
+    message_broker.publish(user_id, {'type': 'unread', 'count': count_unread(user_id)})
+
+
+def format_sse(event):
+    """Encode an event dict as a text/event-stream frame."""
+    frame = f"event: {event['type']}\n"
+    if event['type'] == 'message':
+        # Message ids double as SSE ids so reconnects can resume via Last-Event-ID
+        frame += f"id: {event['id']}\n"
+    return frame + f"data: {json.dumps(event)}\n\n"
 
 
 # =====================================================
@@ -69,7 +155,6 @@ def send_message():
     
     if form.validate_on_submit():
         receiver_id = int(form.receiver_id.data)
-        receiver = User.query.get_or_404(receiver_id)
         
         # ===== AUTHORIZATION LOGIC (TWO-WAY) =====
         if is_instructor():
@@ -80,20 +165,14 @@ def send_message():
                 }), 403
         
         elif is_student():
+            receiver = db.get_or_404(User, receiver_id)
             if receiver.role != 'instructor':
                 return jsonify({
                     'success': False,
                     'error': 'You can only message instructors'
                 }), 403
             
-            prior_message = Message.query.filter(
-                and_(
-                    Message.sender_id == receiver_id,
-                    Message.receiver_id == current_user.id
-                )
-            ).first()
-            
-            if not prior_message:
+            if not has_messaged_current_user(receiver_id):
                 return jsonify({
                     'success': False,
                     'error': 'You can only reply to instructors who have messaged you first'
@@ -115,6 +194,10 @@ def send_message():
             db.session.add(message)
             db.session.commit()
             
+            event = message_event(message)
+            event['unread_count'] = count_unread(receiver_id)
+            message_broker.publish(receiver_id, event)
+            
             return jsonify({
                 'success': True,
                 'message': 'Message sent successfully!',
@@ -139,6 +222,116 @@ def send_message():
 
 
 
+# =====================================================
+# COURSE BROADCAST (AJAX)
+# =====================================================
+
+def broadcast_recipients(course_id, audience):
+    """
+    SELECT of student ids enrolled in a course, narrowed by audience:
+    - 'inactive':   no lesson of this course completed in the last BROADCAST_INACTIVE_DAYS
+    - 'incomplete': enrollment not yet completed
+    """
+    from lms.models import Enrollment, Lesson, LessonCompletion, Module
+    
+    stmt = (
+        select(Enrollment.user_id)
+        .join(User, User.id == Enrollment.user_id)
+        .where(Enrollment.course_id == course_id, User.role == 'student')
+    )
+    
+    if audience == 'inactive':
+        days = current_app.config.get('BROADCAST_INACTIVE_DAYS', 14)
+        cutoff = datetime.utcnow() - timedelta(days=days)
+        stmt = stmt.where(
+            ~select(LessonCompletion.id)
+            .join(Lesson, Lesson.id == LessonCompletion.lesson_id)
+            .join(Module, Module.id == Lesson.module_id)
+            .where(
+                LessonCompletion.user_id == Enrollment.user_id,
+                LessonCompletion.completed_at >= cutoff,
+                Module.course_id == course_id
+            )
+            .exists()
+        )
+    elif audience == 'incomplete':
+        stmt = stmt.where(Enrollment.completed == False)
+    
+    return stmt.distinct()
+
+
+@messaging.route('/broadcast/<int:course_id>', methods=['POST'])
+@login_required
+def broadcast_message(course_id):
+    """
+    Send one message to every (or a filtered subset of) student in a course.
+    
+    All rows are written by a single INSERT ... SELECT from Enrollment, so
+    the fan-out happens inside the database in one transaction and no
+    Message objects are built in Python.
+    
+    Security:
+    - Only the course's instructor can broadcast
+    - CSRF protected
+    """
+    from lms.models import Course
+    
+    course = db.get_or_404(Course, course_id)
+    if not is_instructor() or course.instructor_id != current_user.id:
+        return jsonify({'success': False, 'error': 'Unauthorized'}), 403
+    
+    form = BroadcastMessageForm()
+    if not form.validate_on_submit():
+        errors = {field: errs[0] for field, errs in form.errors.items()}
+        return jsonify({'success': False, 'errors': errors}), 400
+    
+    recipients = broadcast_recipients(course.id, form.audience.data).subquery()
+    now = datetime.utcnow()
+    rows = select(
+        literal(current_user.id),
+        recipients.c.user_id,
+        literal(form.subject.data or None, type_=Message.subject.type),
+        literal(form.content.data.strip(), type_=Message.content.type),
+        literal(False),
+        literal(False),
+        literal(now),
+        literal(now),
+    )
+    stmt = (
+        insert(Message)
+        .from_select(
+            ['sender_id', 'receiver_id', 'subject', 'content',
+             'is_read', 'is_deleted', 'created_at', 'updated_at'],
+            rows
+        )
+        .returning(Message.receiver_id)
+    )
+    
+    try:
+        receiver_ids = db.session.execute(stmt).scalars().all()
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'error': 'Failed to send broadcast. Please try again.'
+        }), 500
+    
+    message_broker.publish_many(receiver_ids, {
+        'type': 'broadcast',
+        'sender_id': current_user.id,
+        'sender_name': current_user.name,
+        'subject': form.subject.data or None,
+        'course_id': course.id,
+    })
+    
+    return jsonify({
+        'success': True,
+        'message': f'Message sent to {len(receiver_ids)} student(s).',
+        'recipients': len(receiver_ids)
+    }), 200
+
+
 # =====================================================
 # VIEW CONVERSATION - TWO-WAY VERSION
 # =====================================================
@@ -160,18 +353,11 @@ def conversation(user_id):
       "other_user =", user_id,
       "role =", current_user.role)
     
-    other_user = User.query.get_or_404(user_id)
+    other_user = db.get_or_404(User, user_id)
     
     # ===== AUTHORIZATION (TWO-WAY) =====
     if is_instructor():
-        has_conversation = Message.query.filter(
-            or_(
-                and_(Message.sender_id == current_user.id, Message.receiver_id == user_id),
-                and_(Message.sender_id == user_id, Message.receiver_id == current_user.id)
-            )
-        ).first()
-
-        if not has_conversation and not can_message_student(user_id):
+        if not has_conversation(user_id) and not can_message_student(user_id):
             abort(403)
     
     elif is_student():
@@ -182,14 +368,7 @@ def conversation(user_id):
             abort(403)
         
         # Check 2: Must have an existing conversation
-        has_conversation = Message.query.filter(
-            or_(
-                and_(Message.sender_id == current_user.id, Message.receiver_id == user_id),
-                and_(Message.sender_id == user_id, Message.receiver_id == current_user.id)
-            )
-        ).first()
-        
-        if not has_conversation:
+        if not has_conversation(user_id):
             abort(403)
     
     else:
@@ -208,9 +387,14 @@ def conversation(user_id):
     ).order_by(Message.created_at.asc()).all()
     
     # Mark received messages as read
+    marked_read = False
     for msg in messages:
         if msg.receiver_id == current_user.id and not msg.is_read:
             msg.mark_as_read()
+            marked_read = True
+    
+    if marked_read:
+        publish_unread_count(current_user.id)
     
     # ===== PREPARE FORM =====
     
@@ -288,6 +472,7 @@ def mark_as_read(message_id):
     
     try:
         message.mark_as_read()
+        publish_unread_count(current_user.id)
         return jsonify({'success': True, 'message': 'Message marked as read'}), 200
     except Exception as e:
         db.session.rollback()
@@ -317,6 +502,108 @@ def unread_count():
     return jsonify({'success': True, 'count': count}), 200
 
 
+# =====================================================
+# SEARCH MESSAGES
+# =====================================================
+
+@messaging.route('/search', methods=['GET'])
+@login_required
+def search():
+    """
+    Full-text search over messages the current user sent or received.
+    
+    Security:
+    - Results are always scoped to the current user's own messages
+    - Soft-deleted messages are never returned
+    """
+    query = request.args.get('q', '').strip()
+    page = request.args.get('page', 1, type=int)
+    
+    hits, has_next = search_messages(
+        current_user.id,
+        query,
+        page=page,
+        per_page=current_app.config.get('MESSAGE_SEARCH_PER_PAGE', 20)
+    )
+    
+    return render_template(
+        'messaging/search.html',
+        hits=hits,
+        search_query=query,
+        page=page,
+        has_next=has_next
+    )
+
+
+# =====================================================
+# LIVE EVENT STREAM (SSE)
+# =====================================================
+
+@messaging.route('/stream', methods=['GET'])
+@login_required
+def stream():
+    """
+    Server-Sent Events stream of new-message and unread-count events.
+    
+    - Replays messages missed since Last-Event-ID on reconnect
+    - Sends a heartbeat comment while idle
+    - Releases its DB connection before streaming; idle clients only
+      wait on an in-memory queue fed by the message broker
+    """
+    user_id = current_user.id
+    config = current_app.config
+    heartbeat = config.get('SSE_HEARTBEAT_SECONDS', 15)
+    max_age = config.get('SSE_MAX_STREAM_SECONDS', 300)
+    
+    # Subscribe first so nothing published during the replay query is lost
+    subscription = message_broker.subscribe(user_id)
+    
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id', '')
+    backlog = []
+    if last_event_id.isdigit():
+        missed = Message.query.options(joinedload(Message.sender)).filter(
+            Message.receiver_id == user_id,
+            Message.id > int(last_event_id),
+            Message.is_deleted == False
+        ).order_by(Message.id.asc()).limit(config.get('SSE_REPLAY_LIMIT', 50)).all()
+        backlog = [message_event(m) for m in missed]
+    
+    initial = {'type': 'unread', 'count': count_unread(user_id)}
+    
+    # Hand the connection back to the pool before the long-lived response
+    db.session.remove()
+    
+    def generate():
+        yield "retry: 3000\n\n"
+        replayed = set()
+        for event in backlog:
+            replayed.add(event['id'])
+            yield format_sse(event)
+        yield format_sse(initial)
+        
+        deadline = time.monotonic() + max_age
+        while time.monotonic() < deadline:
+            event = subscription.get(timeout=heartbeat)
+            if event is None:
+                yield ": heartbeat\n\n"
+            elif event['type'] == 'message' and event['id'] in replayed:
+                continue
+            else:
+                yield format_sse(event)
+    
+    response = Response(
+        generate(),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no',  # Disable proxy buffering (nginx)
+        }
+    )
+    # Runs even if the client disconnects before the first chunk
+    response.call_on_close(lambda: message_broker.unsubscribe(subscription))
+    return response
+
+
 # =====================================================
 # DELETE MESSAGE (SOFT DELETE)
 # =====================================================
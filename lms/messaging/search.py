@@ -0,0 +1,218 @@
+# lms/messaging/search.py
+
+"""
+Full-text search over messages.
+
+- PostgreSQL: a generated `search_vector` tsvector column with a GIN index
+- SQLite: an external-content FTS5 table kept in sync by triggers
+- Anything else: unranked ILIKE matching on subject/content (no index)
+
+Both indexes are maintained by the database on insert/update, so bulk
+writes (e.g. course broadcasts) are indexed without any Python code.
+"""
+
+import re
+from collections import namedtuple
+
+from markupsafe import Markup, escape
+from sqlalchemy import and_, event, or_, select, text
+from sqlalchemy.orm import joinedload
+
+from lms.extensions import db
+from lms.models import Message
+
+
+# Control characters mark highlights so user content can be escaped safely
+HIGHLIGHT_START = '\x02'
+HIGHLIGHT_STOP = '\x03'
+
+POSTGRES_DDL = [
+    """
+    ALTER TABLE messages ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(subject, '')), 'A') ||
+        setweight(to_tsvector('english', content), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_messages_search ON messages USING GIN (search_vector)",
+]
+
+SQLITE_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+        subject, content, content='messages', content_rowid='id'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS messages_fts_insert AFTER INSERT ON messages BEGIN
+        INSERT INTO messages_fts(rowid, subject, content)
+        VALUES (new.id, new.subject, new.content);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS messages_fts_delete AFTER DELETE ON messages BEGIN
+        INSERT INTO messages_fts(messages_fts, rowid, subject, content)
+        VALUES ('delete', old.id, old.subject, old.content);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS messages_fts_update AFTER UPDATE OF subject, content ON messages BEGIN
+        INSERT INTO messages_fts(messages_fts, rowid, subject, content)
+        VALUES ('delete', old.id, old.subject, old.content);
+        INSERT INTO messages_fts(rowid, subject, content)
+        VALUES (new.id, new.subject, new.content);
+    END
+    """,
+]
+
+
+@event.listens_for(Message.__table__, 'after_create')
+def create_search_index(target, connection, **kw):
+    """Build the dialect's full-text index whenever `messages` is created (e.g. db.create_all())."""
+    statements = {
+        'postgresql': POSTGRES_DDL,
+        'sqlite': SQLITE_DDL,
+    }.get(connection.dialect.name, [])
+    for statement in statements:
+        connection.execute(text(statement))
+
+
+def _fts5_query(q):
+    """Turn free text into a safe FTS5 query: every word must match (last one as a prefix)."""
+    words = re.findall(r'\w+', q)
+    if not words:
+        return None
+    terms = [f'"{w}"' for w in words[:-1]] + [f'"{words[-1]}"*']
+    return ' '.join(terms)
+
+
+def _highlight(snippet):
+    """Escape a snippet and turn the highlight markers into <mark> tags."""
+    if not snippet:
+        return Markup('')
+    html = str(escape(snippet))
+    html = html.replace(HIGHLIGHT_START, '<mark>').replace(HIGHLIGHT_STOP, '</mark>')
+    return Markup(html)
+
+
+def _postgres_hits(user_id, q, limit, offset):
+    # Rank and paginate first, then build headlines for the page only
+    return db.session.execute(text(f"""
+        SELECT hits.id, hits.rank,
+               ts_headline('english', coalesce(m.subject || ' — ', '') || m.content, hits.query,
+                           'StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_STOP}, MaxWords=30, MinWords=10')
+                   AS snippet
+        FROM (
+            SELECT m.id, ts_rank(m.search_vector, query) AS rank, query
+            FROM messages m, websearch_to_tsquery('english', :q) query
+            WHERE m.search_vector @@ query
+              AND m.is_deleted = false
+              AND (m.sender_id = :user_id OR m.receiver_id = :user_id)
+            ORDER BY rank DESC, m.created_at DESC
+            LIMIT :limit OFFSET :offset
+        ) hits
+        JOIN messages m ON m.id = hits.id
+        ORDER BY hits.rank DESC, m.created_at DESC
+    """), {'q': q, 'user_id': user_id, 'limit': limit, 'offset': offset}).all()
+
+
+def _sqlite_hits(user_id, q, limit, offset):
+    match = _fts5_query(q)
+    if match is None:
+        return []
+    return db.session.execute(text("""
+        SELECT m.id, bm25(messages_fts, 2.0, 1.0) AS rank,
+               snippet(messages_fts, -1, :start, :stop, '…', 16) AS snippet
+        FROM messages_fts
+        JOIN messages m ON m.id = messages_fts.rowid
+        WHERE messages_fts MATCH :match
+          AND m.is_deleted = 0
+          AND (m.sender_id = :user_id OR m.receiver_id = :user_id)
+        ORDER BY rank, m.created_at DESC
+        LIMIT :limit OFFSET :offset
+    """), {
+        'match': match, 'user_id': user_id, 'limit': limit, 'offset': offset,
+        'start': HIGHLIGHT_START, 'stop': HIGHLIGHT_STOP,
+    }).all()
+
+
+_Hit = namedtuple('_Hit', 'id rank snippet')
+
+
+def _like_pattern(word):
+    return '%' + re.sub(r'([\\%_])', r'\\\1', word) + '%'
+
+
+def _plain_snippet(subject, content, words, width=120):
+    """Excerpt around the first matching word, with every match marked for _highlight."""
+    body = (subject + ' — ' if subject else '') + content
+    pattern = re.compile('|'.join(re.escape(w) for w in words), re.IGNORECASE)
+    first = pattern.search(body)
+    start = max((first.start() if first else 0) - width // 3, 0)
+    excerpt = body[start:start + width]
+    excerpt = pattern.sub(lambda m: HIGHLIGHT_START + m.group(0) + HIGHLIGHT_STOP, excerpt)
+    return ('…' if start else '') + excerpt + ('…' if start + width < len(body) else '')
+
+
+def _fallback_hits(user_id, q, limit, offset):
+    # No full-text index on this dialect: every word must appear in the subject or content
+    words = re.findall(r'\w+', q)
+    if not words:
+        return []
+    rows = db.session.execute(
+        select(Message.id, Message.subject, Message.content)
+        .where(
+            Message.is_deleted == False,
+            or_(Message.sender_id == user_id, Message.receiver_id == user_id),
+            and_(*(
+                or_(Message.subject.ilike(_like_pattern(w), escape='\\'),
+                    Message.content.ilike(_like_pattern(w), escape='\\'))
+                for w in words
+            ))
+        )
+        .order_by(Message.created_at.desc())
+        .limit(limit).offset(offset)
+    ).all()
+    return [_Hit(row.id, 0, _plain_snippet(row.subject, row.content, words)) for row in rows]
+
+
+def search_messages(user_id, q, page=1, per_page=20):
+    """
+    Ranked full-text search over messages the user sent or received.
+
+    Returns (hits, has_next) where each hit is a dict with the Message
+    (sender/receiver eagerly loaded) and an HTML-safe highlighted snippet.
+    """
+    q = (q or '').strip()
+    if not q:
+        return [], False
+
+    page = max(page, 1)
+    # Fetch one extra row to know if there is a next page without a COUNT(*)
+    limit, offset = per_page + 1, (page - 1) * per_page
+
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        rows = _postgres_hits(user_id, q, limit, offset)
+    elif dialect == 'sqlite':
+        rows = _sqlite_hits(user_id, q, limit, offset)
+    else:
+        rows = _fallback_hits(user_id, q, limit, offset)
+
+    has_next = len(rows) > per_page
+    rows = rows[:per_page]
+    if not rows:
+        return [], False
+
+    ids = [row.id for row in rows]
+    messages = {
+        m.id: m for m in Message.query
+        .options(joinedload(Message.sender), joinedload(Message.receiver))
+        .filter(Message.id.in_(ids))
+    }
+
+    hits = [
+        {'message': messages[row.id], 'snippet': _highlight(row.snippet), 'rank': row.rank}
+        for row in rows if row.id in messages
+    ]
+    return hits, has_next
@@ -0,0 +1,165 @@
+# lms/metrics.py
+
+"""
+Prometheus metrics at /metrics.
+
+- Request latency by endpoint and status, DB time and statement count
+  per request: fed by the query_stats_recorded signal (lms/query_stats.py),
+  so they need QUERY_STATS_ENABLED.
+- Connection pool gauges: checked-out connections follow the engine's
+  checkout/checkin events; overflow is sampled on the same events.
+- User cache hits/misses (lms/user_cache.py) as a counter; the hit ratio
+  is rate(hit) / rate(hit + miss) in PromQL.
+- Mail queue depth: one COUNT on the indexed outbox status, run per scrape.
+
+Under gunicorn each worker is a separate process. With
+PROMETHEUS_MULTIPROC_DIR set (gunicorn.conf.py sets it before the app is
+imported) every worker writes its samples to memory-mapped files in that
+directory and a scrape of any worker aggregates all of them. The variable
+has to be set before prometheus_client is first imported.
+"""
+
+import hmac
+import logging
+import os
+import threading
+
+from flask import Response, abort, current_app, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+)
+from sqlalchemy import event, func, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.pool import QueuePool
+
+from lms.extensions import db
+from lms.models import OutboundEmail
+from lms.query_stats import query_stats_recorded
+from lms.user_cache import user_cache
+
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+REQUEST_LATENCY = Histogram(
+    'lms_request_duration_seconds', 'Request latency', ['endpoint', 'status'], buckets=LATENCY_BUCKETS
+)
+REQUEST_DB_TIME = Histogram(
+    'lms_request_db_seconds', 'Time spent in SQL per request', ['endpoint'], buckets=LATENCY_BUCKETS
+)
+REQUEST_QUERIES = Histogram(
+    'lms_request_queries', 'SQL statements per request', ['endpoint'], buckets=(1, 2, 5, 10, 20, 50, 100, 200)
+)
+POOL_SIZE = Gauge('lms_db_pool_size', 'Configured connection pool size', multiprocess_mode='livesum')
+POOL_CHECKED_OUT = Gauge('lms_db_pool_checked_out', 'Connections checked out of the pool', multiprocess_mode='livesum')
+POOL_OVERFLOW = Gauge('lms_db_pool_overflow', 'Connections open beyond the pool size', multiprocess_mode='livesum')
+CACHE_REQUESTS = Counter('lms_cache_requests', 'Cache lookups by result', ['cache', 'result'])
+MAIL_QUEUE_DEPTH = Gauge('lms_mail_queue_depth', 'Outbound emails waiting to be sent', multiprocess_mode='mostrecent')
+
+
+class _CacheCounters:
+    """Feeds a TTLCache's hits/misses tallies into CACHE_REQUESTS as deltas."""
+
+    def __init__(self, name, cache):
+        self.cache = cache
+        self._hit = CACHE_REQUESTS.labels(name, 'hit')
+        self._miss = CACHE_REQUESTS.labels(name, 'miss')
+        self._seen = (cache.hits, cache.misses)
+        self._lock = threading.Lock()
+
+    def sync(self):
+        with self._lock:
+            hits, misses = self.cache.hits, self.cache.misses
+            seen_hits, seen_misses = self._seen
+            self._seen = (hits, misses)
+        if hits > seen_hits:
+            self._hit.inc(hits - seen_hits)
+        if misses > seen_misses:
+            self._miss.inc(misses - seen_misses)
+
+
+def _watch_pool(engine):
+    pool = engine.pool
+    if isinstance(pool, QueuePool):
+        POOL_SIZE.set(pool.size())
+
+    def on_checkout(dbapi_connection, record, proxy):
+        POOL_CHECKED_OUT.inc()
+        _sample_overflow(engine.pool)
+
+    def on_checkin(dbapi_connection, record):
+        POOL_CHECKED_OUT.dec()
+        _sample_overflow(engine.pool)
+
+    event.listen(engine, 'checkout', on_checkout)
+    event.listen(engine, 'checkin', on_checkin)
+
+
+def _sample_overflow(pool):
+    # SQLite's SingletonThreadPool/StaticPool have no overflow
+    if isinstance(pool, QueuePool):
+        POOL_OVERFLOW.set(max(pool.overflow(), 0))
+
+
+def _update_mail_queue_depth():
+    try:
+        depth = db.session.scalar(
+            select(func.count(OutboundEmail.id))
+            .where(OutboundEmail.status == OutboundEmail.STATUS_PENDING)
+        )
+    except SQLAlchemyError:
+        db.session.rollback()
+        logger.warning("Could not read mail queue depth", exc_info=True)
+        return
+    MAIL_QUEUE_DEPTH.set(depth)
+
+
+def _registry():
+    """All workers' samples in multiprocess mode, this process's otherwise."""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+class Metrics:
+    """Flask extension recording request metrics and serving /metrics."""
+
+    def __init__(self, app=None):
+        self._user_cache = _CacheCounters('user', user_cache)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions['metrics'] = self
+        if not app.config.get('METRICS_ENABLED', True):
+            return
+        if not app.config.get('QUERY_STATS_ENABLED', True):
+            logger.warning("QUERY_STATS_ENABLED is off; request latency and DB metrics will not be recorded")
+
+        query_stats_recorded.connect(self._observe, app)
+        with app.app_context():
+            _watch_pool(db.engine)
+        app.add_url_rule('/metrics', 'metrics', self._scrape)
+
+    def _observe(self, app, stats, endpoint, status, duration, **extra):
+        REQUEST_LATENCY.labels(endpoint, str(status)).observe(duration)
+        REQUEST_DB_TIME.labels(endpoint).observe(stats.db_time)
+        REQUEST_QUERIES.labels(endpoint).observe(stats.count)
+        self._user_cache.sync()
+
+    def _scrape(self):
+        token = current_app.config.get('METRICS_TOKEN')
+        if token:
+            supplied = request.headers.get('Authorization', '').encode()
+            if not hmac.compare_digest(supplied, f'Bearer {token}'.encode()):
+                abort(401)
+
+        self._user_cache.sync()
+        _update_mail_queue_depth()
+        return Response(generate_latest(_registry()), mimetype=CONTENT_TYPE_LATEST)
+
+
+metrics = Metrics()
@@ -1,9 +1,4 @@
 
-# lms/models/__init__.py
-
-from lms import login_manager
-
-
 # lms/models/__init__.py 
 #  Import model modules so they are registered with SQLAlchemy metadata.
 
@@ -14,6 +9,10 @@ from .lesson import Lesson
 from .lesson_completion import LessonCompletion
 from .enrollment import Enrollment
 from .message import Message
+from .message_archive import MessageArchive
+from .outbound_email import OutboundEmail
+from .slow_query import SlowQuery
+from .background_job import BackgroundJob
 
 # Make all models available when importing from lms.models
 __all__ = [
@@ -23,13 +22,11 @@ __all__ = [
     'Lesson',
     'LessonCompletion',
     'Enrollment',
-    'Message'
+    'Message',
+    'MessageArchive',
+    'OutboundEmail',
+    'SlowQuery',
+    'BackgroundJob'
 ]
 
 
-
-# user loader 
-@login_manager.user_loader
-def load_user(user_id):
-    return User.query.get(int(user_id))
-
@@ -0,0 +1,46 @@
+# lms/models/background_job.py
+
+from lms.extensions import db
+from datetime import datetime
+
+
+class BackgroundJob(db.Model):
+    """
+    Durable job row drained by `flask jobs-worker` (lms/jobs.py).
+    
+    Work too large for a request (purging huge courses, big CSV imports)
+    is queued here in the same transaction as the request's own changes,
+    so a web worker restart can't lose it. Running jobs send a heartbeat;
+    a job whose heartbeat stops (worker killed) is picked up again, so
+    handlers must be safe to re-run.
+    """
+    
+    __tablename__ = 'background_job'
+    
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    payload = db.Column(db.Text, nullable=False, default='{}')  # JSON keyword arguments for the handler
+    
+    # Execution state
+    status = db.Column(db.String(20), default=STATUS_PENDING, nullable=False)
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    heartbeat_at = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    
+    # Timestamps
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    
+    # The worker polls for due, pending jobs and for running jobs with a stale heartbeat
+    __table_args__ = (
+        db.Index('idx_background_job_due', 'status', 'next_attempt_at'),
+    )
+    
+    def __repr__(self):
+        return f'<BackgroundJob {self.id} {self.kind} status={self.status}>'
@@ -22,6 +22,8 @@ class Course(db.Model):
     slug = db.Column(db.String(200), unique=True, nullable=False)
     description = db.Column(db.Text, nullable=True)
     published = db.Column(db.Boolean, default=False, nullable=False)
+    # Set while a batched purge is queued or running (lms/admin/deletion.py); blocks publish/edit
+    deleting = db.Column(db.Boolean, default=False, server_default=db.false(), nullable=False)
     
     level = db.Column(db.String(50), default='Beginner', nullable=True)
     category = db.Column(db.String(100), nullable=True)
@@ -34,7 +36,8 @@ class Course(db.Model):
     instructor = db.relationship('User', backref='courses_taught', foreign_keys=[instructor_id])
     
 
-    modules = db.relationship('Module', backref='course', lazy='dynamic', cascade='all, delete-orphan')
+    # passive_deletes: modules, lessons, completions and enrollments go via ON DELETE CASCADE
+    modules = db.relationship('Module', backref='course', lazy='dynamic', cascade='all, delete-orphan', passive_deletes=True)
 
     def __repr__(self):
         return f'<Course {self.title}>'
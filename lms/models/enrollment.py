@@ -1,58 +1,76 @@
 from lms import db
 from datetime import datetime
+from sqlalchemy import func, select
 
 class Enrollment(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
-    course_id = db.Column(db.Integer, db.ForeignKey('course.id'))
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'))
+    course_id = db.Column(db.Integer, db.ForeignKey('course.id', ondelete='CASCADE'), index=True)
     date_enrolled = db.Column(db.DateTime, default=datetime.utcnow)
     completed = db.Column(db.Boolean, default=False)
     date_completed = db.Column(db.DateTime, nullable=True)
 
+    # A user can only be enrolled in a course once
+    __table_args__ = (db.UniqueConstraint('user_id', 'course_id', name='_user_course_uc'),)
+
     # Relationships
-    course = db.relationship('Course', backref=db.backref('enrollments', lazy='dynamic'))
+    course = db.relationship('Course', backref=db.backref('enrollments', lazy='dynamic', passive_deletes=True))
 
     def __repr__(self):
         return f'<Enrollment user={self.user_id} course={self.course_id}>'
 
     # --------------------------------------------------------
-    # Helper Method: Mark course completed if all lessons done
+    # Helper Methods: progress and completion
     # --------------------------------------------------------
-    def check_and_update_completion(self):
-        """Marks this enrollment as completed if all lessons in the course are finished by the user."""
+    def progress_counts(self):
+        """Return (completed_lessons, total_lessons) for this enrollment in one query."""
         from lms.models.lesson_completion import LessonCompletion
         from lms.models.lesson import Lesson
+        from lms.models.module import Module
 
-        # Count total lessons for the course
-        total_lessons = 0
-        for module in self.course.modules:
-            total_lessons += module.lessons.count()  # Use .count() for dynamic relationships
-
-        if total_lessons == 0:
-            return False  # No lessons to complete
-
-        # Count completed lessons by this user
-        completed_lessons = (
-            LessonCompletion.query
-            .join(Lesson)
-            .filter(
-                LessonCompletion.user_id == self.user_id,
-                Lesson.module_id.in_([m.id for m in self.course.modules])
+        total = (
+            select(func.count(Lesson.id))
+            .join(Module, Lesson.module_id == Module.id)
+            .where(Module.course_id == self.course_id)
+            .scalar_subquery()
+        )
+        completed = (
+            select(func.count(LessonCompletion.id))
+            .join(Lesson, LessonCompletion.lesson_id == Lesson.id)
+            .join(Module, Lesson.module_id == Module.id)
+            .where(
+                Module.course_id == self.course_id,
+                LessonCompletion.user_id == self.user_id
             )
-            .count()
+            .scalar_subquery()
         )
+        return db.session.execute(select(completed, total)).one()
 
-        # Update enrollment if all lessons completed
-        if completed_lessons == total_lessons and not self.completed:
-            self.completed = True
-            self.date_completed = datetime.utcnow()
-            db.session.commit()
-            return True
-        elif completed_lessons < total_lessons and self.completed:
+    def update_progress(self):
+        """
+        Recompute progress and sync the completed flag without committing.
+        Returns the course progress percent.
+        """
+        completed_lessons, total_lessons = self.progress_counts()
+        if total_lessons == 0:
+            return 0  # No lessons to complete
+
+        if completed_lessons >= total_lessons:
+            if not self.completed:
+                self.completed = True
+                self.date_completed = datetime.utcnow()
+        elif self.completed:
             # Reset completion if a lesson was unmarked
             self.completed = False
             self.date_completed = None
+
+        return int((completed_lessons / total_lessons) * 100)
+
+    def check_and_update_completion(self):
+        """Marks this enrollment as completed if all lessons in the course are finished by the user."""
+        was_completed = self.completed
+        self.update_progress()
+        if self.completed != was_completed:
             db.session.commit()
             return True
-
         return False
@@ -26,7 +26,7 @@ class Lesson(db.Model):
     duration = db.Column(db.String(20), nullable=True) # e.g., "10:30
     
     # Foreign Key to Module
-    module_id = db.Column(db.Integer, db.ForeignKey('module.id'), nullable=False)
+    module_id = db.Column(db.Integer, db.ForeignKey('module.id', ondelete='CASCADE'), nullable=False, index=True)
     
     # Timestamps
     created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
@@ -8,8 +8,8 @@ class LessonCompletion(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     
     # Foreign Keys
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    lesson_id = db.Column(db.Integer, db.ForeignKey('lesson.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    lesson_id = db.Column(db.Integer, db.ForeignKey('lesson.id', ondelete='CASCADE'), nullable=False, index=True)
     
     # Timestamps
     completed_at = db.Column( db.DateTime, default=lambda: datetime.datetime.now(datetime.timezone.utc), # Use timezone-aware 'now'
@@ -20,7 +20,8 @@ class LessonCompletion(db.Model):
     __table_args__ = (db.UniqueConstraint('user_id', 'lesson_id', name='_user_lesson_uc'),)
 
 
-    lesson = db.relationship('Lesson', backref='completions') 
+    # Rows are removed by the database when a lesson is deleted (passive_deletes)
+    lesson = db.relationship('Lesson', backref=db.backref('completions', passive_deletes=True))
 
     def __repr__(self):
         return f'<LessonCompletion User:{self.user_id} Lesson:{self.lesson_id}>'
\ No newline at end of file
@@ -54,19 +54,34 @@ class Message(db.Model):
     sender = db.relationship(
         'User',
         foreign_keys=[sender_id],
-        backref=db.backref('sent_messages', lazy='dynamic', cascade='all, delete-orphan')
+        backref=db.backref('sent_messages', lazy='dynamic', cascade='all, delete-orphan', passive_deletes=True)
     )
     
     receiver = db.relationship(
         'User',
         foreign_keys=[receiver_id],
-        backref=db.backref('received_messages', lazy='dynamic', cascade='all, delete-orphan')
+        backref=db.backref('received_messages', lazy='dynamic', cascade='all, delete-orphan', passive_deletes=True)
     )
     
     # Composite index for common queries (sender + receiver + timestamp)
+    # Partial indexes only cover live (not soft-deleted) rows, which is what
+    # every inbox/conversation query filters on, so they stay small.
     __table_args__ = (
         db.Index('idx_sender_receiver', 'sender_id', 'receiver_id'),
         db.Index('idx_receiver_read', 'receiver_id', 'is_read'),
+        db.Index(
+            'idx_messages_live_receiver', 'receiver_id', 'created_at',
+            postgresql_where=(is_deleted == False), sqlite_where=(is_deleted == False)
+        ),
+        db.Index(
+            'idx_messages_live_conversation', 'sender_id', 'receiver_id', 'created_at',
+            postgresql_where=(is_deleted == False), sqlite_where=(is_deleted == False)
+        ),
+        db.Index(
+            'idx_messages_live_unread', 'receiver_id',
+            postgresql_where=((is_deleted == False) & (is_read == False)),
+            sqlite_where=((is_deleted == False) & (is_read == False))
+        ),
     )
     
     def mark_as_read(self):
@@ -0,0 +1,37 @@
+# lms/models/message_archive.py
+
+from lms.extensions import db
+from datetime import datetime
+
+
+class MessageArchive(db.Model):
+    """
+    Cold storage for messages moved out of the hot `messages` table by
+    `flask messages archive` (soft-deleted or past the retention window).
+    
+    Same columns as Message, keeping the original id. There are no foreign
+    keys so archiving never blocks or cascades on user changes.
+    """
+    
+    __tablename__ = 'messages_archive'
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    sender_id = db.Column(db.Integer, nullable=False, index=True)
+    receiver_id = db.Column(db.Integer, nullable=False, index=True)
+    
+    content = db.Column(db.Text, nullable=False)
+    subject = db.Column(db.String(200), nullable=True)
+    
+    is_read = db.Column(db.Boolean, default=False, nullable=False)
+    read_at = db.Column(db.DateTime, nullable=True)
+    
+    created_at = db.Column(db.DateTime, nullable=False)
+    updated_at = db.Column(db.DateTime, nullable=True)
+    
+    is_deleted = db.Column(db.Boolean, default=False, nullable=False)
+    deleted_at = db.Column(db.DateTime, nullable=True)
+    
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    def __repr__(self):
+        return f'<MessageArchive id={self.id} from={self.sender_id} to={self.receiver_id}>'
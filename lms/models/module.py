@@ -10,7 +10,7 @@ class Module(db.Model):
     order = db.Column(db.Integer, nullable=False, default=0)
     
     # Foreign Key to Course
-    course_id = db.Column(db.Integer, db.ForeignKey('course.id'), nullable=False)
+    course_id = db.Column(db.Integer, db.ForeignKey('course.id', ondelete='CASCADE'), nullable=False, index=True)
     
     # Timestamps
     created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
@@ -20,11 +20,13 @@ class Module(db.Model):
     
     # A Module has many Lessons
     # lazy='dynamic' allows us to use .order_by() and .count() in the template
+    # passive_deletes: the database's ON DELETE CASCADE removes lessons without loading them
     lessons = db.relationship(
     'Lesson',
     backref='module',
     lazy='dynamic',
     cascade='all, delete-orphan',
+    passive_deletes=True,
     order_by='Lesson.order'
 )
 
@@ -0,0 +1,46 @@
+# lms/models/outbound_email.py
+
+from lms.extensions import db
+from datetime import datetime
+
+
+class OutboundEmail(db.Model):
+    """
+    Durable outbox row for an email waiting to be sent by `flask mail-worker`.
+    
+    Requests only insert rows here; delivery, retries and backoff happen in
+    the worker, so mail survives web worker restarts.
+    """
+    
+    __tablename__ = 'outbound_email'
+    
+    STATUS_PENDING = 'pending'
+    STATUS_SENT = 'sent'
+    STATUS_FAILED = 'failed'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    
+    # Message
+    sender = db.Column(db.String(255), nullable=False)
+    recipients = db.Column(db.Text, nullable=False)  # comma-separated addresses
+    subject = db.Column(db.String(255), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    html = db.Column(db.Text, nullable=True)
+    
+    # Delivery state
+    status = db.Column(db.String(20), default=STATUS_PENDING, nullable=False)
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    last_error = db.Column(db.Text, nullable=True)
+    
+    # Timestamps
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    sent_at = db.Column(db.DateTime, nullable=True)
+    
+    # The worker polls for due, pending mail
+    __table_args__ = (
+        db.Index('idx_outbound_email_due', 'status', 'next_attempt_at'),
+    )
+    
+    def __repr__(self):
+        return f'<OutboundEmail {self.id} to={self.recipients} status={self.status}>'
@@ -0,0 +1,33 @@
+# lms/models/slow_query.py
+
+from lms.extensions import db
+from datetime import datetime
+
+
+class SlowQuery(db.Model):
+    """
+    One statement that ran longer than SLOW_QUERY_THRESHOLD_MS.
+    
+    Written by lms/slow_queries.py and grouped by `digest` (a hash of the
+    fingerprint, so long SQL doesn't need a text index) on the admin
+    Slow Queries page. Rows past SLOW_QUERY_RETENTION_DAYS are pruned.
+    """
+    
+    __tablename__ = 'slow_query'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    digest = db.Column(db.String(40), nullable=False)
+    fingerprint = db.Column(db.Text, nullable=False)  # normalized SQL (lms.query_stats.fingerprint)
+    params = db.Column(db.String(500), nullable=True)  # bind parameter types, never values
+    endpoint = db.Column(db.String(100), nullable=True)  # endpoint, CLI command or thread name
+    duration_ms = db.Column(db.Float, nullable=False)
+    plan = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    __table_args__ = (
+        db.Index('idx_slow_query_digest', 'digest', 'created_at'),
+        db.Index('idx_slow_query_created', 'created_at'),
+    )
+    
+    def __repr__(self):
+        return f'<SlowQuery {self.id} {self.duration_ms:.0f}ms {self.endpoint}>'
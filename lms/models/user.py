@@ -2,7 +2,11 @@
 from itsdangerous import URLSafeTimedSerializer as Serializer
 from flask import current_app
 from lms import db
+from lms.user_cache import invalidate_user
 from flask_login import UserMixin
+from sqlalchemy import case, event, or_, update
+from sqlalchemy.orm.attributes import set_committed_value
+from datetime import date, timedelta
 
 
 class User(db.Model, UserMixin):
@@ -20,21 +24,34 @@ class User(db.Model, UserMixin):
     streak_last_active = db.Column(db.Date, nullable=True)
     login_streak = db.Column(db.Integer, default=0)
 
+    # Keyset pagination in the admin user manager filters by role/admin and orders by id
+    __table_args__ = (
+        db.Index('idx_user_role_id', 'role', 'id'),
+        db.Index(
+            'idx_user_admin_id', 'id',
+            postgresql_where=(is_admin == True), sqlite_where=(is_admin == True)
+        ),
+    )
+
     # -------------------------------
     # Relationships
     # -------------------------------
+    # passive_deletes: the database's ON DELETE CASCADE removes these rows,
+    # so deleting a user doesn't load them all first
     user_enrollments = db.relationship(
         'Enrollment',
         backref='user',          
         lazy='dynamic',
-        cascade='all, delete-orphan'
+        cascade='all, delete-orphan',
+        passive_deletes=True
     )
 
     lesson_completions = db.relationship(
         'LessonCompletion',
         backref='user',
         lazy='dynamic',
-        cascade='all, delete-orphan'
+        cascade='all, delete-orphan',
+        passive_deletes=True
     )
 
     # -------------------------------
@@ -65,5 +82,67 @@ class User(db.Model, UserMixin):
             return None
         return db.session.get(User, data['user_id'])
 
+    def record_daily_login(self, today=None):
+        """
+        Advance the login streak in one conditional UPDATE and return it.
+
+        Logging in the day after streak_last_active extends the streak, any
+        longer gap restarts it at 1, and a second login on the same day
+        matches no row (no write). The caller commits.
+        """
+        today = today or date.today()
+        yesterday = today - timedelta(days=1)
+        stmt = (
+            update(User)
+            .where(
+                User.id == self.id,
+                or_(User.streak_last_active.is_(None), User.streak_last_active < today)
+            )
+            .values(
+                login_streak=case(
+                    (User.streak_last_active == yesterday, db.func.coalesce(User.login_streak, 0) + 1),
+                    else_=1
+                ),
+                streak_last_active=today
+            )
+            .returning(User.login_streak)
+            .execution_options(synchronize_session=False)
+        )
+        streak = db.session.execute(stmt).scalar()
+        if streak is None:
+            return self.login_streak
+
+        # Bulk UPDATEs skip mapper events: sync the instance and the identity cache by hand
+        set_committed_value(self, 'login_streak', streak)
+        set_committed_value(self, 'streak_last_active', today)
+        invalidate_user(self.id)
+        return streak
+
+    @staticmethod
+    def reset_lapsed_streaks(today=None):
+        """Zero every streak whose last login was before yesterday. Returns the row count."""
+        today = today or date.today()
+        stmt = (
+            update(User)
+            .where(
+                User.login_streak > 0,
+                or_(User.streak_last_active.is_(None),
+                    User.streak_last_active < today - timedelta(days=1))
+            )
+            .values(login_streak=0)
+            .execution_options(synchronize_session=False)
+        )
+        return db.session.execute(stmt).rowcount
+
     def __repr__(self):
         return f'<User {self.email}>'
+
+
+
+# --- Keep the user_loader cache in sync with profile/role/admin changes ---
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def receive_after_change(mapper, connection, target):
+    """Drop the cached identity whenever a user row is updated or deleted."""
+    invalidate_user(target.id)
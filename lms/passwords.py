@@ -0,0 +1,125 @@
+# lms/passwords.py
+
+"""
+Password hashing off the request thread.
+
+bcrypt is deliberately slow and CPU-bound. All hashing/checking goes
+through a small per-process thread pool (bcrypt releases the GIL) so a
+login burst can only occupy PASSWORD_HASH_WORKERS cores per worker, and
+requests beyond PASSWORD_HASH_QUEUE_DEPTH are rejected immediately with
+PasswordHasherBusy instead of piling up.
+"""
+
+import multiprocessing
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import bcrypt as _bcrypt
+
+from lms.extensions import bcrypt
+
+
+_COST_RE = re.compile(r'^\$2[abxy]?\$(\d{2})\$')
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when too many hashing jobs are already running or queued."""
+
+    retry_after = 5
+
+
+class PasswordHasher:
+    """Bounded thread pool for bcrypt work (a Flask extension)."""
+
+    def __init__(self, app=None):
+        self.workers = 2
+        self.queue_depth = 16
+        self.timeout = 30
+        self.log_rounds = 12
+        self._executor = None
+        self._slots = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.workers = app.config.get('PASSWORD_HASH_WORKERS', 2)
+        self.queue_depth = app.config.get('PASSWORD_HASH_QUEUE_DEPTH', 16)
+        self.timeout = app.config.get('PASSWORD_HASH_TIMEOUT', 30)
+        self.log_rounds = app.config.get('BCRYPT_LOG_ROUNDS', 12)
+        self.shutdown()
+        app.extensions['password_hasher'] = self
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+            self._executor = None
+            self._slots = None
+
+    def _start(self, fn, *args):
+        # Created lazily so each gunicorn worker builds its pool after forking
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix='bcrypt'
+                )
+                self._slots = threading.BoundedSemaphore(self.workers + self.queue_depth)
+            executor, slots = self._executor, self._slots
+
+        if not slots.acquire(blocking=False):
+            raise PasswordHasherBusy()
+        try:
+            future = executor.submit(fn, *args)
+        except Exception:
+            slots.release()
+            raise
+        future.add_done_callback(lambda _: slots.release())
+        return future
+
+    def _submit(self, fn, *args):
+        return self._start(fn, *args).result(timeout=self.timeout)
+
+    def hash(self, password):
+        """Return a bcrypt hash (str) of password at the configured cost."""
+        return self._submit(bcrypt.generate_password_hash, password).decode('utf-8')
+
+    def hash_many(self, passwords):
+        """Hash several passwords, at most PASSWORD_HASH_WORKERS at a time; hashes in order."""
+        hashes = []
+        for i in range(0, len(passwords), self.workers):
+            futures = [self._start(bcrypt.generate_password_hash, pw) for pw in passwords[i:i + self.workers]]
+            hashes.extend(f.result(timeout=self.timeout).decode('utf-8') for f in futures)
+        return hashes
+
+    def check(self, pw_hash, password):
+        """Return True if password matches pw_hash."""
+        return self._submit(bcrypt.check_password_hash, pw_hash, password)
+
+    def needs_rehash(self, pw_hash):
+        """True if pw_hash was made with a different cost than BCRYPT_LOG_ROUNDS."""
+        match = _COST_RE.match(pw_hash or '')
+        return match is None or int(match.group(1)) != self.log_rounds
+
+
+password_hasher = PasswordHasher()
+
+
+def _hash_one(args):
+    password, rounds = args
+    return _bcrypt.hashpw(password.encode('utf-8'), _bcrypt.gensalt(rounds)).decode('utf-8')
+
+
+def bulk_hasher(workers=None):
+    """
+    Process pool for hashing many passwords at once (bulk imports), so the
+    work scales with CPU cores instead of PASSWORD_HASH_WORKERS threads.
+    Uses spawn so children don't inherit DB connections or threads.
+    """
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+
+
+def hash_many(executor, passwords, rounds):
+    """Hash `passwords` on `executor` (see bulk_hasher), returning hashes in order."""
+    return list(executor.map(_hash_one, [(pw, rounds) for pw in passwords], chunksize=16))
@@ -0,0 +1,215 @@
+# lms/profiling.py
+
+"""
+On-demand cProfile of single requests.
+
+An admin mints a short-lived signed token on the admin Profiles page
+(admin.profiles) and sends it as an `X-Profile-Token` header with the
+request to profile. The token names the admin who minted it and stops
+working as soon as they are no longer an admin. It is only read from the
+header, never the query string, so it doesn't end up in access logs or
+Referer headers. That
+request, and only that request, runs under cProfile; the stats are written
+to PROFILING_DIR as a .prof file (pstats format: snakeviz, flameprof,
+gprof2dot, tuna) with a .json sidecar describing the request. Only the
+newest PROFILING_MAX_FILES profiles are kept.
+
+Requests without a token pay one header lookup; with PROFILING_ENABLED off no hooks are installed at all.
+
+Only one request per worker process is profiled at a time. On Python 3.12+
+cProfile hooks sys.monitoring, which is interpreter-wide: a second profiler
+can't be enabled while one is running, and the running one also records
+the other gthread threads' calls. A token-carrying request that overlaps a
+profile in progress is served normally, without a profile, and a warning
+is logged. Profiles taken while other requests were in flight on the same
+worker can still include their frames.
+"""
+
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from flask import current_app, g, request
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+from werkzeug.security import safe_join
+
+from lms.extensions import db
+from lms.models import User
+from lms.query_stats import current_stats
+
+
+logger = logging.getLogger(__name__)
+
+TOKEN_HEADER = 'X-Profile-Token'
+
+# Held while a request in this process is being profiled (see module docstring)
+_profiling = threading.Lock()
+
+
+def _serializer():
+    return URLSafeTimedSerializer(current_app.config['SECRET_KEY'], salt='request-profiling')
+
+
+def make_profile_token(user):
+    """Signed token that enables profiling for requests carrying it."""
+    return _serializer().dumps({'admin': user.id})
+
+
+def profile_dir():
+    return current_app.config.get('PROFILING_DIR') or os.path.join(current_app.instance_path, 'profiles')
+
+
+def _valid(token):
+    """True if the token is signed, unexpired, and its admin still exists and is an admin."""
+    max_age = current_app.config.get('PROFILING_TOKEN_MAX_AGE', 900)
+    try:
+        payload = _serializer().loads(token, max_age=max_age)
+    except BadSignature:  # includes SignatureExpired
+        logger.warning("Ignoring invalid or expired profile token on %s", request.path)
+        return False
+
+    admin_id = payload.get('admin') if isinstance(payload, dict) else None
+    user = db.session.get(User, admin_id) if isinstance(admin_id, int) else None
+    if user is None or not user.is_admin:
+        logger.warning("Ignoring profile token of non-admin %r on %s", admin_id, request.path)
+        return False
+    return True
+
+
+def list_profiles():
+    """Metadata of the stored profiles, newest first."""
+    directory = profile_dir()
+    try:
+        names = sorted((n for n in os.listdir(directory) if n.endswith('.json')), reverse=True)
+    except FileNotFoundError:
+        return []
+
+    profiles = []
+    for name in names:
+        try:
+            with open(os.path.join(directory, name)) as f:
+                profiles.append(json.load(f))
+        except (OSError, ValueError):
+            continue  # pruned by another worker mid-listing
+    return profiles
+
+
+def profile_summary(name, limit=40):
+    """Top functions by cumulative time, as text. FileNotFoundError if there is no such profile."""
+    path = safe_join(profile_dir(), name) if name.endswith('.prof') else None
+    if path is None or not os.path.isfile(path):
+        raise FileNotFoundError(name)
+    out = io.StringIO()
+    stats = pstats.Stats(path, stream=out)
+    stats.strip_dirs().sort_stats('cumulative').print_stats(limit)
+    return out.getvalue()
+
+
+def _prune(directory, keep):
+    """Delete all but the newest `keep` profiles (names sort by time)."""
+    stems = sorted({os.path.splitext(n)[0] for n in os.listdir(directory) if n.endswith(('.prof', '.json'))})
+    for stem in stems[:-keep] if keep > 0 else stems:
+        for ext in ('.prof', '.json'):
+            try:
+                os.remove(os.path.join(directory, stem + ext))
+            except FileNotFoundError:
+                pass
+
+
+class RequestProfiler:
+    """Flask extension running token-flagged requests under cProfile."""
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions['profiling'] = self
+        if not app.config.get('PROFILING_ENABLED', True):
+            return
+
+        # First before_request hook, so the other hooks are profiled too
+        app.before_request_funcs.setdefault(None, []).insert(0, self._start)
+        app.after_request(self._finish)
+        app.teardown_request(self._teardown)
+
+    def _start(self):
+        token = request.headers.get(TOKEN_HEADER)
+        if not token or not _valid(token):
+            return
+        if not _profiling.acquire(blocking=False):
+            logger.warning("Not profiling %s: another request in this worker is being profiled", request.path)
+            return
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:  # another profiler (e.g. a debugger's) holds sys.monitoring
+            _profiling.release()
+            logger.warning("Not profiling %s: a profiler is already active", request.path, exc_info=True)
+            return
+        g._profile_started = time.perf_counter()
+        g._profiler = profiler
+
+    def _stop(self):
+        """Disable and return this request's profiler, if any, and free the slot."""
+        profiler = g.pop('_profiler', None)
+        if profiler is not None:
+            profiler.disable()
+            _profiling.release()
+        return profiler
+
+    def _finish(self, response):
+        profiler = self._stop()
+        if profiler is None:
+            return response
+        duration = time.perf_counter() - g.pop('_profile_started')
+
+        try:
+            name = self._save(profiler, response, duration)
+        except OSError:
+            logger.exception("Could not write profile for %s", request.path)
+            return response
+        response.headers['X-Profile-Id'] = name
+        return response
+
+    def _teardown(self, exc):
+        # after_request didn't run (e.g. an earlier after_request hook raised)
+        self._stop()
+
+    def _save(self, profiler, response, duration):
+        directory = profile_dir()
+        os.makedirs(directory, exist_ok=True)
+
+        now = datetime.utcnow()
+        stem = f"{now:%Y%m%dT%H%M%S%f}-{uuid.uuid4().hex[:8]}"
+        profiler.dump_stats(os.path.join(directory, stem + '.prof'))
+
+        stats = current_stats()
+        meta = {
+            'name': stem + '.prof',
+            'created_at': now.isoformat(timespec='seconds'),
+            'method': request.method,
+            'path': request.full_path.rstrip('?'),
+            'endpoint': request.endpoint or 'unknown',
+            'status': response.status_code,
+            'duration_ms': round(duration * 1000, 2),
+            'queries': stats.count if stats else None,
+            'db_ms': round(stats.db_time * 1000, 2) if stats else None,
+            'pid': os.getpid(),
+        }
+        with open(os.path.join(directory, stem + '.json'), 'w') as f:
+            json.dump(meta, f)
+
+        _prune(directory, current_app.config.get('PROFILING_MAX_FILES', 50))
+        logger.info("Profiled %s %s in %.1fms -> %s", request.method, request.path, duration * 1000, meta['name'])
+        return meta['name']
+
+
+request_profiler = RequestProfiler()
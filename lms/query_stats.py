@@ -0,0 +1,174 @@
+# lms/query_stats.py
+
+"""
+Per-request SQL instrumentation.
+
+Engine-wide before/after_cursor_execute hooks count every statement a
+request runs and how long the database took. Statements are grouped by
+shape (literals and IN-lists collapsed), so a loop issuing the same query
+per row shows up as one shape executed N times: the N+1 signature.
+
+After each request:
+
+- a Server-Timing header reports DB time, query count and total time
+  (visible in the browser's network panel);
+- one JSON log line is written to the `lms.query_stats` logger;
+- the query budget for the endpoint (QUERY_BUDGETS / QUERY_BUDGET_DEFAULT)
+  and the repeated-shape limit (QUERY_REPEAT_THRESHOLD) are checked. In
+  'warn' mode violations are logged; in 'raise' mode (tests) they raise
+  QueryBudgetExceeded so the offending request fails.
+
+Subscribers (benchmarks, metrics) can connect to `query_stats_recorded`.
+"""
+
+import json
+import logging
+import re
+import time
+from collections import Counter
+
+from blinker import Namespace
+from flask import current_app, g, has_app_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+logger = logging.getLogger(__name__)
+
+query_stats_recorded = Namespace().signal('query-stats-recorded')
+
+_PLACEHOLDER = r"(?:\?|%s|%\(\w+\)s|:\w+)"
+_IN_LIST_RE = re.compile(r"\(\s*" + _PLACEHOLDER + r"(?:\s*,\s*" + _PLACEHOLDER + r")+\s*\)")
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_SPACE_RE = re.compile(r"\s+")
+
+
+class QueryBudgetExceeded(Exception):
+    """Raised in 'raise' mode when a request breaks its query budget or repeats a statement."""
+
+
+def fingerprint(statement):
+    """
+    Normalize SQL to its shape: literals become ?, placeholder lists
+    become (?), whitespace is collapsed.
+    """
+    shape = _STRING_RE.sub('?', statement)
+    shape = _NUMBER_RE.sub('?', shape)
+    shape = _SPACE_RE.sub(' ', shape).strip()
+    return _IN_LIST_RE.sub('(?)', shape)
+
+
+class RequestQueryStats:
+    """Queries, DB time and statement shapes for one request."""
+
+    def __init__(self):
+        self.count = 0
+        self.db_time = 0.0
+        self.shapes = Counter()
+
+    def record(self, statement, elapsed):
+        self.count += 1
+        self.db_time += elapsed
+        self.shapes[fingerprint(statement)] += 1
+
+    def repeated(self, threshold):
+        """[(shape, count)] for shapes executed at least `threshold` times, most first."""
+        return [(shape, n) for shape, n in self.shapes.most_common() if n >= threshold]
+
+
+def current_stats():
+    """The RequestQueryStats being collected for this request, or None."""
+    if not has_app_context():
+        return None
+    return g.get('_query_stats')
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._query_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = current_stats()
+    started = getattr(context, '_query_started', None)
+    if stats is not None and started is not None:
+        stats.record(statement, time.perf_counter() - started)
+
+
+class QueryTracker:
+    """Flask extension wiring the cursor hooks to per-request reporting."""
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions['query_stats'] = self
+        if not app.config.get('QUERY_STATS_ENABLED', True):
+            return
+
+        if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+
+        # First before_request hook, so queries made by later hooks are counted too
+        app.before_request_funcs.setdefault(None, []).insert(0, self._start)
+        app.after_request(self._finish)
+
+    def _start(self):
+        g._query_stats = RequestQueryStats()
+        g._request_started = time.perf_counter()
+
+    def _finish(self, response):
+        stats = g.pop('_query_stats', None)
+        if stats is None:
+            return response
+        config = current_app.config
+
+        duration = time.perf_counter() - g.pop('_request_started')
+        endpoint = request.endpoint or 'unknown'
+
+        if config.get('QUERY_STATS_SERVER_TIMING', True):
+            response.headers.add(
+                'Server-Timing',
+                f'db;dur={stats.db_time * 1000:.2f};desc="{stats.count} queries", '
+                f'app;dur={duration * 1000:.2f}'
+            )
+
+        budget = config.get('QUERY_BUDGETS', {}).get(endpoint, config.get('QUERY_BUDGET_DEFAULT'))
+        threshold = config.get('QUERY_REPEAT_THRESHOLD', 10)
+        repeated = stats.repeated(threshold) if threshold else []
+
+        problems = []
+        if budget is not None and stats.count > budget:
+            problems.append(f"{stats.count} queries exceeds budget of {budget}")
+        for shape, n in repeated:
+            problems.append(f"possible N+1: {n}x {shape[:200]}")
+
+        record = {
+            'endpoint': endpoint,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': stats.count,
+            'db_ms': round(stats.db_time * 1000, 2),
+            'duration_ms': round(duration * 1000, 2),
+        }
+        if repeated:
+            record['repeated'] = [{'sql': shape, 'count': n} for shape, n in repeated]
+        if budget is not None:
+            record['budget'] = budget
+        logger.log(logging.WARNING if problems else logging.INFO, json.dumps(record))
+
+        query_stats_recorded.send(
+            current_app._get_current_object(), stats=stats, endpoint=endpoint,
+            status=response.status_code, duration=duration
+        )
+
+        if problems and config.get('QUERY_BUDGET_MODE', 'warn') == 'raise':
+            raise QueryBudgetExceeded(f"{request.method} {request.path} ({endpoint}): " + '; '.join(problems))
+        return response
+
+
+query_tracker = QueryTracker()
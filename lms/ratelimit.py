@@ -0,0 +1,227 @@
+# lms/ratelimit.py
+
+"""
+Token-bucket rate limiting shared across gunicorn workers.
+
+Each bucket holds up to `capacity` tokens and refills at capacity/period
+tokens per second; every attempt takes one token. Bucket state lives in a
+store all workers can see:
+
+- redis://host:port/db   production (any Redis-protocol server)
+- sqlite:///path/to.db   local/dev, shared by workers on one host
+- memory://              tests, single process only
+
+Checks run before form handling, so throttled requests never reach bcrypt,
+the database, or the mail sender.
+"""
+
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from functools import wraps
+
+from flask import current_app, request
+
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a bucket is empty; carries seconds until the next token."""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Rate limit exceeded; retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+def _take(tokens, updated, now, capacity, rate):
+    """Refill a bucket up to `now` and try to take one token."""
+    tokens = min(capacity, tokens + max(0.0, now - updated) * rate)
+    if tokens >= 1:
+        return True, tokens - 1, 0.0
+    return False, tokens, (1 - tokens) / rate
+
+
+class MemoryBackend:
+    """Process-local buckets (tests and single-process development)."""
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def hit(self, key, capacity, rate):
+        now = time.time()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            allowed, tokens, retry_after = _take(tokens, updated, now, capacity, rate)
+            self._buckets[key] = (tokens, now)
+        return allowed, retry_after
+
+    def reset(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class SQLiteBackend:
+    """Buckets in a small SQLite file shared by every worker on the host."""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS buckets (
+                    key TEXT PRIMARY KEY,
+                    tokens REAL NOT NULL,
+                    updated REAL NOT NULL
+                )
+            """)
+            self._local.conn = conn
+        return conn
+
+    def hit(self, key, capacity, rate):
+        conn = self._connection()
+        now = time.time()
+        # IMMEDIATE takes the write lock up front so read-modify-write is atomic
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT tokens, updated FROM buckets WHERE key = ?", (key,)
+            ).fetchone()
+            tokens, updated = row if row else (capacity, now)
+            allowed, tokens, retry_after = _take(tokens, updated, now, capacity, rate)
+            conn.execute(
+                "INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)",
+                (key, tokens, now)
+            )
+            # Occasionally drop buckets idle for a day
+            if int(now * 1000) % 100 == 0:
+                conn.execute("DELETE FROM buckets WHERE updated < ?", (now - 86400,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return allowed, retry_after
+
+    def reset(self):
+        self._connection().execute("DELETE FROM buckets")
+
+
+class RedisBackend:
+    """Buckets in Redis, updated atomically by a Lua script."""
+
+    SCRIPT = """
+    local capacity = tonumber(ARGV[1])
+    local rate = tonumber(ARGV[2])
+    local t = redis.call('TIME')
+    local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+    local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+    local tokens = tonumber(state[1]) or capacity
+    local updated = tonumber(state[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+    local allowed = 0
+    local retry_after = 0
+    if tokens >= 1 then
+        tokens = tokens - 1
+        allowed = 1
+    else
+        retry_after = (1 - tokens) / rate
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+    redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+    return {allowed, tostring(retry_after)}
+    """
+
+    def __init__(self, url):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("RATELIMIT_STORAGE_URL uses redis:// but the 'redis' package is not installed") from e
+        self._client = redis.Redis.from_url(url)
+        self._script = self._client.register_script(self.SCRIPT)
+
+    def hit(self, key, capacity, rate):
+        allowed, retry_after = self._script(keys=[f"ratelimit:{key}"], args=[capacity, rate])
+        return bool(allowed), float(retry_after)
+
+    def reset(self):
+        for key in self._client.scan_iter("ratelimit:*"):
+            self._client.delete(key)
+
+
+class RateLimiter:
+    """Flask extension choosing a backend from RATELIMIT_STORAGE_URL."""
+
+    def __init__(self, app=None):
+        self.backend = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        url = app.config.get('RATELIMIT_STORAGE_URL') or \
+            'sqlite:///' + os.path.join(app.instance_path, 'ratelimit.db')
+
+        if url.startswith('memory://'):
+            self.backend = MemoryBackend()
+        elif url.startswith('sqlite:///'):
+            self.backend = SQLiteBackend(url[len('sqlite:///'):])
+        elif url.startswith(('redis://', 'rediss://', 'unix://')):
+            self.backend = RedisBackend(url)
+        else:
+            raise RuntimeError(f"Unsupported RATELIMIT_STORAGE_URL: {url}")
+        app.extensions['rate_limiter'] = self
+
+    def hit(self, key, limit):
+        """
+        Take a token from `key` for limit = (capacity, period_seconds).
+        Raises RateLimitExceeded when the bucket is empty. Store outages
+        are logged and fail open so they never lock users out.
+        """
+        capacity, period = limit
+        try:
+            allowed, retry_after = self.backend.hit(key, capacity, capacity / period)
+        except Exception:
+            logger.exception("Rate limit store unavailable; allowing request for %s", key)
+            return
+        if not allowed:
+            raise RateLimitExceeded(max(1, math.ceil(retry_after)))
+
+    def reset(self):
+        self.backend.reset()
+
+
+rate_limiter = RateLimiter()
+
+
+def limit_attempts(scope):
+    """
+    Throttle POSTs to a view by client IP and by the submitted email.
+
+    Limits come from RATELIMIT_<SCOPE>_PER_IP and RATELIMIT_<SCOPE>_PER_ACCOUNT,
+    each a (capacity, period_seconds) tuple.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapped(*args, **kwargs):
+            config = current_app.config
+            if request.method == 'POST' and config.get('RATELIMIT_ENABLED', True):
+                prefix = f"RATELIMIT_{scope.upper()}"
+                rate_limiter.hit(f"{scope}:ip:{request.remote_addr}", config[f"{prefix}_PER_IP"])
+
+                email = request.form.get('email', '').strip().lower()
+                if email:
+                    rate_limiter.hit(f"{scope}:account:{email}", config[f"{prefix}_PER_ACCOUNT"])
+            return view(*args, **kwargs)
+        return wrapped
+    return decorator
@@ -0,0 +1,340 @@
+# lms/slow_queries.py
+
+"""
+Slow query log.
+
+Cursor hooks on the app's engine time every statement. One slower than
+SLOW_QUERY_THRESHOLD_MS is recorded with its fingerprint
+(lms.query_stats.fingerprint), the types of its bind parameters (never the
+values), where it came from (endpoint, CLI command or thread name) and a
+query plan:
+
+- PostgreSQL: plain EXPLAIN (estimates only; nothing is executed). With
+  SLOW_QUERY_EXPLAIN_ANALYZE on, plain SELECTs get EXPLAIN (ANALYZE, BUFFERS)
+  instead, which runs the query a second time on the request thread. Writes,
+  row-locking SELECTs (FOR UPDATE/SHARE, e.g. the job and mail queue claims)
+  and statements calling volatile functions are never analyzed.
+- SQLite: EXPLAIN QUERY PLAN.
+
+The plan is taken on the same connection and transaction as the statement,
+through a raw DBAPI cursor so these hooks don't see it, and inside a
+savepoint on PostgreSQL so a failing EXPLAIN can't abort the request's
+transaction. A fingerprint is explained at most once per
+SLOW_QUERY_EXPLAIN_INTERVAL seconds per worker.
+
+Records are written to the slow_query table by a background thread on its
+own connection: the slow request isn't slowed down further, and the record
+survives the request rolling back. Rows older than
+SLOW_QUERY_RETENTION_DAYS are deleted as new ones arrive. The admin Slow
+Queries page groups them by fingerprint; full scans in the captured plans
+are flagged there to point at missing indexes.
+"""
+
+import hashlib
+import logging
+import queue
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+
+import click
+from flask import has_request_context, request
+from sqlalchemy import delete, event, func, insert, select
+
+from lms.extensions import db
+from lms.models import SlowQuery
+from lms.query_stats import fingerprint
+
+
+logger = logging.getLogger(__name__)
+
+_EXPLAINABLE = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH')
+# Statements that must not run twice even though they start with SELECT
+_NOT_ANALYZABLE_RE = re.compile(
+    r"\bFOR\s+(?:NO\s+KEY\s+UPDATE|UPDATE|KEY\s+SHARE|SHARE)\b"
+    r"|\b(?:nextval|setval|pg_notify|pg_(?:try_)?advisory_\w+|pg_sleep\w*|random|clock_timestamp"
+    r"|gen_random_uuid|txid_current|pg_current_xact_id)\s*\(",
+    re.IGNORECASE
+)
+# PostgreSQL "Seq Scan on t"; SQLite "SCAN t" without "USING ... INDEX" (not subqueries or constant rows)
+_FULL_SCAN_RE = re.compile(r"Seq Scan on (\w+)|\bSCAN (?:TABLE )?(?!anon_\d|CONSTANT\b)(\w+)\b(?! USING)")
+
+
+def param_shape(parameters, executemany=False):
+    """Bind parameter types, e.g. '(int, str x3)' or '{email_1: str}'; '500 x (...)' for executemany."""
+    if executemany:
+        return f"{len(parameters)} x {param_shape(parameters[0])}" if parameters else '[]'
+    if isinstance(parameters, dict):
+        return '{' + ', '.join(f"{key}: {type(value).__name__}" for key, value in parameters.items()) + '}'
+
+    runs = []
+    for value in parameters or ():
+        name = type(value).__name__
+        if runs and runs[-1][0] == name:
+            runs[-1][1] += 1
+        else:
+            runs.append([name, 1])
+    return '(' + ', '.join(name if n == 1 else f"{name} x{n}" for name, n in runs) + ')'
+
+
+def scanned_tables(plan):
+    """Tables the plan reads with a full scan (no index), in plan order."""
+    tables = []
+    for match in _FULL_SCAN_RE.finditer(plan or ''):
+        table = match.group(1) or match.group(2)
+        if table not in tables:
+            tables.append(table)
+    return tables
+
+
+def _origin():
+    """Endpoint of the current request, else the CLI command, else the thread name."""
+    if has_request_context():
+        return request.endpoint or request.path
+    ctx = click.get_current_context(silent=True)
+    if ctx is not None:
+        return ctx.command_path
+    return threading.current_thread().name
+
+
+def _sqlite_plan(rows):
+    # EXPLAIN QUERY PLAN rows are (id, parent, notused, detail); indent children under parents
+    depth = {0: -1}
+    lines = []
+    for node_id, parent, _, detail in rows:
+        depth[node_id] = depth.get(parent, -1) + 1
+        lines.append('  ' * depth[node_id] + detail)
+    return '\n'.join(lines)
+
+
+def analyzable(statement):
+    """True if EXPLAIN ANALYZE may re-run the statement: a SELECT that locks nothing and calls nothing volatile."""
+    verb = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ''
+    return verb == 'SELECT' and not _NOT_ANALYZABLE_RE.search(statement)
+
+
+def explain(dbapi_connection, dialect, statement, parameters, analyze=False):
+    """
+    Plan for a statement that just ran on this DBAPI connection, or None if it
+    can't be explained. analyze=True allows EXPLAIN ANALYZE on PostgreSQL for
+    statements that pass analyzable().
+    """
+    verb = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ''
+    if verb not in _EXPLAINABLE:
+        return None
+
+    cursor = dbapi_connection.cursor()
+    try:
+        if dialect == 'sqlite':
+            cursor.execute('EXPLAIN QUERY PLAN ' + statement, parameters)
+            return _sqlite_plan(cursor.fetchall())
+
+        if dialect == 'postgresql':
+            prefix = 'EXPLAIN (ANALYZE, BUFFERS) ' if analyze and analyzable(statement) else 'EXPLAIN '
+            cursor.execute('SAVEPOINT slow_query_explain')
+            try:
+                cursor.execute(prefix + statement, parameters)
+                plan = '\n'.join(row[0] for row in cursor.fetchall())
+            except Exception:
+                cursor.execute('ROLLBACK TO SAVEPOINT slow_query_explain')
+                raise
+            cursor.execute('RELEASE SAVEPOINT slow_query_explain')
+            return plan
+        return None
+    finally:
+        cursor.close()
+
+
+class _Writer:
+    """Inserts records on a daemon thread; started lazily so each gunicorn worker gets its own."""
+
+    def __init__(self, engine, retention_days):
+        # Statements run through this engine are skipped by the hooks
+        self.engine = engine.execution_options(slow_query_log=False)
+        self.retention_days = retention_days
+        self.queue = queue.Queue(maxsize=1000)
+        self._thread = None
+        self._lock = threading.Lock()
+        self._pruned_at = 0.0
+
+    def put(self, record):
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name='slow-query-log', daemon=True)
+                    self._thread.start()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            logger.warning("Slow query log is backed up; dropping %s", record['fingerprint'][:200])
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < 100:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write(batch)
+            except Exception:
+                logger.exception("Could not write %s slow query record(s)", len(batch))
+
+    def _write(self, batch):
+        with self.engine.begin() as conn:
+            conn.execute(insert(SlowQuery), batch)
+            # Prune at most hourly
+            if self.retention_days and time.monotonic() - self._pruned_at > 3600:
+                cutoff = datetime.utcnow() - timedelta(days=self.retention_days)
+                conn.execute(delete(SlowQuery).where(SlowQuery.created_at < cutoff))
+                self._pruned_at = time.monotonic()
+
+
+class SlowQueryLog:
+    """Flask extension installing the slow query hooks on the app's engine."""
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions['slow_queries'] = self
+        if not app.config.get('SLOW_QUERY_LOG_ENABLED', True):
+            return
+
+        config = app.config
+        threshold = config.get('SLOW_QUERY_THRESHOLD_MS', 200) / 1000
+        explain_enabled = config.get('SLOW_QUERY_EXPLAIN', True)
+        explain_analyze = config.get('SLOW_QUERY_EXPLAIN_ANALYZE', False)
+        explain_interval = config.get('SLOW_QUERY_EXPLAIN_INTERVAL', 300)
+        with app.app_context():
+            engine = db.engine
+        writer = _Writer(engine, config.get('SLOW_QUERY_RETENTION_DAYS', 14))
+        explained = {}  # digest -> monotonic time of the last plan, this worker
+        explained_lock = threading.Lock()
+
+        def should_explain(digest):
+            now = time.monotonic()
+            with explained_lock:
+                if now - explained.get(digest, -explain_interval) < explain_interval:
+                    return False
+                if len(explained) > 10000:
+                    explained.clear()
+                explained[digest] = now
+                return True
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            if context is not None:
+                context._slow_query_started = time.perf_counter()
+
+        def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            started = getattr(context, '_slow_query_started', None)
+            if started is None:
+                return
+            elapsed = time.perf_counter() - started
+            if elapsed < threshold or not context.execution_options.get('slow_query_log', True):
+                return
+
+            shape = fingerprint(statement)
+            digest = hashlib.sha1(shape.encode()).hexdigest()
+            plan = None
+            if explain_enabled and not executemany and should_explain(digest):
+                try:
+                    plan = explain(cursor.connection, conn.dialect.name, statement, parameters, explain_analyze)
+                except Exception as e:
+                    logger.debug("EXPLAIN failed for %s: %s", shape[:200], e)
+
+            record = {
+                'digest': digest,
+                'fingerprint': shape,
+                'params': param_shape(parameters, executemany)[:500],
+                'endpoint': _origin()[:100],
+                'duration_ms': round(elapsed * 1000, 2),
+                'plan': plan,
+                'created_at': datetime.utcnow(),
+            }
+            logger.warning("Slow query (%.0fms, %s): %s", elapsed * 1000, record['endpoint'], shape[:500])
+            writer.put(record)
+
+        event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', after_cursor_execute)
+
+
+def slow_query_groups(days=7, table=None, limit=100):
+    """
+    Slow queries of the last `days` grouped by fingerprint, most total time
+    first. `table` keeps fingerprints mentioning that table. Each group has
+    its call count, avg/max/total ms, last seen, endpoints with counts, the
+    latest params shape and plan, and the tables that plan fully scans.
+    """
+    since = datetime.utcnow() - timedelta(days=days)
+    filters = [SlowQuery.created_at >= since]
+    if table:
+        filters.append(SlowQuery.fingerprint.contains(table))
+
+    totals = db.session.execute(
+        select(
+            SlowQuery.digest,
+            func.count(SlowQuery.id).label('calls'),
+            func.avg(SlowQuery.duration_ms).label('avg_ms'),
+            func.max(SlowQuery.duration_ms).label('max_ms'),
+            func.sum(SlowQuery.duration_ms).label('total_ms'),
+            func.max(SlowQuery.created_at).label('last_seen'),
+        )
+        .where(*filters)
+        .group_by(SlowQuery.digest)
+        .order_by(func.sum(SlowQuery.duration_ms).desc())
+        .limit(limit)
+    ).all()
+    if not totals:
+        return []
+    digests = [row.digest for row in totals]
+
+    # Latest sample per fingerprint, preferring one with a plan
+    ranked = (
+        select(
+            SlowQuery.digest, SlowQuery.fingerprint, SlowQuery.params, SlowQuery.plan,
+            func.row_number().over(
+                partition_by=SlowQuery.digest,
+                order_by=(SlowQuery.plan.is_(None), SlowQuery.created_at.desc())
+            ).label('rank')
+        )
+        .where(SlowQuery.digest.in_(digests), *filters)
+        .subquery()
+    )
+    samples = {
+        row.digest: row
+        for row in db.session.execute(select(ranked).where(ranked.c.rank == 1))
+    }
+
+    endpoints = {}
+    for digest, endpoint, calls in db.session.execute(
+        select(SlowQuery.digest, SlowQuery.endpoint, func.count(SlowQuery.id))
+        .where(SlowQuery.digest.in_(digests), *filters)
+        .group_by(SlowQuery.digest, SlowQuery.endpoint)
+        .order_by(func.count(SlowQuery.id).desc())
+    ):
+        endpoints.setdefault(digest, []).append((endpoint, calls))
+
+    groups = []
+    for row in totals:
+        sample = samples[row.digest]
+        groups.append({
+            'digest': row.digest,
+            'fingerprint': sample.fingerprint,
+            'calls': row.calls,
+            'avg_ms': row.avg_ms,
+            'max_ms': row.max_ms,
+            'total_ms': row.total_ms,
+            'last_seen': row.last_seen,
+            'endpoints': endpoints.get(row.digest, []),
+            'params': sample.params,
+            'plan': sample.plan,
+            'full_scans': scanned_tables(sample.plan),
+        })
+    return groups
+
+
+slow_query_log = SlowQueryLog()
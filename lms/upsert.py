@@ -0,0 +1,31 @@
+# lms/upsert.py
+
+"""
+Dialect-aware INSERT ... ON CONFLICT DO NOTHING.
+
+Lets idempotent writes (enrolling, marking a lesson complete) rely on a
+unique constraint instead of select-then-insert, which races under load.
+"""
+
+from sqlalchemy.dialects import postgresql, sqlite
+
+from lms.extensions import db
+
+
+_INSERTS = {
+    'postgresql': postgresql.insert,
+    'sqlite': sqlite.insert,
+}
+
+
+def insert_ignore(model, index_elements):
+    """
+    Return an INSERT for `model` that silently skips rows conflicting on
+    the unique columns in `index_elements`.
+    """
+    dialect = db.session.get_bind().dialect.name
+    try:
+        insert = _INSERTS[dialect]
+    except KeyError:
+        raise RuntimeError(f"ON CONFLICT DO NOTHING is not supported on {dialect}") from None
+    return insert(model).on_conflict_do_nothing(index_elements=index_elements)
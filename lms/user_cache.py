@@ -0,0 +1,111 @@
+# lms/user_cache.py
+
+"""
+Worker-local identity cache for Flask-Login's user_loader.
+
+Every authenticated request needs the current user. Instead of a SELECT on
+`user` per request, we keep a small LRU of user column snapshots with a
+short TTL and re-attach a snapshot to the session without touching the DB.
+
+Entries are dropped whenever a User row is updated or deleted through the
+ORM in this process; the TTL bounds how long other workers can serve a
+stale copy (e.g. after a role change).
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy.orm import make_transient_to_detached
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire after `ttl` seconds."""
+
+    def __init__(self, maxsize=1024, ttl=30):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[0] < time.monotonic():
+                if item is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def set(self, key, value):
+        if self.maxsize <= 0 or self.ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def delete_many(self, keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+user_cache = TTLCache()
+
+
+def init_user_cache(app):
+    """Configure the cache from USER_CACHE_SIZE / USER_CACHE_TTL."""
+    user_cache.maxsize = app.config.get('USER_CACHE_SIZE', 1024)
+    user_cache.ttl = app.config.get('USER_CACHE_TTL', 30)
+    user_cache.clear()
+
+
+def invalidate_user(user_id):
+    """Drop a user from this worker's cache."""
+    user_cache.delete(user_id)
+
+
+def invalidate_users(user_ids):
+    """Drop many users at once (after bulk UPDATE/DELETE, which skip mapper events)."""
+    user_cache.delete_many(user_ids)
+
+
+def _snapshot(user):
+    return {column.key: getattr(user, column.key) for column in user.__table__.columns}
+
+
+def load_cached_user(session, user_id):
+    """
+    Return the User for user_id, attached to `session`.
+
+    Cache hits rebuild the instance from its snapshot and merge it with
+    load=False, which attaches it as persistent without emitting SQL.
+    """
+    from lms.models.user import User
+
+    values = user_cache.get(user_id)
+    if values is not None:
+        user = User(**values)
+        make_transient_to_detached(user)
+        return session.merge(user, load=False)
+
+    user = session.get(User, user_id)
+    if user is not None:
+        user_cache.set(user_id, _snapshot(user))
+    return user
+
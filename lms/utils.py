@@ -1,17 +1,12 @@
-from flask_mail import Message
-from flask import url_for, current_app
-from lms.__init__ import mail # Assuming you import mail from __init__
+from flask import url_for
+from lms import db
 from lms.models.user import User 
-import threading
-
-def send_async_email(app, msg):
-    """Sends the email asynchronously using a thread."""
-    with app.app_context():
-        mail.send(msg)
+from lms.mail_queue import enqueue_email
 
 def send_reset_email(user: User):
     """
-    Sends a password reset email to the given user.
+    Queues a password reset email for the given user.
+    Delivery happens in the `flask mail-worker` process.
     """
     token = user.get_reset_token()
     
@@ -19,11 +14,7 @@ def send_reset_email(user: User):
     # _external=True generates the full URL (e.g., http://127.0.0.1:5000/auth/reset_password/...)
     reset_url = url_for('auth.reset_token', token=token, _external=True) 
 
-    msg = Message('Password Reset Request',
-                  sender=current_app.config['MAIL_DEFAULT_SENDER'],
-                  recipients=[user.email])
-    
-    msg.body = f"""
+    body = f"""
 To reset your password, visit the following link:
 {reset_url}
 
@@ -31,5 +22,6 @@ If you did not make this request, simply ignore this email and no changes will b
 The link will expire in 30 minutes.
 """
     
-    # Send email in a non-blocking background thread
-    threading.Thread(target=send_async_email, args=(current_app._get_current_object(), msg)).start()
\ No newline at end of file
+    # Stored in the outbox table so it survives worker restarts
+    enqueue_email('Password Reset Request', [user.email], body)
+    db.session.commit()
@@ -45,6 +45,15 @@ target_db = current_app.extensions['migrate'].db
 # ... etc.
 
 
+# columns/indexes managed outside the models (see migrations using op.execute)
+UNMANAGED_OBJECTS = {
+    'search_vector',
+    'idx_messages_search',
+    'idx_user_name_trgm',
+    'idx_user_email_trgm',
+}
+
+
 def get_metadata():
     if hasattr(target_db, 'metadatas'):
         return target_db.metadatas[None]
@@ -90,13 +99,30 @@ def run_migrations_online():
                 directives[:] = []
                 logger.info('No changes in schema detected.')
 
+    # objects created with raw DDL (e.g. full-text search) that are not in
+    # the models; keep autogenerate from proposing to drop them
+    def include_object(object, name, type_, reflected, compare_to):
+        if reflected and compare_to is None and name in UNMANAGED_OBJECTS:
+            return False
+        if type_ == 'table' and name.startswith(('messages_fts', 'user_fts')):
+            return False
+        return True
+
     conf_args = current_app.extensions['migrate'].configure_args
     if conf_args.get("process_revision_directives") is None:
         conf_args["process_revision_directives"] = process_revision_directives
+    if conf_args.get("include_object") is None:
+        conf_args["include_object"] = include_object
 
     connectable = get_engine()
 
     with connectable.connect() as connection:
+        if connection.dialect.name == 'sqlite':
+            # Batch mode copies and drops tables; with foreign keys enforced the
+            # DROP would cascade-delete child rows
+            connection.exec_driver_sql('PRAGMA foreign_keys=OFF')
+            connection.commit()
+
         context.configure(
             connection=connection,
             target_metadata=get_metadata(),
@@ -0,0 +1,64 @@
+"""Cascade deletes in the database and index foreign keys
+
+Revision ID: 368c24d60c23
+Revises: 4f7b07b9d5f9
+Create Date: 2026-10-19 14:40:20.243735
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '368c24d60c23'
+down_revision = '4f7b07b9d5f9'
+branch_labels = None
+depends_on = None
+
+
+# Matches PostgreSQL's default FK names and names SQLite's unnamed FKs for batch mode
+NAMING_CONVENTION = {'fk': '%(table_name)s_%(column_0_name)s_fkey'}
+
+# (table, column, referred table, new index on the column)
+FOREIGN_KEYS = [
+    ('enrollment', 'user_id', 'user', None),
+    ('enrollment', 'course_id', 'course', 'ix_enrollment_course_id'),
+    ('lesson', 'module_id', 'module', 'ix_lesson_module_id'),
+    ('lesson_completion', 'user_id', 'user', None),
+    ('lesson_completion', 'lesson_id', 'lesson', 'ix_lesson_completion_lesson_id'),
+    ('module', 'course_id', 'course', 'ix_module_course_id'),
+]
+
+
+def _tables():
+    tables = []
+    for table, *_ in FOREIGN_KEYS:
+        if table not in tables:
+            tables.append(table)
+    return tables
+
+
+def upgrade():
+    for table in _tables():
+        with op.batch_alter_table(table, schema=None, naming_convention=NAMING_CONVENTION) as batch_op:
+            for fk_table, column, referred, index in FOREIGN_KEYS:
+                if fk_table != table:
+                    continue
+                if index:
+                    batch_op.create_index(index, [column], unique=False)
+                name = f'{table}_{column}_fkey'
+                batch_op.drop_constraint(name, type_='foreignkey')
+                batch_op.create_foreign_key(name, referred, [column], ['id'], ondelete='CASCADE')
+
+
+def downgrade():
+    for table in reversed(_tables()):
+        with op.batch_alter_table(table, schema=None, naming_convention=NAMING_CONVENTION) as batch_op:
+            for fk_table, column, referred, index in FOREIGN_KEYS:
+                if fk_table != table:
+                    continue
+                name = f'{table}_{column}_fkey'
+                batch_op.drop_constraint(name, type_='foreignkey')
+                batch_op.create_foreign_key(name, referred, [column], ['id'])
+                if index:
+                    batch_op.drop_index(index)
@@ -0,0 +1,74 @@
+"""Add full-text search index on messages
+
+Revision ID: 3b7e2c9d4f10
+Revises: adf6e6745174
+Create Date: 2026-10-19 09:12:41.204518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b7e2c9d4f10'
+down_revision = 'adf6e6745174'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'postgresql':
+        # Generated column is filled for existing rows when it is added
+        op.execute("""
+            ALTER TABLE messages ADD COLUMN search_vector tsvector
+            GENERATED ALWAYS AS (
+                setweight(to_tsvector('english', coalesce(subject, '')), 'A') ||
+                setweight(to_tsvector('english', content), 'B')
+            ) STORED
+        """)
+        op.execute("CREATE INDEX idx_messages_search ON messages USING GIN (search_vector)")
+
+    elif dialect == 'sqlite':
+        op.execute("""
+            CREATE VIRTUAL TABLE messages_fts USING fts5(
+                subject, content, content='messages', content_rowid='id'
+            )
+        """)
+        op.execute("""
+            CREATE TRIGGER messages_fts_insert AFTER INSERT ON messages BEGIN
+                INSERT INTO messages_fts(rowid, subject, content)
+                VALUES (new.id, new.subject, new.content);
+            END
+        """)
+        op.execute("""
+            CREATE TRIGGER messages_fts_delete AFTER DELETE ON messages BEGIN
+                INSERT INTO messages_fts(messages_fts, rowid, subject, content)
+                VALUES ('delete', old.id, old.subject, old.content);
+            END
+        """)
+        op.execute("""
+            CREATE TRIGGER messages_fts_update AFTER UPDATE OF subject, content ON messages BEGIN
+                INSERT INTO messages_fts(messages_fts, rowid, subject, content)
+                VALUES ('delete', old.id, old.subject, old.content);
+                INSERT INTO messages_fts(rowid, subject, content)
+                VALUES (new.id, new.subject, new.content);
+            END
+        """)
+        # Index messages that already exist
+        op.execute("INSERT INTO messages_fts(messages_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS idx_messages_search")
+        op.execute("ALTER TABLE messages DROP COLUMN IF EXISTS search_vector")
+
+    elif dialect == 'sqlite':
+        op.execute("DROP TRIGGER IF EXISTS messages_fts_update")
+        op.execute("DROP TRIGGER IF EXISTS messages_fts_delete")
+        op.execute("DROP TRIGGER IF EXISTS messages_fts_insert")
+        op.execute("DROP TABLE IF EXISTS messages_fts")
@@ -0,0 +1,26 @@
+"""Add course.deleting flag for background purges
+
+Revision ID: d4e7a1b93f20
+Revises: c81f4e2a6d57
+Create Date: 2026-10-19 16:05:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4e7a1b93f20'
+down_revision = 'c81f4e2a6d57'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('course', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('deleting', sa.Boolean(), server_default=sa.false(), nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('course', schema=None) as batch_op:
+        batch_op.drop_column('deleting')
@@ -0,0 +1,193 @@
+# tests/conftest.py
+
+"""
+Fixtures for the performance regression suite.
+
+The app runs against an in-memory SQLite database by default. Set
+TEST_DATABASE_URL to a (disposable) PostgreSQL database to run the same
+suite there; tables are created and dropped around every test.
+"""
+
+import os
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from config import Config
+from lms import create_app
+from lms.extensions import db
+from lms.models import Course, Enrollment, Lesson, LessonCompletion, Message, Module, User
+from lms.passwords import password_hasher
+from lms.query_stats import query_stats_recorded
+
+
+PASSWORD = 'test-password'
+
+# Multiplies every wall-time budget (slow CI machines, PostgreSQL over the network)
+TIME_FACTOR = float(os.getenv('PERF_TIME_FACTOR', 1))
+
+
+class TestConfig(Config):
+    TESTING = True
+    SECRET_KEY = 'test-secret-key'
+    SQLALCHEMY_DATABASE_URI = os.getenv('TEST_DATABASE_URL', 'sqlite://')
+    SQLALCHEMY_ENGINE_OPTIONS = {}
+    WTF_CSRF_ENABLED = False
+    RATELIMIT_ENABLED = False
+    RATELIMIT_STORAGE_URL = 'memory://'
+    BCRYPT_LOG_ROUNDS = 4
+    MAIL_SUPPRESS_SEND = True
+    MESSAGE_BROKER = 'memory'
+    SSE_MAX_STREAM_SECONDS = 0
+    # The suite asserts budgets itself (see test_query_budgets.py)
+    QUERY_BUDGET_MODE = 'warn'
+    QUERY_STATS_SERVER_TIMING = False
+
+
+def seed(scale):
+    """
+    Representative data whose size grows with `scale`: the student is
+    enrolled in `scale` courses of `scale` modules with `scale` lessons
+    each, each course has `scale` extra students who have each messaged
+    the instructor and completed the first lesson of every module, and the
+    instructor and student have exchanged `scale` messages each way.
+    Returns the ids/slugs routes need.
+    """
+    pw_hash = password_hasher.hash(PASSWORD)
+    admin = User(name='Admin User', email='admin@example.com', password=pw_hash, role='admin', is_admin=True)
+    instructor = User(name='Instructor User', email='instructor@example.com', password=pw_hash, role='instructor')
+    student = User(name='Student User', email='student@example.com', password=pw_hash, role='student')
+    db.session.add_all([admin, instructor, student])
+    db.session.flush()
+
+    classmates = [
+        User(name=f'Classmate {i}', email=f'classmate{i}@example.com', password=pw_hash, role='student')
+        for i in range(scale)
+    ]
+    db.session.add_all(classmates)
+    db.session.flush()
+
+    courses = []
+    for c in range(scale):
+        course = Course(
+            title=f'Course {c}', slug=f'course-{c}', description='A course.',
+            published=True, instructor_id=instructor.id
+        )
+        db.session.add(course)
+        db.session.flush()
+        for m in range(scale):
+            module = Module(title=f'Module {m}', order=m, course_id=course.id)
+            db.session.add(module)
+            db.session.flush()
+            for l in range(scale):
+                db.session.add(Lesson(
+                    title=f'Lesson {l}', slug=f'c{c}-m{m}-l{l}', order=l, module_id=module.id,
+                    content_url='https://www.youtube.com/watch?v=dQw4w9WgXcQ', description='Notes.'
+                ))
+        courses.append(course)
+    db.session.flush()
+
+    for course in courses:
+        first_lessons = (
+            Lesson.query.join(Module).filter(Module.course_id == course.id, Lesson.order == 0).all()
+        )
+        for user in [student] + classmates:
+            db.session.add(Enrollment(user_id=user.id, course_id=course.id))
+            for lesson in first_lessons:
+                db.session.add(LessonCompletion(user_id=user.id, lesson_id=lesson.id))
+
+    now = datetime.utcnow()
+    for i in range(scale):
+        db.session.add(Message(
+            sender_id=instructor.id, receiver_id=student.id, subject=f'Hello {i}',
+            content='Message body', created_at=now - timedelta(minutes=2 * i)
+        ))
+        db.session.add(Message(
+            sender_id=student.id, receiver_id=instructor.id, subject=f'Re: Hello {i}',
+            content='Reply body', created_at=now - timedelta(minutes=2 * i + 1)
+        ))
+    for i, classmate in enumerate(classmates):
+        db.session.add(Message(
+            sender_id=classmate.id, receiver_id=instructor.id, subject='Question',
+            content='Classmate question', created_at=now - timedelta(hours=1, minutes=i)
+        ))
+    db.session.commit()
+
+    course = courses[0]
+    module = course.modules.order_by(Module.order).first()
+    lesson = module.lessons.first()
+    return {
+        'admin_id': admin.id,
+        'instructor_id': instructor.id,
+        'student_id': student.id,
+        'classmate_id': classmates[0].id,
+        'course_id': course.id,
+        'course_slug': course.slug,
+        'module_id': module.id,
+        'lesson_id': lesson.id,
+        'lesson_slug': lesson.slug,
+        'message_id': Message.query.filter_by(receiver_id=student.id).first().id,
+        'reset_token': student.get_reset_token(),
+    }
+
+
+def build_app(scale):
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        data = seed(scale)
+        db.session.remove()
+    return app, data
+
+
+@pytest.fixture
+def app():
+    app, data = build_app(scale=3)
+    app.seed_data = data
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def data(app):
+    return app.seed_data
+
+
+def login(app, email):
+    client = app.test_client()
+    if email:
+        response = client.post('/auth/login', data={'email': email, 'password': PASSWORD})
+        assert response.status_code == 302, f"login failed for {email}"
+    return client
+
+
+class Measurement:
+    """Queries and wall time of a single request."""
+
+    def __init__(self, response, queries, seconds):
+        self.response = response
+        self.queries = queries
+        self.seconds = seconds
+
+
+def measure(app, client, method, url, **kwargs):
+    """Issue one request and return its Measurement (queries via query_stats_recorded)."""
+    counts = []
+
+    def on_recorded(sender, stats, **extra):
+        counts.append(stats.count)
+
+    query_stats_recorded.connect(on_recorded, app)
+    try:
+        started = time.perf_counter()
+        response = client.open(url, method=method, **kwargs)
+        seconds = time.perf_counter() - started
+    finally:
+        query_stats_recorded.disconnect(on_recorded, app)
+    assert len(counts) == 1, "query stats were not recorded for this request"
+    return Measurement(response, counts[0], seconds)
@@ -0,0 +1,139 @@
+# tests/test_mail_queue.py
+
+"""
+The mail outbox (lms/mail_queue.py) against a local SMTP server.
+
+aiosmtpd stands in for the real relay. Messages whose subject starts with
+'drop' make it hang up mid-transaction, the way a relay does when it
+rejects a message by closing the connection.
+"""
+
+import smtplib
+import socket
+from datetime import datetime
+
+import pytest
+from aiosmtpd.controller import Controller
+
+from lms import create_app
+from lms.extensions import db
+from lms.mail_queue import enqueue_email, run_worker, send_pending
+from lms.models import OutboundEmail
+
+from .conftest import TestConfig
+
+
+class RecordingHandler:
+    def __init__(self):
+        self.subjects = []
+
+    async def handle_DATA(self, server, session, envelope):
+        subject = next(
+            (line[len('Subject: '):] for line in envelope.content.decode().splitlines()
+             if line.startswith('Subject: ')),
+            ''
+        )
+        if subject.startswith('drop'):
+            server.transport.close()
+            return '421 Closing connection'
+        self.subjects.append(subject)
+        return '250 Message accepted'
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def smtp_server():
+    handler = RecordingHandler()
+    controller = Controller(handler, hostname='127.0.0.1', port=_free_port())
+    controller.start()
+    yield controller, handler
+    controller.stop()
+
+
+@pytest.fixture
+def mail_app(smtp_server):
+    controller, _ = smtp_server
+
+    class MailTestConfig(TestConfig):
+        SQLALCHEMY_DATABASE_URI = 'sqlite://'
+        MAIL_SERVER = controller.hostname
+        MAIL_PORT = controller.port
+        MAIL_USE_SSL = False
+        MAIL_USE_TLS = False
+        MAIL_USERNAME = None
+        MAIL_PASSWORD = None
+        MAIL_SUPPRESS_SEND = False
+        MAIL_QUEUE_MAX_ATTEMPTS = 3
+
+    app = create_app(MailTestConfig)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def _queue(*subjects):
+    ids = [enqueue_email(subject, ['student@example.com'], 'Body') for subject in subjects]
+    db.session.commit()
+    return [email.id for email in ids]
+
+
+def _make_due(email_id):
+    db.session.get(OutboundEmail, email_id).next_attempt_at = datetime.utcnow()
+    db.session.commit()
+
+
+def test_send_pending_delivers_queued_mail(mail_app, smtp_server):
+    _, handler = smtp_server
+    ids = _queue('one', 'two', 'three')
+
+    assert send_pending() == (3, 0)
+
+    assert handler.subjects == ['one', 'two', 'three']
+    for email_id in ids:
+        email = db.session.get(OutboundEmail, email_id)
+        assert email.status == OutboundEmail.STATUS_SENT
+        assert email.attempts == 1
+
+
+def test_disconnect_backs_off_the_message_and_keeps_the_rest(mail_app, smtp_server):
+    _, handler = smtp_server
+    first, dropped, last = _queue('first', 'drop me', 'last')
+
+    with pytest.raises(smtplib.SMTPServerDisconnected):
+        send_pending()
+
+    db.session.expire_all()
+    assert db.session.get(OutboundEmail, first).status == OutboundEmail.STATUS_SENT
+    email = db.session.get(OutboundEmail, dropped)
+    assert email.status == OutboundEmail.STATUS_PENDING
+    assert email.attempts == 1
+    assert email.last_error
+    assert email.next_attempt_at > datetime.utcnow()
+    untouched = db.session.get(OutboundEmail, last)
+    assert (untouched.status, untouched.attempts) == (OutboundEmail.STATUS_PENDING, 0)
+
+    # The worker reconnects; the backed-off message isn't due yet
+    run_worker(once=True)
+    assert handler.subjects == ['first', 'last']
+    assert db.session.get(OutboundEmail, dropped).status == OutboundEmail.STATUS_PENDING
+
+
+def test_message_that_keeps_disconnecting_ends_up_failed(mail_app, smtp_server):
+    _, handler = smtp_server
+    (dropped,) = _queue('drop always')
+
+    for _ in range(mail_app.config['MAIL_QUEUE_MAX_ATTEMPTS']):
+        _make_due(dropped)
+        run_worker(once=True)
+
+    email = db.session.get(OutboundEmail, dropped)
+    assert email.status == OutboundEmail.STATUS_FAILED
+    assert email.attempts == mail_app.config['MAIL_QUEUE_MAX_ATTEMPTS']
+    assert handler.subjects == []
@@ -0,0 +1,214 @@
+# tests/test_query_budgets.py
+
+"""
+Per-route query-count and wall-time budgets.
+
+Every blueprint route has an entry in ROUTES: who calls it, what it
+should return, and the most queries it may run. Raising a budget should
+be a deliberate change in review, not a side effect of a template edit.
+
+test_query_count_does_not_grow_with_data renders list pages at two data
+sizes; a query inside a loop (e.g. `course.enrollments.count()` per row)
+makes the count grow and fails the test.
+"""
+
+from collections import namedtuple
+
+import pytest
+
+from .conftest import TIME_FACTOR, build_app, login, measure
+
+
+Route = namedtuple('Route', 'endpoint method url user status queries seconds data warm headers')
+
+
+def route(endpoint, url, user='student', method='GET', status=200, queries=0, seconds=0.5, data=None, warm=None,
+          headers=None):
+    # GETs are requested once first so template compilation isn't timed
+    warm = method == 'GET' if warm is None else warm
+    return Route(endpoint, method, url, user, status, queries, seconds, data, warm, headers)
+
+
+USERS = {
+    None: None,
+    'student': 'student@example.com',
+    'instructor': 'instructor@example.com',
+    'admin': 'admin@example.com',
+}
+
+ROUTES = [
+    # --- main ---
+    route('main.home', '/', user=None, queries=0),
+    route('main.dashboard', '/dashboard', queries=25),
+    route('main.profile', '/profile', queries=5),
+    route('main.update_avatar', '/profile/avatar', method='POST', status=302, queries=1,
+          data={'avatar': 'avatar-2'}),
+    route('main.health_check', '/healthz', user=None, queries=0),
+    route('main.keep_alive', '/keep-alive', method='POST', queries=0),
+    route('metrics', '/metrics', user=None, queries=1),
+
+    # --- auth ---
+    route('auth.login', '/auth/login', user=None, queries=0),
+    route('auth.logout', '/auth/logout', status=302, queries=1, warm=False),
+    route('auth.register', '/auth/register', user=None, queries=0),
+    route('auth.forgot_password', '/auth/forgot_password', user=None, queries=0),
+    route('auth.reset_token', '/auth/reset_password/{reset_token}', user=None, queries=1),
+
+    # --- courses ---
+    route('courses.index', '/courses/', queries=1),
+    route('courses.course_detail', '/courses/{course_slug}', queries=9),
+    route('courses.course_lessons', '/courses/{course_slug}/lessons', status=302, queries=4),
+    route('courses.course_lesson', '/courses/{course_slug}/lessons/{lesson_slug}', queries=22),
+    # Partial lesson switches that can't be served answer with HX-Redirect, not a followed 302
+    route('courses.course_lesson', '/courses/{course_slug}/lessons/{lesson_slug}', user='instructor',
+          status=403, queries=3, headers={'X-Partial': '1'}),
+    route('courses.course_lesson', '/courses/{course_slug}/lessons/{lesson_slug}', user=None,
+          status=401, queries=0, headers={'X-Partial': '1'}),
+    route('courses.enroll', '/courses/{course_slug}/enroll', method='POST', status=302, queries=3),
+    route('courses.mark_lesson_complete', '/courses/{lesson_slug}/complete', method='POST',
+          status=302, queries=9),
+    route('courses.unmark_lesson_complete', '/courses/{lesson_slug}/unmark', method='POST',
+          status=302, queries=10),
+    route('courses.lesson_completion', '/courses/{lesson_slug}/completion', method='POST',
+          queries=5, data={'completed': 'true'}),
+
+    # --- instructor ---
+    route('instructor.dashboard', '/instructor/dashboard', user='instructor', queries=7),
+    route('instructor.course_students', '/instructor/course/{course_id}/students',
+          user='instructor', queries=22),
+
+    # --- messaging ---
+    route('messaging.send_message', '/messages/send', method='POST', queries=7,
+          data={'receiver_id': '{instructor_id}', 'subject': 'Question', 'content': 'Hi there'}),
+    route('messaging.broadcast_message', '/messages/broadcast/{course_id}', user='instructor',
+          method='POST', queries=5, data={'subject': 'Update', 'content': 'Hello class'}),
+    route('messaging.conversation', '/messages/conversation/{instructor_id}', queries=3),
+    route('messaging.inbox', '/messages/inbox', queries=3),
+    route('messaging.mark_as_read', '/messages/mark-read/{message_id}', method='POST', queries=5),
+    route('messaging.unread_count', '/messages/unread-count', queries=1),
+    route('messaging.search', '/messages/search?q=hello', queries=2),
+    route('messaging.stream', '/messages/stream', queries=1),
+    route('messaging.delete_message', '/messages/delete/{message_id}', method='POST', queries=3),
+    route('messaging.instructor_messages', '/messages/instructor-messages', user='instructor', queries=14),
+
+    # --- admin ---
+    route('admin.admin_index', '/admin/', user='admin', status=302, queries=0),
+    route('admin.add_course', '/admin/courses/add', user='admin', queries=0),
+    route('admin.instructor_autocomplete', '/admin/instructors/autocomplete?q=inst', user='admin', queries=1),
+    route('admin.edit_course', '/admin/courses/{course_id}/edit', user='admin', queries=2),
+    route('admin.manage_courses', '/admin/courses/manage', user='admin', queries=2),
+    route('admin.toggle_publish', '/admin/courses/{course_id}/toggle_publish', user='admin',
+          method='POST', status=302, queries=4),
+    route('admin.delete_course', '/admin/courses/{course_id}/delete', user='admin',
+          method='POST', status=302, queries=4),
+    route('admin.bulk_enroll', '/admin/enrollments/bulk', user='admin', method='POST', queries=4,
+          data={'users': 'student@example.com', 'course_ids': '{course_id}'}),
+    route('admin.bulk_course_action', '/admin/courses/bulk', user='admin', method='POST', queries=2,
+          data={'action': 'unpublish', 'ids': '{course_id}'}),
+    route('admin.manage_course_outline', '/admin/courses/{course_id}/outline', user='admin', queries=13),
+    route('admin.add_module', '/admin/modules/add/{course_id}', user='admin', method='POST',
+          status=302, queries=4, data={'title': 'New Module', 'order': '9'}),
+    route('admin.edit_module', '/admin/modules/{module_id}/edit', user='admin', queries=1),
+    route('admin.delete_module', '/admin/modules/{module_id}/delete', user='admin', method='POST',
+          status=302, queries=3),
+    route('admin.add_lesson', '/admin/lessons/add/{module_id}', user='admin', method='POST',
+          status=302, queries=5, data={'title': 'New Lesson', 'order': '9'}),
+    route('admin.edit_lesson', '/admin/lessons/{lesson_id}/edit', user='admin', queries=2),
+    route('admin.delete_lesson', '/admin/lessons/{lesson_id}/delete', user='admin', method='POST',
+          status=302, queries=4),
+    route('admin.manage_users', '/admin/manage-users', user='admin', queries=1),
+    route('admin.import_users_view', '/admin/users/import', user='admin', queries=0),
+    route('admin.bulk_user_action', '/admin/users/bulk', user='admin', method='POST', queries=2,
+          data={'action': 'set_role', 'role': 'student', 'ids': '{classmate_id}'}),
+    route('admin.update_user_role', '/admin/update_user_role/{classmate_id}', user='admin',
+          method='POST', status=302, queries=4, data={'role': 'instructor'}),
+    route('admin.delete_user', '/admin/users/delete/{classmate_id}', user='admin', method='POST',
+          status=302, queries=4),
+    route('admin.profiles', '/admin/profiles', user='admin', queries=0),
+    route('admin.download_profile', '/admin/profiles/missing.prof', user='admin', status=404, queries=0),
+    route('admin.slow_queries', '/admin/slow-queries?table=enrollment', user='admin', queries=1),
+]
+
+# Blueprint static file routes don't touch the database
+UNBUDGETED = {'static', 'courses.static', 'main.static', 'messaging.static'}
+
+# Pages that list rows, with the user who sees the most of them
+LIST_PAGES = [
+    ('main.dashboard', '/dashboard', 'student'),
+    ('courses.index', '/courses/', 'student'),
+    ('courses.course_detail', '/courses/{course_slug}', 'student'),
+    ('courses.course_lesson', '/courses/{course_slug}/lessons/{lesson_slug}', 'student'),
+    ('messaging.inbox', '/messages/inbox', 'student'),
+    ('messaging.conversation', '/messages/conversation/{instructor_id}', 'student'),
+    ('messaging.search', '/messages/search?q=hello', 'student'),
+    ('instructor.dashboard', '/instructor/dashboard', 'instructor'),
+    ('instructor.course_students', '/instructor/course/{course_id}/students', 'instructor'),
+    ('messaging.instructor_messages', '/messages/instructor-messages', 'instructor'),
+    ('admin.manage_courses', '/admin/courses/manage', 'admin'),
+    ('admin.manage_users', '/admin/manage-users', 'admin'),
+    ('admin.manage_course_outline', '/admin/courses/{course_id}/outline', 'admin'),
+]
+
+# Known N+1 pages; strict, so fixing one fails until it is removed from this set
+KNOWN_N_PLUS_ONE = {
+    'main.dashboard',
+    'courses.course_detail',
+    'courses.course_lesson',
+    'instructor.dashboard',
+    'instructor.course_students',
+    'messaging.instructor_messages',
+    'admin.manage_course_outline',
+}
+
+
+def _fill(value, data):
+    if isinstance(value, dict):
+        return {key: _fill(item, data) for key, item in value.items()}
+    return value.format(**data)
+
+
+def test_every_route_has_a_budget(app):
+    routed = {rule.endpoint for rule in app.url_map.iter_rules()} - UNBUDGETED
+    budgeted = {r.endpoint for r in ROUTES}
+    assert routed - budgeted == set(), "add these routes to ROUTES with a query budget"
+    assert budgeted - routed == set(), "these ROUTES entries no longer exist"
+
+
+@pytest.mark.parametrize('case', ROUTES, ids=[r.endpoint for r in ROUTES])
+def test_route_budget(app, data, case):
+    client = login(app, USERS[case.user])
+    url = _fill(case.url, data)
+    form = _fill(case.data, data) if case.data else None
+
+    if case.warm:
+        client.get(url, headers=case.headers)
+
+    result = measure(app, client, case.method, url, data=form, headers=case.headers)
+    assert result.response.status_code == case.status
+    assert result.queries <= case.queries, (
+        f"{case.endpoint} ran {result.queries} queries (budget {case.queries})"
+    )
+    assert result.seconds <= case.seconds * TIME_FACTOR, (
+        f"{case.endpoint} took {result.seconds * 1000:.0f}ms (budget {case.seconds * 1000:.0f}ms)"
+    )
+
+
+@pytest.fixture(scope='module')
+def scaled_apps():
+    return {scale: build_app(scale) for scale in (3, 8)}
+
+
+@pytest.mark.parametrize('endpoint,url,user', [
+    pytest.param(*page, marks=pytest.mark.xfail(strict=True, reason='known N+1'))
+    if page[0] in KNOWN_N_PLUS_ONE else page
+    for page in LIST_PAGES
+], ids=[page[0] for page in LIST_PAGES])
+def test_query_count_does_not_grow_with_data(scaled_apps, endpoint, url, user):
+    counts = {}
+    for scale, (app, data) in scaled_apps.items():
+        client = login(app, USERS[user])
+        client.get(_fill(url, data))
+        result = measure(app, client, 'GET', _fill(url, data))
+        assert result.response.status_code == 200
+        counts[scale] = result.queries
+    assert counts[3] == counts[8], f"{endpoint} queries grow with data: {counts}"